@@ -0,0 +1,123 @@
+"""Controlled node splitting: the incremental cns_reduce against redoing the
+dominator tree and the T1/T2 reduction of the whole graph after every split,
+and cns_reduce_sccs with one process against several on graphs made of
+independent irreducible regions, and the memory of the split history kept
+as deltas, as full snapshots, and streamed.
+
+    python -m benchmarks.bench_cns
+"""
+import os
+import time
+import tracemalloc
+
+from benchmarks.graph_gen import random_cfg, structured_cfg, multi_region_cfg
+from src.lib.cns_reduction import cns_reduce, get_split, cns_reduce_sccs, iter_cns_reduce
+from src.lib.dominator import get_dominator_tree
+from src.lib.hecht_ullman_reduction import get_reduced_graph
+
+CASES = (
+    ("random_cfg", random_cfg, 200),
+    ("random_cfg", random_cfg, 400),
+    ("structured_cfg", lambda n: structured_cfg(n, goto_prob=0.05), 2_000),
+    ("structured_cfg", lambda n: structured_cfg(n, goto_prob=0.05), 10_000),
+)
+
+
+def cns_reduce_from_scratch(graph, strategy_name="normal_node") -> int:
+    """Number of splits, recomputing everything after each one"""
+    data = get_reduced_graph(graph)
+    next_label = max(max(graph), max(s for v in graph.values() for s in v)) + 1
+    splits = 0
+    while len(data["graph"]) > 1:
+        g, preds, weights = data["graph"], data["preds"], data["weights"]
+        node = get_split(preds, get_dominator_tree(g), weights, strategy_name)
+        for p in preds[node][1:]:
+            g[p] = [next_label if s == node else s for s in g[p]]
+            g[next_label] = list(g[node])
+            weights[next_label] = weights[node]
+            next_label += 1
+        # put the start node back in front
+        g = {data["start"]: g[data["start"]], **g}
+        data = get_reduced_graph(g, weights)
+        splits += 1
+    return splits
+
+
+def run(cases=CASES):
+    print(f"{'graph':<16}{'nodes':>8}{'splits':>8}{'incremental s':>15}{'from scratch s':>16}")
+    for name, gen, n in cases:
+        g = gen(n)
+        t0 = time.perf_counter()
+        res = cns_reduce(g)
+        inc_secs = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        splits = cns_reduce_from_scratch(g)
+        scratch_secs = time.perf_counter() - t0
+        assert splits == len(res) - 1
+        print(f"{name:<16}{len(g):>8}{splits:>8}{inc_secs:15.3f}{scratch_secs:16.3f}")
+
+
+SCC_CASES = (
+    ("multi_region_cfg", 8, 200),
+    ("multi_region_cfg", 16, 200),
+    ("multi_region_cfg", 8, 400),
+)
+
+
+def run_sccs(cases=SCC_CASES, workers=None):
+    workers = workers or os.cpu_count()
+    print(f"{'graph':<18}{'regions':>8}{'nodes':>8}{'splits':>8}{'whole s':>9}{'sccs s':>8}"
+          f"{f'sccs x{workers} s':>13}")
+    for name, regions, size in cases:
+        g = multi_region_cfg(regions, size)
+        t0 = time.perf_counter()
+        cns_reduce(g)
+        whole_secs = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        res = cns_reduce_sccs(g, max_workers=1)
+        serial_secs = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        cns_reduce_sccs(g, max_workers=workers)
+        parallel_secs = time.perf_counter() - t0
+        print(f"{name:<18}{regions:>8}{len(g):>8}{len(res) - 1:>8}{whole_secs:9.3f}{serial_secs:8.3f}"
+              f"{parallel_secs:13.3f}")
+
+
+HISTORY_CASES = (
+    ("structured_cfg", lambda n: structured_cfg(n, goto_prob=0.05), 2_000),
+    ("structured_cfg", lambda n: structured_cfg(n, goto_prob=0.05), 5_000),
+    ("multi_region_cfg", lambda n: multi_region_cfg(8, n // 8), 1_600),
+)
+
+
+def _peak(fn):
+    """Seconds and peak MB allocated while fn runs"""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    res = fn()
+    secs = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return res, secs, peak
+
+
+def run_history(cases=HISTORY_CASES):
+    print(f"{'graph':<18}{'nodes':>8}{'splits':>8}{'deltas MB':>11}{'deltas s':>10}{'walk s':>8}"
+          f"{'snapshots MB':>14}{'snapshots s':>13}{'stream MB':>11}")
+    for name, gen, n in cases:
+        g = gen(n)
+        res, delta_secs, delta_mb = _peak(lambda: cns_reduce(g))
+        t0 = time.perf_counter()
+        for _ in res:
+            pass
+        walk_secs = time.perf_counter() - t0
+        _, snap_secs, snap_mb = _peak(lambda: list(iter_cns_reduce(g)))
+        _, _, stream_mb = _peak(lambda: sum(1 for _ in iter_cns_reduce(g)))
+        print(f"{name:<18}{len(g):>8}{len(res) - 1:>8}{delta_mb:11.2f}{delta_secs:10.3f}{walk_secs:8.3f}"
+              f"{snap_mb:14.2f}{snap_secs:13.3f}{stream_mb:11.2f}")
+
+
+if __name__ == "__main__":
+    run()
+    run_sccs()
+    run_history()
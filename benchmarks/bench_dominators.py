@@ -0,0 +1,101 @@
+"""Time and peak memory of the idom engines on large random CFGs.
+
+    python -m benchmarks.bench_dominators [nodes]
+"""
+import sys
+import time
+import tracemalloc
+
+from functools import partial
+
+from benchmarks.graph_gen import random_cfg, chain_cfg, deep_cfg
+from src.lib.dominator import compute_idoms
+from src.lib.graph_utils import preorder_csr
+from src.lib.lengauer_tarjan import gen_lt_graph, gen_lt_idoms, lt_idoms_csr
+
+
+def measure(func, arg) -> tuple[float, int]:
+    """Best wall time of three calls and peak traced allocation in bytes (separate
+    runs, tracemalloc slows the timed run down otherwise)"""
+    secs = float("+Inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        func(arg)
+        secs = min(secs, time.perf_counter() - t0)
+
+    tracemalloc.start()
+    res = func(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del res
+    return secs, peak
+
+
+def run(n: int, engines: dict):
+    for gen in (random_cfg, chain_cfg, deep_cfg):
+        g = gen(n)
+        e = sum(len(v) for v in g.values())
+        print(f"{gen.__name__}: {n} nodes, {e} edges")
+        base = None
+        for name, func in engines.items():
+            secs, peak = measure(func, g)
+            if base is None:
+                base = (secs, peak)
+                cmp = ""
+            else:
+                cmp = f"  ({base[0] / secs:.1f}x faster, {base[1] / peak:.1f}x less memory)"
+            print(f"  {name:<14}{secs:9.3f} s{peak / 2 ** 20:10.1f} MiB{cmp}")
+
+
+def run_batch(sizes=(4, 8, 16, 32, 64, 128, 256), count=20_000):
+    """Per graph time of each engine over a batch of many small CFGs"""
+    print(f"batches of small CFGs, {count} nodes per batch, usecs per graph")
+    print(f"{'nodes':>6}" + "".join(f"{name:>14}" for name in BATCH_ENGINES))
+    for n in sizes:
+        batch = [random_cfg(n, extra_edges=2, seed=s) for s in range(count // n)]
+        row = f"{n:>6}"
+        for name, func in BATCH_ENGINES.items():
+            t0 = time.perf_counter()
+            for g in batch:
+                func(g)
+            row += f"{1e6 * (time.perf_counter() - t0) / len(batch):14.1f}"
+        print(row)
+
+
+def run_link_stats(sizes=(10_000, 100_000)):
+    """Compressed path length and time of simple vs balanced linking; when the
+    simple variant compresses much more per eval it is losing on that graph"""
+    print("Lengauer-Tarjan linking")
+    for gen in (random_cfg, chain_cfg, deep_cfg):
+        for n in sizes:
+            csr, parent = preorder_csr(gen(n))
+            for balanced in (False, True):
+                stats = {}
+                t0 = time.perf_counter()
+                lt_idoms_csr(csr, parent, balanced=balanced, stats=stats)
+                secs = time.perf_counter() - t0
+                print(f"  {gen.__name__:<11}{n:>8} {'balanced' if balanced else 'simple':<9}{secs:8.3f} s"
+                      f"  evals {stats['evals']:>8}  compressed {stats['compressed_path_length']:>9}")
+
+
+ENGINES = {
+    "gen_lt_graph": gen_lt_graph,
+    "gen_lt_idoms": gen_lt_idoms,
+    "lt_balanced": partial(compute_idoms, engine="lt_balanced"),
+    "semi_nca": partial(compute_idoms, engine="semi_nca"),
+    "chk": partial(compute_idoms, engine="chk"),
+    "auto": compute_idoms,
+}
+
+BATCH_ENGINES = {
+    "gen_lt_graph": gen_lt_graph,
+    "lt": partial(compute_idoms, engine="lt"),
+    "semi_nca": partial(compute_idoms, engine="semi_nca"),
+    "chk": partial(compute_idoms, engine="chk"),
+    "auto": compute_idoms,
+}
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000, ENGINES)
+    run_batch()
+    run_link_stats()
@@ -0,0 +1,70 @@
+"""Incremental dominator maintenance against recomputing from scratch.
+
+Applies a stream of random edge insertions and deletions to a structured CFG and
+times DynamicDominators (tree, then tree and frontier) per update against
+compute_idoms and get_dominance_frontier on the updated graph.
+
+    python -m benchmarks.bench_dynamic_dominators [nodes] [updates]
+"""
+import random
+import sys
+import time
+
+from benchmarks.graph_gen import structured_cfg
+from src.lib.dominator import compute_idoms, get_dominance_frontier
+from src.lib.dynamic_dominator import DynamicDominators
+
+
+def gen_updates(g, count: int, rng: random.Random) -> list[tuple[str, int, int]]:
+    """Mostly insertions of short forward jumps (resolved indirect jumps), some
+    deletions of existing edges"""
+    g = {u: list(succs) for u, succs in g.items()}
+    n = len(g)
+    edges = [(u, v) for u, succs in g.items() for v in succs]
+    ops = []
+    while len(ops) < count:
+        if rng.random() < 0.7:
+            u = rng.randrange(n)
+            v = min(n - 1, u + rng.randrange(1, 200)) if rng.random() < 0.9 else rng.randrange(u + 1)
+            if v not in g[u]:
+                g[u].append(v)
+                edges.append((u, v))
+                ops.append(("insert", u, v))
+        else:
+            u, v = edges.pop(rng.randrange(len(edges)))
+            g[u].remove(v)
+            ops.append(("delete", u, v))
+    return ops
+
+
+def run(n: int, updates: int, seed: int=0):
+    rng = random.Random(seed)
+    g = structured_cfg(n, seed=seed)
+    ops = gen_updates(g, updates, rng)
+
+    for track in (False, True):
+        dd = DynamicDominators(g, track_frontier=track)
+        secs = {"insert": 0.0, "delete": 0.0}
+        counts = {"insert": 0, "delete": 0}
+        for op, u, v in ops:
+            t0 = time.perf_counter()
+            dd.insert_edge(u, v) if op == "insert" else dd.delete_edge(u, v)
+            secs[op] += time.perf_counter() - t0
+            counts[op] += 1
+        label = "incremental idom+df" if track else "incremental idom"
+        print(f"  {label:<22}" + "".join(f"{op} {1e3 * secs[op] / counts[op]:8.3f} ms   " for op in secs))
+
+    h = {u: list(succs) for u, succs in g.items()}
+    t0 = time.perf_counter()
+    compute_idoms(h)
+    print(f"  {'scratch idom':<22}{1e3 * (time.perf_counter() - t0):8.3f} ms per update")
+    t0 = time.perf_counter()
+    get_dominance_frontier(h)
+    print(f"  {'scratch df':<22}{1e3 * (time.perf_counter() - t0):8.3f} ms per update")
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    updates = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000
+    print(f"structured_cfg, {n} nodes, {updates} random updates")
+    run(n, updates)
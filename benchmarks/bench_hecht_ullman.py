@@ -0,0 +1,94 @@
+"""Time of the T1/T2 reduction and the size of the log it writes.
+
+Every log entry snapshots the adjacency of the nodes involved, so on graphs
+where one node keeps absorbing (fan_cfg) or keeps collecting latches
+(nested_loops_cfg) the log itself grows quadratically; "log items" counts
+the node ids stored in it. run_compact does the same with a HULog, which
+only records what each step changed, in memory and streamed to a file.
+
+    python -m benchmarks.bench_hecht_ullman
+"""
+import sys
+import tempfile
+import time
+
+from benchmarks.graph_gen import random_cfg, structured_cfg, nested_loops_cfg, fan_cfg, deep_cfg
+from src.lib.crawler_type import HULog
+from src.lib.dj_graph import is_reducible
+from src.lib.hecht_ullman_reduction import get_reduced_graph, recover_orig_data
+
+CASES = (
+    ("structured_cfg", structured_cfg, 100_000),
+    ("random_cfg", random_cfg, 20_000),
+    ("deep_cfg", deep_cfg, 2_000),
+    ("nested_loops_cfg", nested_loops_cfg, 2_000),
+    ("fan_cfg", fan_cfg, 20_000),
+)
+
+
+def run(cases=CASES):
+    print(f"{'graph':<18}{'nodes':>8}{'reduce s':>10}{'recover s':>11}{'log entries':>13}{'log items':>12}{'left':>8}")
+    for name, gen, n in cases:
+        g = gen(n)
+        t0 = time.perf_counter()
+        data = get_reduced_graph(g)
+        reduce_secs = time.perf_counter() - t0
+        entries = len(data["log"])
+        items = sum(len(e[2]) + len(e[3]) + len(e[4]) + len(e[5]) for e in data["log"])
+        left = len(data["graph"])
+        t0 = time.perf_counter()
+        recover_orig_data(data)
+        recover_secs = time.perf_counter() - t0
+        print(f"{name:<18}{len(g):>8}{reduce_secs:10.3f}{recover_secs:11.3f}{entries:>13}{items:>12}{left:>8}")
+
+
+def _tuple_log_bytes(log) -> int:
+    size = sys.getsizeof(log)
+    for entry in log:
+        size += sys.getsizeof(entry) + sum(sys.getsizeof(t) for t in entry[2:6])
+    return size
+
+
+def run_compact(cases=CASES):
+    """Tuple log against a HULog held in memory and a HULog streamed to a file"""
+    print(f"{'graph':<18}{'nodes':>8}{'tuple MB':>10}{'compact MB':>12}{'reduce s':>10}"
+          f"{'recover s':>11}{'stream s':>10}{'file MB':>9}")
+    for name, gen, n in cases:
+        g = gen(n)
+        tuple_mb = _tuple_log_bytes(get_reduced_graph(g)["log"]) / 2 ** 20
+        t0 = time.perf_counter()
+        data = get_reduced_graph(g, log=HULog())
+        reduce_secs = time.perf_counter() - t0
+        compact_mb = data["log"].nbytes() / 2 ** 20
+        t0 = time.perf_counter()
+        recover_orig_data(data)
+        recover_secs = time.perf_counter() - t0
+        with tempfile.TemporaryFile() as f:
+            t0 = time.perf_counter()
+            data = get_reduced_graph(g, log=HULog(f))
+            data["log"] = HULog.from_stream(f)
+            recover_orig_data(data)
+            stream_secs = time.perf_counter() - t0
+            file_mb = f.seek(0, 2) / 2 ** 20
+        print(f"{name:<18}{len(g):>8}{tuple_mb:10.2f}{compact_mb:12.2f}{reduce_secs:10.3f}"
+              f"{recover_secs:11.3f}{stream_secs:10.3f}{file_mb:9.2f}")
+
+
+def run_reducibility(cases=CASES):
+    """is_reducible against reducing the graph and checking one node is left"""
+    print(f"{'graph':<18}{'nodes':>8}{'is_reducible s':>16}{'reduce s':>10}  reducible")
+    for name, gen, n in cases:
+        g = gen(n)
+        t0 = time.perf_counter()
+        reducible, _ = is_reducible(g)
+        test_secs = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        get_reduced_graph(g)
+        reduce_secs = time.perf_counter() - t0
+        print(f"{name:<18}{len(g):>8}{test_secs:16.3f}{reduce_secs:10.3f}  {reducible}")
+
+
+if __name__ == "__main__":
+    run()
+    run_compact()
+    run_reducibility()
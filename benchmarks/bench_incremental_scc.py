@@ -0,0 +1,59 @@
+"""Incremental SCC maintenance against rerunning Tarjan after every batch.
+
+Streams random edge insertions (mostly short forward jumps, a few jumps back,
+which close cycles) into an acyclic random CFG. IncrementalSCC takes them one by
+one; the baseline reruns get_tarjan_scc on the whole graph after every batch.
+
+    python -m benchmarks.bench_incremental_scc [nodes] [edges] [batch]
+"""
+import random
+import sys
+import time
+
+from benchmarks.graph_gen import random_cfg
+from src.lib.incremental_scc import IncrementalSCC
+from src.lib.tarjan_scc import get_tarjan_scc
+
+
+def gen_edges(g, count: int, rng: random.Random) -> list[tuple[int, int]]:
+    n = len(g)
+    edges = []
+    for _ in range(count):
+        u = rng.randrange(n)
+        v = min(n - 1, u + rng.randrange(1, 200)) if rng.random() < 0.99 else rng.randrange(u + 1)
+        edges.append((u, v))
+    return edges
+
+
+def run(n: int, count: int, batch: int, seed: int=0):
+    g = random_cfg(n, back_edge_prob=0.0, seed=seed)
+    edges = gen_edges(g, count, random.Random(seed))
+
+    t0 = time.perf_counter()
+    inc = IncrementalSCC(g)
+    seed_secs = time.perf_counter() - t0
+    merges = 0
+    t0 = time.perf_counter()
+    for u, v in edges:
+        merges += bool(inc.add_edge(u, v))
+    inc_secs = time.perf_counter() - t0
+
+    g = {u: list(succs) for u, succs in g.items()}
+    t0 = time.perf_counter()
+    for i in range(0, count, batch):
+        for u, v in edges[i:i + batch]:
+            if v not in g[u]:
+                g[u].append(v)
+        sccs = get_tarjan_scc(g)
+    full_secs = time.perf_counter() - t0
+    assert sorted(map(sorted, sccs)) == sorted(map(sorted, inc.components()))
+
+    print(f"{len(g)} nodes, {count} edges in batches of {batch}, {merges} merges, {len(sccs)} sccs left")
+    print(f"seed {seed_secs:.3f}s, incremental {inc_secs:.3f}s ({1e6 * inc_secs / count:.1f} us/edge), "
+          f"tarjan per batch {full_secs:.3f}s")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5_000,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 50)
@@ -0,0 +1,66 @@
+"""Loop depth of every node: Havlak's loop nesting forest against
+identify_loops and against networkx.
+
+The networkx baseline is the usual way to get there without a loop forest:
+take the cyclic SCCs, count one loop for their nodes, drop the edges into
+the SCC's first node in DFS preorder and do the same inside it again. It
+gives the same depths as get_loop_forest.
+
+    python -m benchmarks.bench_loops
+"""
+import time
+
+import networkx as nx
+
+from benchmarks.graph_gen import random_cfg, structured_cfg, multi_region_cfg
+from src.lib.crawler_type import CSRGraph
+from src.lib.dj_graph import identify_loops
+from src.lib.havlak_loops import get_loop_forest
+from tests.helper import g_to_nx
+
+CASES = (
+    ("random_cfg", random_cfg, 2_000),
+    ("structured_cfg", structured_cfg, 20_000),
+    ("structured_cfg", lambda n: structured_cfg(n, goto_prob=0.05), 20_000),
+    ("multi_region_cfg", lambda n: multi_region_cfg(8, n // 8), 4_000),
+)
+
+
+def nx_depths(g) -> dict[int, int]:
+    nx_g = g_to_nx(g)
+    start = next(iter(g))
+    pre = {x: i for i, x in enumerate(nx.dfs_preorder_nodes(nx_g, start))}
+    depth = dict.fromkeys(pre, 0)
+    work = [nx_g.subgraph(pre).copy()]
+    while work:
+        sub = work.pop()
+        for scc in nx.strongly_connected_components(sub):
+            h = min(scc, key=pre.__getitem__)
+            if len(scc) == 1 and not sub.has_edge(h, h):
+                continue
+            for x in scc:
+                depth[x] += 1
+            loop = sub.subgraph(scc).copy()
+            loop.remove_edges_from(list(loop.in_edges(h)))
+            work.append(loop)
+    return depth
+
+
+def _time(func, arg) -> float:
+    t0 = time.perf_counter()
+    func(arg)
+    return time.perf_counter() - t0
+
+
+def run(cases=CASES):
+    print(f"{'graph':<18}{'nodes':>8}{'loops':>8}{'havlak s':>10}{'csr s':>8}{'dj s':>8}{'networkx s':>12}")
+    for name, gen, n in cases:
+        g = gen(n)
+        loops = len(get_loop_forest(g).headers())
+        secs = [_time(get_loop_forest, g), _time(get_loop_forest, CSRGraph.from_graph(g)),
+                _time(identify_loops, g), _time(nx_depths, g)]
+        print(f"{name:<18}{len(g):>8}{loops:>8}" + "".join(f"{s:{w}.3f}" for s, w in zip(secs, (10, 8, 8, 12))))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,52 @@
+"""Optimized node splitting against controlled node splitting: how much
+weight the copies add and how long it takes.
+
+cns_reduce splits the nodes of the T1/T2 reduced graph, so ons_reduce is run
+on that same reduced graph and its weights, and the growth of both counts
+copied nodes of the original graph. ONS copies whole regions of an SCC
+and keeps the one that leaves the least of it cyclic, which is why it gets
+away with much less on structured CFGs. Dense random ones take many copies either way, so both get
+TIME_LIMIT seconds and the stop columns tell whether they got there.
+
+    python -m benchmarks.bench_ons
+"""
+import time
+
+from benchmarks.graph_gen import random_cfg, structured_cfg, multi_region_cfg
+from src.lib.cns_reduction import cns_reduce
+from src.lib.hecht_ullman_reduction import get_reduced_graph
+from src.lib.ons_reduction import ons_reduce
+
+TIME_LIMIT = 30
+
+CASES = (
+    ("random_cfg", random_cfg, 50),
+    ("random_cfg", random_cfg, 100),
+    ("structured_cfg", lambda n: structured_cfg(n, goto_prob=0.05), 2_000),
+    ("structured_cfg", lambda n: structured_cfg(n, goto_prob=0.05), 10_000),
+    ("multi_region_cfg", lambda n: multi_region_cfg(8, n // 8), 400),
+    ("random_cfg dense", lambda n: random_cfg(n, extra_edges=3, back_edge_prob=0.3), 40),
+    ("random_cfg dense", lambda n: random_cfg(n, extra_edges=3, back_edge_prob=0.3, seed=1), 60),
+)
+
+
+def run(cases=CASES):
+    print(f"{'graph':<18}{'nodes':>8}{'cns splits':>12}{'cns growth':>12}{'cns s':>8}{'stop':>8}"
+          f"{'ons copies':>12}{'ons growth':>12}{'ons s':>8}{'stop':>8}")
+    for name, gen, n in cases:
+        g = gen(n)
+        t0 = time.perf_counter()
+        res = cns_reduce(g, time_limit=TIME_LIMIT)
+        cns_secs = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        data = get_reduced_graph(g)
+        _, weights, copies, stop = ons_reduce(data["graph"], data["weights"], time_limit=TIME_LIMIT)
+        ons_secs = time.perf_counter() - t0
+        ons_growth = sum(weights.values()) - sum(data["weights"].values())
+        print(f"{name:<18}{len(g):>8}{len(res) - 1:>12}{res.growth:>12}{cns_secs:8.3f}{res.stop.value:>8}"
+              f"{len(copies):>12}{ons_growth:>12}{ons_secs:8.3f}{stop.value:>8}")
+
+
+if __name__ == "__main__":
+    run()
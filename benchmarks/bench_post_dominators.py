@@ -0,0 +1,44 @@
+"""Time and peak memory of the post-dominator functions on large CFGs, next to
+the forward idom computation of the same graph.
+
+    python -m benchmarks.bench_post_dominators [nodes]
+"""
+import sys
+
+from benchmarks.bench_dominators import measure
+from benchmarks.graph_gen import random_cfg, structured_cfg
+from src.lib.dominator import compute_idoms, compute_ipdoms, get_post_dominance_frontier, \
+    get_control_dependence_graph
+
+FUNCS = {
+    "idoms": compute_idoms,
+    "ipdoms": compute_ipdoms,
+    "pdf": get_post_dominance_frontier,
+    "cdg": get_control_dependence_graph,
+}
+
+
+def no_exit(g):
+    """g with every exit looping back to the start, so all of it is one
+    infinite loop the virtual exit has to be connected to"""
+    start = next(iter(g))
+    return {node: succs or [start] for node, succs in g.items()}
+
+
+def run(n: int):
+    cases = [
+        ("random_cfg", random_cfg(n)),
+        ("structured_cfg", structured_cfg(n)),
+        ("structured_cfg, no exit", no_exit(structured_cfg(n))),
+    ]
+    for name, g in cases:
+        exits = sum(1 for succs in g.values() if not succs)
+        e = sum(len(v) for v in g.values())
+        print(f"{name}: {len(g)} nodes, {e} edges, {exits} exits")
+        for fname, func in FUNCS.items():
+            secs, peak = measure(func, g)
+            print(f"  {fname:<8}{secs:9.3f} s{peak / 2 ** 20:10.1f} MiB")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
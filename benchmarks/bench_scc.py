@@ -0,0 +1,114 @@
+"""Strongly connected components of graphs with about 10^6 edges:
+get_tarjan_scc against get_condensation, which also builds the condensation
+DAG, on both graph forms.
+
+run_queries times scc_of on single nodes and sccs_of on a batch of them
+against decomposing the whole graph.
+
+run_memory compares the peak RSS of the Tarjan and Pearce engines on graphs
+of 10^6 and 10^7 edges. Each engine runs in a fresh process, and only what
+it adds on top of the loaded graph is counted (Linux, where the peak can be
+reset through /proc/self/clear_refs).
+
+    python -m benchmarks.bench_scc
+"""
+import gc
+import multiprocessing
+import random
+import time
+
+from benchmarks.graph_gen import random_cfg, structured_cfg, deep_cfg, chain_cfg, multi_region_cfg
+from src.lib.crawler_type import CSRGraph
+from src.lib.graph_utils import get_preds
+from src.lib.tarjan_scc import get_tarjan_scc, get_condensation, scc_of, sccs_of
+
+CASES = (
+    ("random_cfg", random_cfg, 500_000),
+    ("structured_cfg", structured_cfg, 800_000),
+    ("deep_cfg", deep_cfg, 350_000),
+    ("chain_cfg", chain_cfg, 500_000),
+)
+
+
+def _time(func, arg) -> float:
+    best = float("+Inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(cases=CASES):
+    print(f"{'graph':<16}{'nodes':>9}{'edges':>9}{'sccs':>9}{'tarjan':>9}{'cond':>9}{'speedup':>9}"
+          f"{'tarjan csr':>12}{'cond csr':>10}")
+    for name, gen, n in cases:
+        g = gen(n)
+        csr = CSRGraph.from_graph(g)
+        old, new = _time(get_tarjan_scc, g), _time(get_condensation, g)
+        old_csr, new_csr = _time(get_tarjan_scc, csr), _time(get_condensation, csr)
+        print(f"{name:<16}{len(csr):>9}{csr.num_edges:>9}{len(get_condensation(csr)):>9}"
+              f"{old:9.3f}{new:9.3f}{old / new:9.2f}{old_csr:12.3f}{new_csr:10.3f}")
+
+
+def run_queries(n: int=200_000, queries: int=100, seed: int=0):
+    """A CFG that is mostly one big SCC, and one of many loops of 1000 nodes
+    one after the other, where a search only has to cover one side"""
+    rng = random.Random(seed)
+    print(f"{'graph':<16}{'nodes':>9}{'full':>9}{'per node':>10}{'batch':>9}{'scc nodes':>12}")
+    for name, g in (("structured_cfg", structured_cfg(n, seed=seed)),
+                    ("multi_region_cfg", multi_region_cfg(n // 1000, 1000, seed=seed))):
+        preds = get_preds(g)
+        nodes = [rng.randrange(n) for _ in range(queries)]
+        full = _time(get_tarjan_scc, g)
+        t0 = time.perf_counter()
+        for x in nodes:
+            scc_of(g, x, preds)
+        single = (time.perf_counter() - t0) / queries
+        batch = _time(lambda xs: sccs_of(g, xs, preds), nodes)
+        seen = sum(map(len, {id(scc): scc for scc in sccs_of(g, nodes, preds).values()}.values()))
+        print(f"{name:<16}{len(g):>9}{full:9.3f}{single:10.4f}{batch:9.3f}{seen:>12}")
+
+
+MEMORY_SIZES = (500_000, 5_000_000)  # random_cfg has about two edges per node
+
+
+def _rss_mb(field: str) -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def _measure(engine: str, n: int, queue):
+    g = random_cfg(n)
+    gc.collect()
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")  # peak RSS := current RSS
+    base = _rss_mb("VmRSS:")
+    t0 = time.perf_counter()
+    sccs = get_tarjan_scc(g, engine)
+    secs = time.perf_counter() - t0
+    queue.put((sum(map(len, g.values())), len(sccs), base, _rss_mb("VmHWM:") - base, secs))
+
+
+def run_memory(sizes=MEMORY_SIZES):
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'engine':<8}{'nodes':>10}{'edges':>10}{'sccs':>8}{'graph MB':>10}{'peak MB':>10}"
+          f"{'B/node':>8}{'secs':>8}")
+    for n in sizes:
+        for engine in ("tarjan", "pearce"):
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_measure, args=(engine, n, queue))
+            proc.start()
+            edges, sccs, base, peak, secs = queue.get()
+            proc.join()
+            print(f"{engine:<8}{n:>10}{edges:>10}{sccs:>8}{base:10.0f}{peak:10.0f}"
+                  f"{peak * 2 ** 20 / n:8.0f}{secs:8.2f}")
+
+
+if __name__ == "__main__":
+    run()
+    run_queries()
+    run_memory()
@@ -0,0 +1,51 @@
+"""Scaling benchmark for the DFS traversals and init_lt.
+
+Times each traversal on random CFGs of doubling size and prints the time per
+node+edge. For a linear traversal that column stays flat; the doubling ratio
+of the total time should stay close to 2.
+
+    python -m benchmarks.bench_traversal
+"""
+import time
+
+from benchmarks.graph_gen import random_cfg, chain_cfg
+from src.lib.crawler_type import CSRGraph
+from src.lib.graph_utils import dfs_pre_order_traversal, dfs_post_order_traversal
+from src.lib.lengauer_tarjan import init_lt
+
+SIZES = (12_500, 25_000, 50_000, 100_000, 200_000)
+
+
+def _time(func, arg) -> float:
+    best = float("+Inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(gen=random_cfg, sizes=SIZES):
+    cases = {
+        "pre_order": dfs_pre_order_traversal,
+        "post_order": dfs_post_order_traversal,
+        "init_lt": init_lt,
+    }
+    print(f"graph generator: {gen.__name__}")
+    print(f"{'case':<16}{'nodes':>9}{'edges':>9}{'secs':>10}{'ns/(V+E)':>11}{'ratio':>8}")
+    for name, func in cases.items():
+        for form in ("dict", "csr"):
+            prev = None
+            for n in sizes:
+                g = gen(n)
+                arg = CSRGraph.from_graph(g) if form == "csr" else g
+                e = sum(len(v) for v in g.values())
+                secs = _time(func, arg)
+                ratio = f"{secs / prev:8.2f}" if prev else f"{'-':>8}"
+                print(f"{name + '/' + form:<16}{n:>9}{e:>9}{secs:>10.4f}{1e9 * secs / (n + e):>11.1f}{ratio}")
+                prev = secs
+
+
+if __name__ == '__main__':
+    run(random_cfg)
+    run(chain_cfg)
@@ -0,0 +1,149 @@
+"""Synthetic control flow graphs for the benchmarks"""
+import random
+
+from src.lib.crawler_type import graph_t
+
+
+def random_cfg(n: int, extra_edges: int=1, back_edge_prob: float=0.2, seed: int=0) -> graph_t:
+    """Random CFG with n nodes, every node reachable from 0.
+
+    Node i > 0 hangs off a random earlier node, then each node gets up to
+    extra_edges additional successors: a back edge (to an earlier node) with
+    probability back_edge_prob, otherwise a forward edge.
+
+    Args:
+        n (int): number of nodes
+        extra_edges (int): additional successors tried per node
+        back_edge_prob (float): chance that an additional edge points backwards
+        seed (int): random seed
+
+    Returns:
+        graph_t
+    """
+    rng = random.Random(seed)
+    graph = {i: [] for i in range(n)}
+    for i in range(1, n):
+        graph[rng.randrange(max(0, i - 8), i)].append(i)
+    for i in range(n):
+        for _ in range(extra_edges):
+            if rng.random() < back_edge_prob:
+                t = rng.randrange(0, i + 1)
+            elif i + 1 < n:
+                t = rng.randrange(i + 1, min(n, i + 64))
+            else:
+                continue
+            if t not in graph[i]:
+                graph[i].append(t)
+    return graph
+
+
+def chain_cfg(n: int) -> graph_t:
+    """0 -> 1 -> ... -> n-1 with a back edge from every node to 0; deepest possible DFS tree"""
+    graph = {i: [i + 1, 0] for i in range(n - 1)}
+    graph[n - 1] = [0]
+    return graph
+
+
+def deep_cfg(n: int, back_edges: int=2, seed: int=0) -> graph_t:
+    """A chain 0 -> 1 -> ... -> n-1 where every node also jumps back to random
+    earlier nodes, the deep DFS tree obfuscated code tends to produce"""
+    rng = random.Random(seed)
+    graph = {i: [i + 1] for i in range(n - 1)}
+    graph[n - 1] = []
+    for i in range(1, n):
+        for _ in range(back_edges):
+            t = rng.randrange(0, i)
+            if t not in graph[i]:
+                graph[i].append(t)
+    return graph
+
+
+def nested_loops_cfg(depth: int) -> graph_t:
+    """Loops nested depth deep: headers 0 .. depth - 1 on the way in, a self-loop
+    on depth in the middle, then one latch per loop on the way out jumping back
+    to its header. T1/T2 needs one round per nesting level to reduce it."""
+    latch = lambda i: 2 * depth - i
+    graph = {i: [i + 1] for i in range(depth)}
+    for i in range(depth, 0, -1):
+        graph[latch(i)] = [i, latch(i - 1)]
+    graph[latch(0)] = [0, 2 * depth + 1]
+    graph[2 * depth + 1] = []
+    return graph
+
+
+def fan_cfg(n: int) -> graph_t:
+    """0 branches to n blocks that all join in n + 1, the widest node degrees"""
+    graph = {0: list(range(1, n + 1))}
+    for i in range(1, n + 1):
+        graph[i] = [n + 1]
+    graph[n + 1] = []
+    return graph
+
+
+def structured_cfg(n: int, goto_prob: float=0.01, seed: int=0) -> graph_t:
+    """CFG of roughly n nodes built from nested sequences, if/else diamonds and
+    loops, like compiled structured code, plus a few random forward gotos.
+    Unlike random_cfg its dominator tree is deep and its loops are nested."""
+    rng = random.Random(seed)
+    graph = {}
+
+    def new_block() -> int:
+        b = len(graph)
+        graph[b] = []
+        return b
+
+    def region(budget: int) -> tuple[int, int]:
+        """Emit a region of about budget blocks, return (entry, exit)"""
+        if budget <= 2:
+            b = new_block()
+            return b, b
+        kind = rng.random()
+        if kind < 0.4:
+            split = rng.randint(budget // 4 + 1, 3 * budget // 4)
+            e1, x1 = region(split)
+            e2, x2 = region(budget - split)
+            graph[x1].append(e2)
+            return e1, x2
+        if kind < 0.75:
+            cond = new_block()
+            split = rng.randint(budget // 4 + 1, 3 * budget // 4)
+            e1, x1 = region(split - 1)
+            e2, x2 = region(budget - split - 1)
+            join = new_block()
+            graph[cond] += [e1, e2]
+            graph[x1].append(join)
+            graph[x2].append(join)
+            return cond, join
+        header = new_block()
+        e, x = region(budget - 2)
+        latch = new_block()
+        graph[header].append(e)
+        graph[x].append(latch)
+        graph[latch].append(header)
+        exit_b = new_block()
+        graph[header].append(exit_b)
+        return header, exit_b
+
+    region(n)
+    for b in range(len(graph)):
+        if rng.random() < goto_prob and b + 1 < len(graph):
+            t = rng.randrange(b + 1, len(graph))
+            if t not in graph[b]:
+                graph[b].append(t)
+    return graph
+
+
+def multi_region_cfg(regions: int, size: int, seed: int=0) -> graph_t:
+    """regions random_cfg blocks of size nodes one after the other, each one's
+    exits (and its last node) jumping to the next one's entry: independent irreducible regions,
+    like a big function with several obfuscated loops"""
+    graph = {}
+    for r in range(regions):
+        offset = r * size
+        block = random_cfg(size, seed=seed + r)
+        for i, succs in block.items():
+            graph[offset + i] = [offset + s for s in succs] or [offset + size]
+        if offset + size not in graph[offset + size - 1]:
+            graph[offset + size - 1].append(offset + size)
+    graph[regions * size] = []
+    return graph
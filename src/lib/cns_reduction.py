@@ -6,126 +6,574 @@ Ref:
 Splitting" Johan Janssen and Henk Corporaal (1997)
 ACM Transactions on Programming Languages and Systems, Vol. 19, No. 6, November 1997.
 """
-from src.lib.crawler_type import graph_t, lt_graph_t, T1T2Data_t, split_data_t, weights_t, g_node_t
-from src.lib.dominator import gen_lt_graph
-from src.lib.hecht_ullman_reduction import get_reduced_graph, reduce_t1t2_data
+import heapq
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Generator
 
+from src.lib.crawler_type import graph_t, T1T2Data_t, split_data_t, weights_t, Reduce, hu_log_t, CNSStop
+from src.lib.dominator import compute_idoms, get_dominator_tree
+from src.lib.hecht_ullman_reduction import get_reduced_graph, reduce_worklist, redo_entry
+from src.lib.tarjan_scc import get_tarjan_scc
 
-def build_strategy(lt_graph: lt_graph_t, strategy_name: str):
 
-    idoms = { node['idom'] for _, node in lt_graph.items() if node['idom'] is not None }
+def build_strategy(preds: graph_t, dom_tree: graph_t, strategy_name: str) -> Callable[[int], bool]:
+    """Whether a node that dominates other nodes may still be split"""
 
     if strategy_name == 'back_edge':
-        def func(node: g_node_t)-> bool:
-            return len(set(node['preds']).intersection(idoms)) == 0
+        def func(node: int) -> bool:
+            return not any(dom_tree.get(p) for p in preds[node])
         return func
     elif strategy_name == 'normal_node':
-        def func(node: g_node_t)->bool:
-            return node['pre'] not in idoms
+        def func(node: int) -> bool:
+            return not dom_tree[node]
         return func
 
     raise ValueError(f"undefined strategy {strategy_name}")
 
 
-def get_split(lt_graph: lt_graph_t, weights: weights_t, strategy_name="normal_mode")->g_node_t:
-
-    best = (None, float("+Inf"))
-    can_split = build_strategy(lt_graph, strategy_name=strategy_name)
-
-    idoms = { node['idom'] for _, node in lt_graph.items() if node['idom'] is not None }
-
-    # skip start
-    for idx, node in lt_graph[1:].items():
-        score = weights[idx] * ( len(node['preds']) - 1 )
-        if score >= best[1]:
-            continue
-        else:
-            if idx not in idoms:
-                best = (node, score)
-                continue
-            else:
-                if can_split(node):
-                    best = (node, score)
-                    continue
-                else:
-                    continue
-    return best[0]
-
-
-def split_graph(lt_graph: lt_graph_t, node_to_split: g_node_t, weights: weights_t)->tuple[T1T2Data_t, split_data_t]:
-    """Splits node_to_split in lt_graph and returns a new graph within t1T2 structure, together with split data
+def get_split(preds: graph_t, dom_tree: graph_t, weights: weights_t, strategy_name: str="normal_node") -> int | None:
+    """Node to split next: the one with the lowest weight * (preds - 1) among
+    the nodes that dominate nothing or that the strategy allows. Ties go to
+    the lowest node id.
 
     Args:
-        weights (weights_t): array node -> weight
-        lt_graph (lt_graph): graph with node to split
-        node_to_split (g_node_t): node to split
+        preds (graph_t): predecessors of every node
+        dom_tree (graph_t): children in the dominator tree of every reachable
+            node, start node first (as get_dominator_tree)
+        weights (weights_t): weight of every node
+        strategy_name (str): "normal_node" or "back_edge" (see build_strategy)
 
     Returns:
-        T1T2 data, split data
-
+        node to split, None if there is no node but the start node
     """
-    new_graph = {idx: node['succs'] for idx, node in lt_graph.items() if idx != node_to_split['pre']}
-
-    new_preds = {idx: node['preds'] for idx, node in lt_graph.items() if idx != node_to_split['pre']}
-
-    new_weights = list(weights)
-    split_data = []
-
-    for idx, p in enumerate(node_to_split['preds']):
-        old_idx = node_to_split['pre']
-        old_weight = weights[old_idx]
-        l = len(new_graph)
-        new_idx = old_idx if idx == 0 else l + idx
-        new_graph[new_idx] = node_to_split['succs']
+    can_split = build_strategy(preds, dom_tree, strategy_name)
+    nodes = iter(dom_tree)
+    # skip start
+    next(nodes, None)
 
-        succs = new_graph[p]['succs']
-        new_preds[new_idx] = [p]
+    best = None
+    best_key = None
+    for node in nodes:
+        key = (weights[node] * (len(preds[node]) - 1), node)
+        if best_key is not None and key >= best_key:
+            continue
+        if not dom_tree[node] or can_split(node):
+            best, best_key = node, key
+    return best
 
-        if idx != 0:
-            succs.remove(old_idx)
-            succs.append(new_idx)
-            new_weights[new_idx] = old_weight
 
-        split_data.append({
-            "duplicate": new_idx,
-            "original": old_idx
-        })
+class SplitQueue:
+    """The choice get_split makes, kept in a heap of (weight * (preds - 1),
+    node) so it stays O(log n) per pick while the graph changes.
 
-    return {
-        "start": lt_graph[0]['pre'],
-        "graph": new_graph,
-        "preds": new_preds,
-        "weights": new_weights,
-        "log": []
-    }, split_data
+    preds, succs, dom_tree and weights are the live dicts of the graph being
+    reduced (adjacency as any container of nodes). After changing them, pass
+    the nodes whose weight or predecessors changed, and the nodes whose
+    dominator tree children changed, to update. Outdated heap entries are
+    skipped when they come up.
+    """
+    __slots__ = ("preds", "succs", "dom_tree", "weights", "start", "back_edge", "can_split", "key", "heap")
+
+    def __init__(self, preds, succs, dom_tree, weights: weights_t, strategy_name: str="normal_node"):
+        self.preds = preds
+        self.succs = succs
+        self.dom_tree = dom_tree
+        self.weights = weights
+        self.start = next(iter(dom_tree))
+        self.back_edge = strategy_name == "back_edge"
+        self.can_split = build_strategy(preds, dom_tree, strategy_name)
+        self.key = {}
+        self.heap = []
+        for node in dom_tree:
+            self._refresh(node)
+
+    def best(self) -> int | None:
+        """Node get_split would pick, None if there is no node but the start node"""
+        heap, key = self.heap, self.key
+        while heap:
+            k = heap[0]
+            if key.get(k[1]) == k:
+                return k[1]
+            heapq.heappop(heap)
+        return None
+
+    def update(self, touched, dom_changed=()):
+        nodes = set(touched)
+        nodes.update(dom_changed)
+        if self.back_edge:
+            # whether a node dominates anything decides for its successors
+            for x in dom_changed:
+                nodes.update(self.succs.get(x, ()))
+        for node in nodes:
+            self._refresh(node)
+
+    def _refresh(self, node: int):
+        dom_tree = self.dom_tree
+        if node == self.start or node not in dom_tree or not (not dom_tree[node] or self.can_split(node)):
+            self.key.pop(node, None)
+            return
+        k = (self.weights[node] * (len(self.preds[node]) - 1), node)
+        if self.key.get(node) != k:
+            self.key[node] = k
+            heapq.heappush(self.heap, k)
+
+
+class CNSHistory:
+    """What cns_reduce did, as the state after the first reduction plus one
+    record per split: the split node, its copies with the predecessors each
+    one took over, and the log of the reduction that followed.
+
+    Reads like the list of (T1T2 data, split data) cns_reduce used to
+    return. The state of a step is rebuilt on demand by replaying the splits
+    and logs from the last step rebuilt (or from the start when going back),
+    so walking the steps in order costs about as much as the reduction did.
+    Items are fresh copies.
+
+    stop tells why splitting ended, growth how much weight the splits added,
+    and remaining holds the cyclic SCCs of the last state, what is left
+    irreducible when a budget ran out.
+    """
+    __slots__ = ("initial", "steps", "stop", "growth", "remaining", "_at", "_succs", "_preds", "_weights")
+
+    def __init__(self, initial: T1T2Data_t):
+        self.initial = _snapshot(initial["start"], initial["graph"], initial["preds"], initial["weights"],
+                                 initial["log"])
+        self.steps = []
+        self.stop = CNSStop.DONE
+        self.growth = 0
+        self.remaining = []
+        self._at = None
+
+    def finish(self, budget: "SplitBudget", succs):
+        """Record how the run ended, succs being the last state"""
+        self.stop = budget.stop
+        self.growth = budget.growth
+        self.remaining = [sorted(scc) for scc in get_tarjan_scc(succs) if len(scc) > 1]
+
+    def append(self, node: int, copies, log: hu_log_t):
+        """Record a split of node into node and copies, given as (copy,
+        predecessors moved to it) pairs, and the log that followed it"""
+        self.steps.append((node, tuple((c, tuple(moved)) for c, moved in copies), log))
+
+    def __len__(self) -> int:
+        return len(self.steps) + 1
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [self[i] for i in range(*k.indices(len(self)))]
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError(f"undefined step {k}")
+        initial = self.initial
+        if k == 0:
+            return _snapshot(initial["start"], initial["graph"], initial["preds"], initial["weights"],
+                             initial["log"]), ()
+        if self._at is None or self._at > k:
+            self._succs = {x: dict.fromkeys(v, 0) for x, v in initial["graph"].items()}
+            self._preds = {x: dict.fromkeys(v, 0) for x, v in initial["preds"].items()}
+            self._weights = dict(initial["weights"])
+            self._at = 0
+        succs, preds, weights = self._succs, self._preds, self._weights
+        while self._at < k:
+            node, copies, log = self.steps[self._at]
+            for c, moved in copies:
+                _split_off(succs, preds, weights, node, c, moved)
+            for entry in log:
+                redo_entry(entry, succs, preds, weights)
+            self._at += 1
+        node, copies, log = self.steps[k - 1]
+        return (_snapshot(initial["start"], succs, preds, weights, log),
+                tuple({"duplicate": c, "original": node} for c in (node, *(c for c, _ in copies))))
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, CNSHistory):
+            return self.initial == other.initial and self.steps == other.steps and self.stop is other.stop
+        return NotImplemented
+
+
+class SplitBudget:
+    """Limits of a node splitting run, asked before every split. Unset limits always allow."""
+    __slots__ = ("deadline", "max_splits", "max_growth", "splits", "growth", "stop")
+
+    def __init__(self, time_limit: float | None=None, max_splits: int | None=None, max_growth: int | None=None,
+                 deadline: float | None=None):
+        if deadline is None and time_limit is not None:
+            deadline = time.monotonic() + time_limit
+        self.deadline = deadline
+        self.max_splits = max_splits
+        self.max_growth = max_growth
+        self.splits = 0
+        self.growth = 0
+        self.stop = CNSStop.DONE
+
+    def allows(self, growth: int) -> bool:
+        """Whether a split adding growth weight fits, counting it if it does"""
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.stop = CNSStop.TIME
+        elif self.max_splits is not None and self.splits >= self.max_splits:
+            self.stop = CNSStop.SPLITS
+        elif self.max_growth is not None and self.growth + growth > self.max_growth:
+            self.stop = CNSStop.GROWTH
+        else:
+            self.splits += 1
+            self.growth += growth
+            return True
+        return False
 
 
-def cns_reduce(graph: graph_t, weights: weights_t=None)->list[tuple[T1T2Data_t, split_data_t]]:
+def cns_reduce(graph: graph_t, weights: weights_t=None, strategy_name: str="normal_node",
+               engine: str="auto", time_limit: float | None=None, max_splits: int | None=None,
+               max_growth: int | None=None) -> CNSHistory:
     """Perform Hecht-Ullman reduction with controlled
     node splitting until the graph is a single node
 
+    After the first reduction everything is kept up to date around the split
+    node rather than recomputed: splitting n only changes the idoms of n's
+    copies and of the nodes n dominated, so only those are recomputed, and the
+    T1/T2 worklist is seeded with the copies of n alone. The T2 steps that follow
+    fold each absorbed node's dominator children into the node absorbing it.
+    Split candidates sit in a SplitQueue, refreshed for the nodes those steps
+    touched.
+
+    With a budget set, splitting stops before the split that would run over
+    it and what was reached so far is returned, with history.stop naming the
+    limit and history.remaining the SCCs still irreducible.
+
     Args:
         graph (graph_t): graph
         weights (weights_t): weight
+        strategy_name (str): see get_split
+        engine (str): dominator engine, see compute_idoms
+        time_limit (float): seconds the whole call may take
+        max_splits (int): number of splits allowed
+        max_growth (int): weight the splits may add in total
 
     Returns:
-        list (T1T2 data, split_data)
-
+        CNSHistory, read as a list of (T1T2 data, split_data): the data
+        after each split and the reduction that followed it (its log holds
+        that reduction only)
     """
-    if weights is None:
-        weights = [1 for g in graph]
-    t1_t2_curr = get_reduced_graph(graph, weights)
-    res = [(t1_t2_curr, ())]
-
-    while len(t1_t2_curr['graph']) > 1:
-        graph_curr = t1_t2_curr['graph']
-        weights = t1_t2_curr['weights']
-        lt_graph_curr = gen_lt_graph(graph_curr)
-        node_idx = get_split(lt_graph_curr, t1_t2_curr['weights'])
-        new_t1t2, split_tuples = split_graph(lt_graph_curr, node_idx, weights)
+    budget = SplitBudget(time_limit, max_splits, max_growth)
+    data = get_reduced_graph(graph, weights)
+    history = CNSHistory(data)
+    succs = data["graph"]
+    for succs, _, _, node, pairs, log in _cns_steps(data, _next_label(graph), strategy_name, engine, budget):
+        history.append(node, [(c, (p,)) for c, p in pairs[1:]], log)
+    history.finish(budget, succs)
+    return history
+
+
+def iter_cns_reduce(graph: graph_t, weights: weights_t=None, strategy_name: str="normal_node",
+                    engine: str="auto", time_limit: float | None=None, max_splits: int | None=None,
+                    max_growth: int | None=None) -> Generator[tuple[T1T2Data_t, split_data_t], None, CNSStop]:
+    """cns_reduce as a generator: the same items, each a copy of the state
+    built as the step happens, so a caller that is done with one can drop it.
+    The generator returns the CNSStop that ended it."""
+    budget = SplitBudget(time_limit, max_splits, max_growth)
+    data = get_reduced_graph(graph, weights)
+    yield _snapshot(data["start"], data["graph"], data["preds"], data["weights"], data["log"]), ()
+    for succs, preds, weights, node, pairs, log in _cns_steps(data, _next_label(graph), strategy_name, engine,
+                                                              budget):
+        yield (_snapshot(data["start"], succs, preds, weights, log),
+               tuple({"duplicate": c, "original": node} for c, _ in pairs))
+    return budget.stop
+
+
+def _next_label(graph: graph_t) -> int:
+    return max(max(graph), max((s for v in graph.values() for s in v), default=0)) + 1
+
+
+def _cns_steps(data: T1T2Data_t, next_label: int, strategy_name: str, engine: str, budget: SplitBudget):
+    """Split nodes of the reduced data, numbering copies from next_label, and
+    re-reduce after every split until one node is left or budget runs out
+    (see cns_reduce).
+
+    Yields:
+        succs, preds (dicts used as ordered sets) and weights, the split node,
+        its copies as (copy, predecessor it got) pairs with the node itself
+        first, and the log of the reduction that followed
+    """
+    start = data["start"]
+    succs = {x: dict.fromkeys(v, 0) for x, v in data["graph"].items()}
+    preds = {x: dict.fromkeys(v, 0) for x, v in data["preds"].items()}
+    weights = data["weights"]
+    position = {x: i for i, x in enumerate(succs)}
+    dom_tree = {x: set(v) for x, v in get_dominator_tree(data["graph"], engine).items()}
+    idom = {c: x for x, children in dom_tree.items() for c in children}
+    idom[start] = None
+    queue = SplitQueue(preds, succs, dom_tree, weights, strategy_name)
+
+    while len(succs) > 1:
+        node = queue.best()
+        if node is None:
+            # what is left is not reachable from start
+            budget.stop = CNSStop.STUCK
+            break
+        if not budget.allows(weights[node] * (len(preds[node]) - 1)):
+            break
+        copies = _split_node(succs, preds, weights, node, next_label)
+        next_label += len(copies) - 1
+        pairs = [(c, next(iter(preds[c]))) for c in copies]
+        dom_changed = set()
+        _update_idoms(succs, preds, idom, dom_tree, node, copies, next_label, engine, dom_changed)
+
+        for c in copies:
+            position.setdefault(c, len(position))
+        log = []
+        reduce_worklist(start, succs, preds, weights, log, copies, 0, position)
+        _fold_absorbed(idom, dom_tree, log, dom_changed)
+
+        touched = set(copies)
+        for entry in log:
+            touched.add(entry[1])
+            if entry[0] is Reduce.T2:
+                touched.add(entry[5][0])
+                touched.update(entry[4])
+        queue.update(touched, dom_changed)
+        yield succs, preds, weights, node, pairs, log
+
+
+def cns_reduce_sccs(graph: graph_t, weights: weights_t=None, strategy_name: str="normal_node",
+                    engine: str="auto", max_workers: int | None=None, time_limit: float | None=None,
+                    max_splits: int | None=None, max_growth: int | None=None) -> CNSHistory:
+    """cns_reduce one strongly connected component at a time.
+
+    Irreducibility only lives inside the cyclic SCCs of the reduced graph;
+    everything else is left alone. Each such SCC is split on its own, as a
+    graph whose start node stands for everything outside it and has an edge
+    to each of its entries, in a ProcessPoolExecutor when there is more than
+    one. The splits are then replayed on the whole graph, sinks first, so
+    replaying one SCC never touches an SCC still to come. Node sets that T2
+    merges are the same locally and in the whole graph, so a node named by
+    a local split is found as whatever node absorbed it since.
+
+    The budget holds for the whole call: each SCC is split under the same
+    deadline and limits, and the replay stops at the first split that would
+    run over them.
 
-        t1_t2_curr = reduce_t1t2_data(new_t1t2)
+    Args:
+        graph (graph_t): graph
+        weights (weights_t): weight
+        strategy_name (str): see get_split
+        engine (str): dominator engine, see compute_idoms
+        max_workers (int): processes to use, 1 to run everything in this one
+        time_limit (float): seconds the whole call may take
+        max_splits (int): number of splits allowed
+        max_growth (int): weight the splits may add in total
 
-        res.append((t1_t2_curr, split_tuples))
+    Returns:
+        CNSHistory as cns_reduce, the splits of each SCC in turn
+    """
+    budget = SplitBudget(time_limit, max_splits, max_growth)
+    data = get_reduced_graph(graph, weights)
+    history = CNSHistory(data)
+
+    start = data["start"]
+    next_label = _next_label(graph)
+    tasks = []
+    for scc in get_tarjan_scc(data["graph"]):
+        if len(scc) > 1:
+            tasks.append(_scc_graph(data, scc, next_label))
+    if not tasks:
+        history.finish(budget, data["graph"])
+        return history
+    n = len(tasks)
+    args = [[g for g, _ in tasks], [w for _, w in tasks], [next_label] * n, [strategy_name] * n, [engine] * n,
+            [budget.deadline] * n, [max_splits] * n, [max_growth] * n]
+    if max_workers == 1 or len(tasks) == 1:
+        records = map(_cns_scc, *args)
+    else:
+        with ProcessPoolExecutor(max_workers) as executor:
+            records = list(executor.map(_cns_scc, *args))
+
+    succs = {x: dict.fromkeys(v, 0) for x, v in data["graph"].items()}
+    preds = {x: dict.fromkeys(v, 0) for x, v in data["preds"].items()}
+    weights = data["weights"]
+    position = {x: i for i, x in enumerate(succs)}
+    absorbed = {}
+
+    def holder(x: int) -> int:
+        while x in absorbed:
+            x = absorbed[x]
+        return x
+
+    local_stop = CNSStop.DONE
+    for scc_records, stop in records:
+        if local_stop is CNSStop.DONE:
+            local_stop = stop
+        # local copy -> copy in the whole graph
+        copy_of = {}
+        for node, pairs in scc_records:
+            node = holder(copy_of.get(node, node))
+            if not budget.allows(weights[node] * (len(pairs) - 1)):
+                break
+            inside = {holder(copy_of.get(p, p)) for _, p in pairs if p is not None}
+            outside = [p for p in preds[node] if p not in inside]
+            copies = []
+            for c, p in pairs[1:]:
+                copy_of[c] = next_label
+                moved = outside if p is None else [holder(copy_of.get(p, p))]
+                _split_off(succs, preds, weights, node, next_label, moved)
+                copies.append((next_label, moved))
+                next_label += 1
+
+            for c, _ in copies:
+                position[c] = len(position)
+            log = []
+            reduce_worklist(start, succs, preds, weights, log, [node] + [c for c, _ in copies], 0, position)
+            for entry in log:
+                if entry[0] is Reduce.T2:
+                    absorbed[entry[1]] = entry[5][0]
+            history.append(node, copies, log)
+        if budget.stop is not CNSStop.DONE:
+            break
+    if budget.stop is CNSStop.DONE:
+        budget.stop = local_stop
+    history.finish(budget, succs)
+    return history
+
+
+def _scc_graph(data: T1T2Data_t, scc: list[int], outside: int) -> tuple[graph_t, weights_t]:
+    """scc as a graph of its own with outside as start node. The start node of
+    data has nothing outside to stand for and starts the graph itself."""
+    inside = set(scc)
+    graph = data["graph"]
+    start = data["start"]
+    if start in inside:
+        local = {start: [s for s in graph[start] if s in inside]}
+    else:
+        local = {outside: [x for x in scc if any(p not in inside for p in data["preds"][x])]}
+    local.update((x, [s for s in graph[x] if s in inside]) for x in scc)
+    weights = {x: data["weights"].get(x, 0) for x in local}
+    return local, weights
+
+
+def _cns_scc(graph: graph_t, weights: weights_t, outside: int, strategy_name: str, engine: str,
+             deadline: float | None, max_splits: int | None, max_growth: int | None) -> tuple[list, CNSStop]:
+    """Splits cns_reduce makes on one SCC graph (see _scc_graph), as
+    (node, [(copy, predecessor), ...]) with predecessor None for outside,
+    and why they stopped"""
+    budget = SplitBudget(None, max_splits, max_growth, deadline)
+    data = get_reduced_graph(graph, weights)
+    records = []
+    for _, _, _, node, pairs, _ in _cns_steps(data, outside + 1, strategy_name, engine, budget):
+        records.append((node, [(c, None if p == outside else p) for c, p in pairs]))
+    return records, budget.stop
+
+
+def _split_node(succs: dict, preds: dict, weights: weights_t, node: int, next_label: int) -> list[int]:
+    """Give every predecessor of node its own copy of it. The first keeps node
+    itself, the others are numbered from next_label.
 
-    return res
+    Returns:
+        the copies, node first
+    """
+    copies = [node]
+    for p in list(preds[node])[1:]:
+        c = next_label + len(copies) - 1
+        copies.append(c)
+        _split_off(succs, preds, weights, node, c, (p,))
+    return copies
+
+
+def _split_off(succs: dict, preds: dict, weights: weights_t, node: int, c: int, moved):
+    """Add c as a copy of node that takes over the edges from moved"""
+    preds[c] = {}
+    for p in moved:
+        p_succs = succs[p]
+        del p_succs[node]
+        p_succs[c] = 0
+        del preds[node][p]
+        preds[c][p] = 0
+    succs[c] = dict(succs[node])
+    for s in succs[c]:
+        preds[s][c] = 0
+    weights[c] = weights[node]
+
+
+def _update_idoms(succs: dict, preds: dict, idom: dict, dom_tree: dict, node: int, copies: list[int],
+                  free_label: int, engine: str, dom_changed: set[int]):
+    """Paths through node map one to one onto paths through its copies, so
+    dominance between the other nodes is unchanged and only the copies and
+    the nodes node dominated can get a new idom. Those are only entered over
+    the copies of node whose predecessor lies outside them, so their idoms
+    follow from the subgraph they induce under a root with an edge to each of
+    those copies. Such a copy gets its predecessor as idom, any other node
+    the root dominates gets idom(node), the nearest node dominating every
+    such predecessor. With the normal_node strategy
+    node dominates nothing and this is just the copies."""
+    i = idom[node]
+    below = []
+    for a in dom_tree[node]:
+        below.append(a)
+    for a in below:
+        below.extend(dom_tree[a])
+    inside = set(below)
+    entries = {}
+    for c in copies:
+        p = next(iter(preds[c]))
+        if p not in inside and p in idom:
+            entries[c] = p
+    region = copies + below
+    inside.update(copies)
+    aux = {free_label: list(entries)}
+    aux.update((a, [s for s in succs[a] if s in inside]) for a in region)
+    idoms, pre, rev = compute_idoms(aux, engine)
+
+    for c in copies[1:]:
+        dom_tree[c] = set()
+    gone = []
+    for a in region:
+        old = idom.get(a)
+        if a not in pre:
+            gone.append(a)
+            continue
+        d = rev[idoms[pre[a]]]
+        if d == free_label:
+            d = entries.get(a, i)
+        if old != d:
+            if old is not None:
+                dom_tree[old].discard(a)
+                dom_changed.add(old)
+            dom_tree[d].add(a)
+            dom_changed.add(d)
+            idom[a] = d
+    # node can be left with an unreachable predecessor only
+    for a in gone:
+        if a in idom:
+            d = idom.pop(a)
+            dom_tree[d].discard(a)
+            dom_changed.add(d)
+        dom_tree.pop(a)
+
+
+def _fold_absorbed(idom: dict, dom_tree: dict, log: list, dom_changed: set[int]):
+    """A node absorbed by T2 had its absorber as only predecessor, which was
+    therefore its idom; its dominator children move up to the absorber."""
+    for entry in log:
+        node = entry[1]
+        if entry[0] is Reduce.T2 and node in idom:
+            u = entry[5][0]
+            children = dom_tree.pop(node)
+            dom_tree[u].discard(node)
+            dom_tree[u] |= children
+            dom_changed.add(u)
+            for c in children:
+                idom[c] = u
+            del idom[node]
+
+
+def _snapshot(start: int, succs, preds, weights: weights_t, log) -> T1T2Data_t:
+    return {
+        "start": start,
+        "graph": {x: list(v) for x, v in succs.items()},
+        "preds": {x: list(v) for x, v in preds.items()},
+        "weights": dict(weights),
+        "log": log,
+    }
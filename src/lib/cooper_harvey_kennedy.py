@@ -0,0 +1,87 @@
+"""
+Iterative dominator algorithm of Cooper, Harvey and Kennedy.
+
+Repeatedly intersects the dominator sets of the predecessors, with the sets
+stored implicitly as the tentative dominator tree. Runs passes in reverse
+postorder until nothing changes, which for the shallow loop nests of typical
+CFGs takes two or three passes.
+
+Ref: Keith D. Cooper, Timothy J. Harvey and Ken Kennedy. 2001.
+A Simple, Fast Dominance Algorithm. Software Practice & Experience 4.
+"""
+from array import array
+
+from src.lib.crawler_type import CSRGraph
+
+
+def reverse_post_order(parent: array) -> list[int]:
+    """Reverse postorder of the DFS tree given by parent, in preorder numbers.
+
+    A node finishes after everything left of it except its own ancestors, and
+    after its own proper descendants, so post = pre - depth + size - 1.
+    """
+    n = len(parent)
+    size = [1] * n
+    for v in range(n - 1, 0, -1):
+        size[parent[v]] += size[v]
+    depth = [0] * n
+    rpo = [0] * n
+    for v in range(n):
+        if v:
+            depth[v] = depth[parent[v]] + 1
+        rpo[n - 1 - (v - depth[v] + size[v] - 1)] = v
+    return rpo
+
+
+def chk_idoms_csr(csr: CSRGraph, parent: array) -> array:
+    """Cooper-Harvey-Kennedy over a preorder numbered CSRGraph.
+
+    The paper compares postorder numbers in intersect and walks up the finger
+    with the smaller one. This walks up the finger with the larger preorder
+    number instead, which for nodes that are not ancestors of each other is
+    the other finger (there the later node in preorder also finishes later).
+    That is still safe: tentative dominators are always DFS tree ancestors,
+    so the nearest common dominator of the two fingers has a preorder number
+    no larger than either, and the finger with the larger one is strictly
+    below it and can move up without passing it.
+
+    Args:
+        csr (CSRGraph): graph numbered in DFS preorder (see preorder_csr)
+        parent (array): DFS tree parent of every preorder number
+
+    Returns:
+        array of immediate dominators by preorder number, -1 for the start node
+    """
+    n = len(csr)
+    pred_offsets, pred_sources = csr.pred_offsets, csr.pred_sources
+    rpo = reverse_post_order(parent)
+    # -1 marks "not processed yet"; the start node dominates itself while iterating
+    idom = [-1] * n
+    idom[0] = 0
+
+    changed = True
+    while changed:
+        changed = False
+        for b in rpo:
+            if b == 0:
+                continue
+            new_idom = -1
+            for p in pred_sources[pred_offsets[b]:pred_offsets[b + 1]]:
+                if idom[p] == -1:
+                    continue
+                if new_idom == -1:
+                    new_idom = p
+                    continue
+                f1, f2 = p, new_idom
+                while f1 != f2:
+                    while f1 > f2:
+                        f1 = idom[f1]
+                    while f2 > f1:
+                        f2 = idom[f2]
+                new_idom = f1
+            if idom[b] != new_idom:
+                idom[b] = new_idom
+                changed = True
+
+    idom[0] = -1
+    return array("i", idom)
@@ -1,5 +1,6 @@
 from __future__ import annotations
-from enum import Enum
+from array import array
+from enum import Enum, IntEnum
 from typing import Optional, List, Dict, TypedDict
 from typing import TypeAlias
 
@@ -13,6 +14,144 @@ order_t: TypeAlias=tuple[int, ...]
 g_map_t: TypeAlias=dict[int, int]
 
 
+class CSRGraph:
+    """Compact, array backed graph in compressed sparse row form.
+
+    Nodes are renumbered 0..n-1 in key order of the source graph (so index 0 is
+    always the start node) and any node that only appears as a successor is appended
+    after the keys. Successors of node i are ``targets[offsets[i]:offsets[i+1]]`` and
+    predecessors are ``pred_sources[pred_offsets[i]:pred_offsets[i+1]]``. Predecessors
+    are listed in increasing index order, the same order get_preds produces.
+
+    labels maps an index back to the original node id, index maps the other way.
+    """
+    __slots__ = ("labels", "index", "offsets", "targets", "pred_offsets", "pred_sources")
+
+    def __init__(self, labels: array, offsets: array, targets: array, index: g_map_t | None=None):
+        n = len(labels)
+        if len(offsets) != n + 1:
+            raise ValueError("offsets must have one more entry than labels")
+        self.labels = labels
+        # callers that already hold the label -> index map can hand it over
+        self.index = index if index is not None else {label: i for i, label in enumerate(labels)}
+        self.offsets = offsets
+        self.targets = targets
+
+        # reverse CSR by counting sort on the targets; iterating sources in index
+        # order keeps every predecessor list sorted. Scratch work is done in lists,
+        # which index faster than arrays
+        counts = [0] * (n + 1)
+        for t in targets:
+            counts[t + 1] += 1
+        for i in range(n):
+            counts[i + 1] += counts[i]
+        self.pred_offsets = array("i", counts)
+        pred_sources = [0] * len(targets)
+        for u in range(n):
+            for t in targets[offsets[u]:offsets[u + 1]]:
+                pred_sources[counts[t]] = u
+                counts[t] += 1
+        self.pred_sources = array("i", pred_sources)
+
+    @classmethod
+    def from_graph(cls, g: graph_t) -> CSRGraph:
+        """Build from a graph_t. The first key becomes index 0."""
+        labels = array("q", g)
+        index = {label: i for i, label in enumerate(labels)}
+        for succs in g.values():
+            for s in succs:
+                if s not in index:
+                    index[s] = len(labels)
+                    labels.append(s)
+
+        offsets = array("i", [0])
+        targets = array("i")
+        for label in labels:
+            targets.extend(index[s] for s in g.get(label, ()))
+            offsets.append(len(targets))
+        return cls(labels, offsets, targets, index)
+
+    def to_graph(self) -> graph_t:
+        """Inverse of from_graph"""
+        labels, offsets, targets = self.labels, self.offsets, self.targets
+        return {labels[i]: [labels[t] for t in targets[offsets[i]:offsets[i + 1]]]
+                for i in range(len(labels))}
+
+    def to_preds(self) -> graph_t:
+        """Predecessor lists as a graph_t, keyed in node order"""
+        labels, offsets, sources = self.labels, self.pred_offsets, self.pred_sources
+        return {labels[i]: [labels[s] for s in sources[offsets[i]:offsets[i + 1]]]
+                for i in range(len(labels))}
+
+    def succs(self, i: int) -> array:
+        return self.targets[self.offsets[i]:self.offsets[i + 1]]
+
+    def preds(self, i: int) -> array:
+        return self.pred_sources[self.pred_offsets[i]:self.pred_offsets[i + 1]]
+
+    @property
+    def start(self) -> int:
+        return self.labels[0]
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.targets)
+
+    def nbytes(self) -> int:
+        """Size of the array buffers (the index dict is not counted)"""
+        return sum(a.itemsize * len(a) for a in (self.labels, self.offsets, self.targets,
+                                                 self.pred_offsets, self.pred_sources))
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+
+# anything the analyses in src/lib accept as input
+any_graph_t: TypeAlias=graph_t | CSRGraph
+
+
+class Condensation:
+    """Strongly connected components of a graph (see get_condensation) over
+    its nodes numbered as in CSRGraph.from_graph, labels and index mapping
+    them to the nodes of the graph and back.
+
+    comp is the component of each node. Components are numbered in the order
+    Tarjan's algorithm completes them, which is a reverse topological order
+    of the condensation: every edge between components goes to a lower one.
+    The nodes of component c are ``nodes[offsets[c]:offsets[c+1]]``, the node
+    the DFS reached last first, and dag is the condensation as a CSRGraph
+    whose labels are the component numbers, without duplicate edges.
+    """
+    __slots__ = ("labels", "index", "comp", "offsets", "nodes", "dag")
+
+    def __init__(self, labels: array, index: g_map_t, comp: array, offsets: array, nodes: array, dag: CSRGraph):
+        self.labels = labels
+        self.index = index
+        self.comp = comp
+        self.offsets = offsets
+        self.nodes = nodes
+        self.dag = dag
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def component_of(self, node: int) -> int:
+        return self.comp[self.index[node]]
+
+    def component(self, c: int) -> list[int]:
+        """Nodes of component c"""
+        labels = self.labels
+        return [labels[i] for i in self.nodes[self.offsets[c]:self.offsets[c + 1]]]
+
+    def sccs(self) -> list[list[int]]:
+        """Every component, as get_tarjan_scc lists them"""
+        return [self.component(c) for c in range(len(self))]
+
+    def topological_order(self) -> range:
+        """Components so that every edge goes to a later one"""
+        return range(len(self) - 1, -1, -1)
+
+
 # data structures for l-t analysis
 class LTNode(TypedDict):
     pre: int
@@ -30,39 +169,362 @@ g_node_t = LTNode
 lt_graph_t = Dict[int, LTNode]
 
 
-class ONS_Node_t(TypedDict):
-    """Data structure for ONS combines dominator tree relations
-       with tracking data for SCC loop detection
+class ONSNode:
+    """Node for ONS: flow graph edges as references to the other nodes, the
+    node's place in the dominator tree, and the marks splitting an SCC uses
     """
-    pre: int
-    succs: list[ONS_Node_t]
-    preds: list[ONS_Node_t]
+    __slots__ = ("label", "original", "succs", "preds", "idom", "succs_dom", "level", "pre", "last", "weight",
+                 "copy", "header")
+
+    def __init__(self, label: int, weight: int=1, original: int | None=None):
+        self.label = label
+        self.original = label if original is None else original # node this is a copy of
+        self.succs = []
+        self.preds = []
+        self.idom = None
+        self.succs_dom = [] # successors in the dom-tree graph
+        self.level = 0 # depth in dominator tree
+        self.pre = -1 # preorder number in the dominator tree, -1 while unreachable
+        self.last = -1 # largest preorder number in the dominator subtree of this node
+        self.weight = weight # split weight
+        self.copy = None # copy of this node while its SCC is split
+        self.header = None # header of the SCC region holding this node while it is split
+
+    def dominates(self, other: ONSNode) -> bool:
+        return 0 <= self.pre <= other.pre <= self.last
+
+    def __repr__(self) -> str:
+        return f"ONSNode({self.label})"
+
+ons_graph_t: TypeAlias=dict[int, ONSNode]
+
+
+class DJNode_t(TypedDict):
+    """Node of a DJ graph: dominator tree (D) edges plus the remaining flow
+    graph edges (J), split into back J edges (target dominates source) and
+    cross J edges"""
     idom: int | None
-    succs_dom: list[ONS_Node_t]  # successors in the dom-tree graph
     level: int # depth in dominator tree
-    weight: int # split weight
-    copy: ONS_Node_t # holds reference to a temporary copy of this node used in splitting
-    header: ONS_Node_t # points to header node, if this is the header node, points to itself
-    done: bool # used when processing through entire graph
-    active: bool # used to determine whether a successor node is also an ancestor of curr node
-    sp_back_data: tuple[int, int] | None # used to store back-edge data
+    d_succs: list[int]
+    bj_succs: list[int]
+    cj_succs: list[int]
+
+dj_graph_t: TypeAlias=dict[int, DJNode_t]
 
-ons_graph_t: TypeAlias=dict[int, ONS_Node_t]
+
+class Loop_t(TypedDict):
+    header: int # for irreducible loops, the entry with the lowest preorder number
+    entries: list[int] # nodes of the loop with a predecessor outside it
+    reducible: bool
+    nodes: list[int] # nodes whose innermost loop this is, header included
+    parent: int | None # index of the enclosing loop
+
+class LoopKind(IntEnum):
+    NONE = 0 # not a loop header
+    SELF = 1 # header of a loop that is only a self loop
+    REDUCIBLE = 2
+    IRREDUCIBLE = 3 # the loop is also entered other than through its header
+
+class LoopForest:
+    """Loop nesting forest (see havlak_loops) as arrays over the reachable
+    nodes in DFS preorder, labels and index mapping them to the nodes of the
+    graph and back as in CSRGraph.
+
+    header is the innermost loop header of each node, a header being its own
+    (-1 outside every loop). parent is the header of the loop around that
+    one (-1 for outermost loops), depth the number of loops a node is in and
+    kind the LoopKind of each node.
+    """
+    __slots__ = ("labels", "index", "header", "parent", "depth", "kind")
+
+    def __init__(self, labels: array, index: g_map_t, header: array, parent: array, depth: array, kind: array):
+        self.labels = labels
+        self.index = index
+        self.header = header
+        self.parent = parent
+        self.depth = depth
+        self.kind = kind
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def depth_of(self, node: int) -> int:
+        """Loop depth of node, 0 outside loops and for unreachable nodes"""
+        i = self.index.get(node)
+        return 0 if i is None else self.depth[i]
+
+    def header_of(self, node: int) -> int | None:
+        """Header of the innermost loop holding node, None outside loops"""
+        i = self.index.get(node)
+        if i is None or self.header[i] == -1:
+            return None
+        return self.labels[self.header[i]]
+
+    def headers(self) -> dict[int, LoopKind]:
+        """Every loop header with its kind, outer loops first"""
+        return {self.labels[i]: LoopKind(k) for i, k in enumerate(self.kind) if k}
+
+    def body(self, node: int) -> list[int]:
+        """Nodes of the loop headed by node, nested loops included"""
+        h = self.index[node]
+        inside = bytearray(len(self.labels))
+        inside[h] = 1
+        body = [node]
+        # every header comes before the nodes of its loop in preorder
+        for i in range(h + 1, len(self.labels)):
+            up = self.header[i] if self.header[i] != i else self.parent[i]
+            if up != -1 and inside[up]:
+                inside[i] = 1
+                body.append(self.labels[i])
+        return body
 
 class Reduce(Enum):
     T1 = "T1"
     T2 = "T2"
 
+class CNSStop(Enum):
+    """Why node splitting stopped (controlled or optimized)"""
+    DONE = "done" # the graph is a single node (CNS) or reducible (ONS)
+    STUCK = "stuck" # no node to split, what is left is not reachable from start
+    TIME = "time"
+    SPLITS = "splits"
+    GROWTH = "growth" # the next split would add more weight than allowed
+
 # list[Operation, node, (anc parent,), (preds parent,), (ancestor node,), (preds node, ), weight)
 hu_log_t: TypeAlias=list[tuple[Reduce, int, tuple[int, ...], tuple[int, ...], tuple[int, ...], tuple[int, ...], int]]
 
 
+class HULog:
+    """Array encoded hu_log_t.
+
+    Entry i is ops[i] (T1 or T2), nodes[i], weights[i] and its payload
+    buf[offsets[i]:offsets[i+1]]. Rather than snapshots of adjacency lists
+    the payload holds what the step changed. Every adjacency entry is known
+    by the sequence number it got when it was inserted; lists only grow at
+    the end, so sorting a node's entries by sequence number gives back the
+    list.
+
+    T1: seq of the self-loop in succs[node], seq of it in preds[node]
+    T2: parent u, seq of node in succs[u], seq of u in preds[node], then for
+        every successor j of node: j, seq of j in succs[node] and
+        4 * (seq of node in preds[j]) + flags, where flag 1 means j was
+        appended to succs[u] and flag 2 that u was appended to preds[j]
+
+    state holds the sequence numbers of the graph the log ends in, as two
+    dicts from node to an array numbering its succs list, and its preds
+    list, in list order. next_seq is the next number to hand out; the
+    reduction sets both when it stops, and rewind keeps them up to date.
+
+    Undoing puts some entries back at the end of their list rather than
+    where they were (as undoing the hu_log_t does), so a rewound graph can
+    have lists out of sequence number order. Reducing it again numbers
+    those afresh, in list order, and keeps what they held in renumbered
+    under the step it started at, as (side, node, entry, number) quadruples
+    with side 0 for succs and 1 for preds; going back past that step puts
+    the old numbers back.
+
+    With a stream (a binary file opened for writing, or reading and writing),
+    every chunk_entries entries are written out and dropped from memory, and
+    close() writes the rest together with the state. Chunks are framed by
+    their size at both ends so they can be read back newest first. The
+    encoding uses the native byte order.
+    """
+    __slots__ = ("ops", "nodes", "weights", "offsets", "buf", "state", "next_seq", "renumbered",
+                 "stream", "chunk_entries", "flushed")
+
+    T1 = 1
+    T2 = 2
+    _ENTRIES = 0
+    _STATE = 1
+
+    def __init__(self, stream=None, chunk_entries: int=1 << 16):
+        self.ops = array("b")
+        self.nodes = array("q")
+        self.weights = array("q")
+        self.offsets = array("q", [0])
+        self.buf = array("q")
+        self.state = None
+        self.next_seq = 0
+        self.renumbered = {}
+        self.stream = stream
+        self.chunk_entries = chunk_entries
+        self.flushed = 0
+
+    def append(self, op: int, node: int, weight: int, payload):
+        self.ops.append(op)
+        self.nodes.append(node)
+        self.weights.append(weight)
+        self.buf.extend(payload)
+        self.offsets.append(len(self.buf))
+        if self.stream is not None and len(self.ops) >= self.chunk_entries:
+            self.flush()
+
+    def __len__(self) -> int:
+        return self.flushed + len(self.ops)
+
+    def nbytes(self) -> int:
+        """Bytes held in memory by the entry arrays"""
+        return sum(a.itemsize * len(a) for a in (self.ops, self.nodes, self.weights, self.offsets, self.buf))
+
+    def _write(self, kind: int, arrays):
+        body = b"".join(array("q", [len(a)]).tobytes() + a.tobytes() for a in arrays)
+        frame = array("q", [kind, len(body)]).tobytes()
+        self.stream.seek(0, 2)
+        self.stream.write(frame + body + frame)
+
+    def flush(self):
+        """Write the entries held in memory to the stream"""
+        if not self.ops:
+            return
+        self._write(self._ENTRIES, (self.ops, self.nodes, self.weights, self.offsets, self.buf))
+        self.flushed += len(self.ops)
+        self.ops = array("b")
+        self.nodes = array("q")
+        self.weights = array("q")
+        self.offsets = array("q", [0])
+        self.buf = array("q")
+
+    def close(self):
+        """Flush, then record the state the log ends in"""
+        self.flush()
+        # per side the number of nodes, then each node, its list length and numbers
+        state = array("q")
+        for seqs in self.state:
+            state.append(len(seqs))
+            for x, v in seqs.items():
+                state.extend((x, len(v)))
+                state.extend(v)
+        renumbered = array("q")
+        for step, quads in self.renumbered.items():
+            renumbered.extend((step, len(quads)))
+            renumbered.extend(quads)
+        self._write(self._STATE, (state, array("q", [self.next_seq, self.flushed]), renumbered))
+        self.stream.flush()
+
+    @classmethod
+    def from_stream(cls, stream) -> HULog:
+        """Open a log written with close() for replay; entries stay on disk
+        until chunks() reads them"""
+        log = cls(stream)
+        stream.seek(0, 2)
+        for kind, arrays, _ in log._read_back():
+            if kind == cls._STATE:
+                state = arrays[0]
+                log.state = ({}, {})
+                i = 0
+                for seqs in log.state:
+                    i += 1
+                    for _ in range(state[i - 1]):
+                        x, length = state[i:i + 2]
+                        seqs[x] = state[i + 2:i + 2 + length]
+                        i += 2 + length
+                log.next_seq, log.flushed = arrays[1]
+                renumbered = arrays[2]
+                i = 0
+                while i < len(renumbered):
+                    step, length = renumbered[i:i + 2]
+                    log.renumbered[step] = renumbered[i + 2:i + 2 + length]
+                    i += 2 + length
+                return log
+        raise ValueError("HU log stream has no state record")
+
+    def renumber(self, step: int, quads: array):
+        """Record the entries a reduction starting at step numbered afresh, as
+        (side, node, entry, old number) quadruples. Entries a record for the
+        same step already holds keep the number it has for them."""
+        earlier = self.renumbered.get(step)
+        if earlier is not None:
+            held = {tuple(earlier[i:i + 3]): earlier[i + 3] for i in range(0, len(earlier), 4)}
+            for i in range(0, len(quads), 4):
+                quads[i + 3] = held.pop(tuple(quads[i:i + 3]), quads[i + 3])
+            for key, seq in held.items():
+                quads.extend((*key, seq))
+        self.renumbered[step] = quads
+
+    def truncate(self, n: int):
+        """Drop every entry from index n on. Chunks written to the stream past
+        n are cut off the file (the one n falls in is read back into memory),
+        and so are the state records after them; the state has to be set again."""
+        if n >= len(self):
+            return
+        self.state = None
+        self.renumbered = {step: quads for step, quads in self.renumbered.items() if step <= n}
+        if self.stream is not None:
+            stream = self.stream
+            end = stream.seek(0, 2)
+            for kind, arrays, pos in self._read_back():
+                if kind == self._STATE:
+                    end = pos
+                    continue
+                if self.flushed <= n:
+                    break
+                self.flushed -= len(arrays[0])
+                end = pos
+                self.ops, self.nodes, self.weights, self.offsets, self.buf = arrays
+                if self.flushed <= n:
+                    break
+            stream.seek(end)
+            stream.truncate()
+        k = n - self.flushed
+        del self.ops[k:], self.nodes[k:], self.weights[k:], self.offsets[k + 1:]
+        del self.buf[self.offsets[k]:]
+
+    def _read_back(self):
+        """Chunks (kind, arrays, position) from the current stream position backwards"""
+        stream = self.stream
+        frame_size = array("q").itemsize * 2
+        pos = stream.tell()
+        while pos > 0:
+            stream.seek(pos - frame_size)
+            kind, size = array("q", stream.read(frame_size))
+            pos -= 2 * frame_size + size
+            stream.seek(pos + frame_size)
+            body = stream.read(size)
+            arrays = []
+            at = 0
+            for typecode in ("b", "q", "q", "q", "q") if kind == self._ENTRIES else ("q", "q", "q"):
+                length = array("q", body[at:at + frame_size // 2])[0]
+                at += frame_size // 2
+                a = array(typecode)
+                a.frombytes(body[at:at + length * a.itemsize])
+                at += length * a.itemsize
+                arrays.append(a)
+            yield kind, arrays, pos
+            stream.seek(pos)
+
+    def chunks(self):
+        """Entry chunks (ops, nodes, weights, offsets, buf), newest first:
+        what is in memory, then what the stream holds. Read back from the
+        stream, only the chunks written before the last state record count."""
+        if self.ops:
+            yield self.ops, self.nodes, self.weights, self.offsets, self.buf
+        if self.stream is None or not self.flushed:
+            return
+        self.stream.seek(0, 2)
+        remaining = self.flushed
+        for kind, arrays, _ in self._read_back():
+            if kind == self._STATE:
+                continue
+            if remaining <= 0:
+                break
+            remaining -= len(arrays[0])
+            yield tuple(arrays)
+
+
 class T1T2Data_t(TypedDict):
     start: int
     graph: graph_t
     preds: graph_t
     weights: weights_t
-    log: hu_log_t
+    log: hu_log_t | HULog
+
+class HUCheckpoint_t(TypedDict):
+    """Copy of T1T2Data_t after the first step log entries"""
+    step: int
+    graph: graph_t
+    preds: graph_t
+    weights: weights_t
+    state: tuple[dict[int, array], dict[int, array]] | None # HULog numbering of graph and preds, None for a hu_log_t
 
 class SplitAlias_t(TypedDict):
     duplicate: int
@@ -2,6 +2,540 @@
 ref: "Identifying Loops Using DJ Graphs"
 -Sreedhar, Gao, Lee. https://dl.acm.org/doi/pdf/10.1145/236114.236115
 
+The DJ graph is the dominator tree (D edges) plus every flow graph edge x -> y
+where x is not idom(y) (J edges). A J edge is a back J edge when y dominates x
+and a cross J edge otherwise.
 
+Loops are found in one pass over the dominator tree levels, deepest first.
+Every back J edge into a node n at the current level closes a reducible loop
+headed by n, whose body is what reaches the edge sources backwards without
+passing n. A cross J edge into the level that is also a back edge of a DFS of
+the DJ graph (an Sp-back edge) signals an irreducible loop, and the strongly
+connected components of the nodes at this level and below give those. Each
+loop found is collapsed into its header (union-find), so outer levels see
+inner loops as single nodes.
+
+The iterated dominance frontier (phi placement) uses the piggybank algorithm
+from the same group: definitions are taken deepest level first, and a walk
+down the dominator subtree of each one picks up the J edges that climb to its
+level or above. Parts of a subtree a deeper walk already covered are not
+walked again, so placing the phis of one variable is linear in the graph.
+ref: "A Linear Time Algorithm for Placing phi-Nodes" -Sreedhar, Gao. POPL '95
 """
+from array import array
+from bisect import bisect_left
+from typing import Iterable
+
+from src.lib.crawler_type import any_graph_t, dj_graph_t, Loop_t, CSRGraph
+from src.lib.dominator import idoms_csr
+from src.lib.graph_utils import preorder_csr
+from src.lib.tarjan_scc import get_tarjan_scc
+
+
+def _dom_tree_numbers(idom: array) -> tuple[list[int], list[int], list[int]]:
+    """Level, dominator tree preorder number and subtree size of every node,
+    given idoms in flow graph preorder (where idom[i] < i)"""
+    n = len(idom)
+    level = [0] * n
+    children = [[] for _ in range(n)]
+    for i in range(1, n):
+        level[i] = level[idom[i]] + 1
+        children[idom[i]].append(i)
+
+    tin = [0] * n
+    order = []
+    stack = [0]
+    while stack:
+        i = stack.pop()
+        tin[i] = len(order)
+        order.append(i)
+        stack.extend(reversed(children[i]))
+    size = [1] * n
+    for i in reversed(order[1:]):
+        size[idom[i]] += size[i]
+    return level, tin, size
+
+
+def _dj_dfs(csr: CSRGraph, idom: array) -> tuple[list[int], list[int]]:
+    """Preorder number and highest preorder number in the subtree of every
+    node for a DFS of the DJ graph, so x -> y is an Sp-back edge iff
+    pre[y] <= pre[x] <= last[y]"""
+    n = len(csr)
+    offsets, targets = csr.offsets, csr.targets
+    # D edges first, then the J edges of every node
+    dj_succs = [[] for _ in range(n)]
+    for i in range(1, n):
+        dj_succs[idom[i]].append(i)
+    for x in range(n):
+        for e in range(offsets[x], offsets[x + 1]):
+            y = targets[e]
+            if idom[y] != x:
+                dj_succs[x].append(y)
+
+    pre = [-1] * n
+    last = [0] * n
+    cursor = [0] * n
+    pre[0] = 0
+    counter = 1
+    stack = [0]
+    while stack:
+        x = stack[-1]
+        succs = dj_succs[x]
+        if cursor[x] < len(succs):
+            y = succs[cursor[x]]
+            cursor[x] += 1
+            if pre[y] == -1:
+                pre[y] = counter
+                counter += 1
+                stack.append(y)
+        else:
+            stack.pop()
+            last[x] = counter - 1
+    return pre, last
+
+
+def gen_dj_graph(graph: any_graph_t, engine: str="auto") -> dj_graph_t:
+    """Build the DJ graph of the part of graph reachable from its start node
+
+    Args:
+        graph (any_graph_t): graph, start node first
+        engine (str): dominator engine, see compute_idoms
+
+    Returns:
+        dj_graph_t keyed by the original nodes in preorder
+    """
+    csr, parent = preorder_csr(graph)
+    idom = idoms_csr(csr, parent, engine)
+    level, tin, size = _dom_tree_numbers(idom)
+    offsets, targets, rev = csr.offsets, csr.targets, csr.labels
+
+    dj = {rev[i]: {
+        "idom": None if i == 0 else rev[idom[i]],
+        "level": level[i],
+        "d_succs": [],
+        "bj_succs": [],
+        "cj_succs": [],
+    } for i in range(len(csr))}
+    for i in range(1, len(csr)):
+        dj[rev[idom[i]]]["d_succs"].append(rev[i])
+    for x in range(len(csr)):
+        node = dj[rev[x]]
+        for e in range(offsets[x], offsets[x + 1]):
+            y = targets[e]
+            if idom[y] == x:
+                continue
+            if tin[y] <= tin[x] < tin[y] + size[y]:
+                node["bj_succs"].append(rev[y])
+            else:
+                node["cj_succs"].append(rev[y])
+    return dj
+
+
+def identify_loops(graph: any_graph_t, engine: str="auto") -> list[Loop_t]:
+    """Find the reducible and irreducible loops of graph and how they nest
+
+    Args:
+        graph (any_graph_t): graph, start node first
+        engine (str): dominator engine, see compute_idoms
+
+    Returns:
+        list of loops, every inner loop before the loops enclosing it. Each node
+        on a cycle appears in the nodes of exactly one loop (its innermost one),
+        loop_body collects a loop with everything nested in it
+    """
+    csr, parent = preorder_csr(graph)
+    n = len(csr)
+    idom = idoms_csr(csr, parent, engine)
+    level, tin, size = _dom_tree_numbers(idom)
+    dj_pre, dj_last = _dj_dfs(csr, idom)
+    offsets, targets = csr.offsets, csr.targets
+    pred_offsets, pred_sources = csr.pred_offsets, csr.pred_sources
+
+    by_level = [[] for _ in range(max(level) + 1)]
+    for i in range(n):
+        by_level[level[i]].append(i)
+
+    rep = list(range(n))
+
+    def find(x: int) -> int:
+        while rep[x] != x:
+            rep[x] = rep[rep[x]]
+            x = rep[x]
+        return x
+
+    # flow graph nodes through which a collapsed node is entered; only
+    # irreducible loops have more than their header
+    entries = {}
+    loop_of = [-1] * n  # innermost loop of each node
+    header_loop = [-1] * n  # outermost loop collapsed into each representative
+    mark = [-1] * n
+    loops = []  # (header, entries, reducible, parent)
+
+    def collapse(h: int, members: list[int], loop_entries: list[int], reducible: bool):
+        """Fold members (representatives, h among them) into h"""
+        lid = len(loops)
+        loops.append([loop_entries[0], loop_entries, reducible, -1])
+        for r in members:
+            if header_loop[r] != -1:
+                loops[header_loop[r]][3] = lid
+            else:
+                loop_of[r] = lid
+            rep[r] = h
+        header_loop[h] = lid
+        if not reducible:
+            entries[h] = loop_entries
+
+    deep = []  # nodes at the current level or below
+    for lvl in range(len(by_level) - 1, -1, -1):
+        deep.extend(by_level[lvl])
+        irreducible = False
+        for y in by_level[lvl]:
+            sources = []
+            for e in range(pred_offsets[y], pred_offsets[y + 1]):
+                x = pred_sources[e]
+                if idom[y] == x:
+                    continue
+                if tin[y] <= tin[x] < tin[y] + size[y]:
+                    sources.append(x)
+                elif dj_pre[y] <= dj_pre[x] <= dj_last[y]:
+                    irreducible = True
+            if not sources:
+                continue
+
+            # reducible loop: walk back from the back J edge sources to y
+            mark[y] = y
+            body = [y]
+            work = []
+            for x in sources:
+                r = find(x)
+                if mark[r] != y:
+                    mark[r] = y
+                    work.append(r)
+            while work:
+                r = work.pop()
+                body.append(r)
+                for z in entries.get(r, (r,)):
+                    for e in range(pred_offsets[z], pred_offsets[z + 1]):
+                        q = find(pred_sources[e])
+                        if mark[q] != y:
+                            mark[q] = y
+                            work.append(q)
+            collapse(y, body, [y], True)
+
+        if not irreducible:
+            continue
+        # irreducible loops are the strongly connected components of the
+        # (collapsed) nodes at this level and below
+        sub = {}
+        for x in deep:
+            rx = find(x)
+            succs = sub.setdefault(rx, [])
+            for e in range(offsets[x], offsets[x + 1]):
+                s = targets[e]
+                if level[s] >= lvl:
+                    rs = find(s)
+                    if rs != rx:
+                        succs.append(rs)
+        for scc in get_tarjan_scc(sub):
+            if len(scc) < 2:
+                continue
+            inside = set(scc)
+            loop_entries = []
+            for r in scc:
+                for z in entries.get(r, (r,)):
+                    for e in range(pred_offsets[z], pred_offsets[z + 1]):
+                        if find(pred_sources[e]) not in inside:
+                            loop_entries.append(z)
+                            break
+            loop_entries.sort()
+            collapse(find(loop_entries[0]), scc, loop_entries, False)
+
+    rev = csr.labels
+    nodes = [[] for _ in loops]
+    for i in range(n):
+        if loop_of[i] != -1:
+            nodes[loop_of[i]].append(rev[i])
+    return [{
+        "header": rev[h],
+        "entries": [rev[z] for z in loop_entries],
+        "reducible": reducible,
+        "nodes": nodes[lid],
+        "parent": None if p == -1 else p,
+    } for lid, (h, loop_entries, reducible, p) in enumerate(loops)]
+
+
+def loop_body(loops: list[Loop_t], idx: int) -> list[int]:
+    """Every node of loops[idx], nested loops included"""
+    children = [[] for _ in loops]
+    for i, loop in enumerate(loops):
+        if loop["parent"] is not None:
+            children[loop["parent"]].append(i)
+    body = []
+    stack = [idx]
+    while stack:
+        i = stack.pop()
+        body.extend(loops[i]["nodes"])
+        stack.extend(children[i])
+    return body
+
+
+
+def _no_outside_entries(csr: CSRGraph, dfs_size: list[int]) -> bool:
+    """Tarjan's reducibility test on a preorder CSRGraph. Headers are taken in
+    reverse preorder; the body of each is collected backwards from its
+    retreating edges over a union-find of the loops already collapsed, and
+    the graph is irreducible as soon as a body node has a predecessor outside
+    the header's DFS subtree."""
+    n = len(csr)
+    pred_offsets, pred_sources = csr.pred_offsets, csr.pred_sources
+    rep = list(range(n))
+    mark = [-1] * n
+    for w in range(n - 1, -1, -1):
+        end = w + dfs_size[w]
+        body = []
+        for e in range(pred_offsets[w], pred_offsets[w + 1]):
+            x = pred_sources[e]
+            if w <= x < end:
+                while rep[x] != x:
+                    rep[x] = rep[rep[x]]
+                    x = rep[x]
+                if x != w and mark[x] != w:
+                    mark[x] = w
+                    body.append(x)
+        # body grows while it is walked; inner loops are only entered
+        # through their header, so the header's predecessors are enough
+        for x in body:
+            for e in range(pred_offsets[x], pred_offsets[x + 1]):
+                y = pred_sources[e]
+                if not w <= y < end:
+                    return False
+                while rep[y] != y:
+                    rep[y] = rep[rep[y]]
+                    y = rep[y]
+                if y != w and y != x and mark[y] != w:
+                    mark[y] = w
+                    body.append(y)
+        for x in body:
+            rep[x] = w
+    return True
+
+
+def is_reducible(graph: any_graph_t, engine: str="auto") -> tuple[bool, list[tuple[int, int]]]:
+    """Reducibility test without running the T1/T2 reduction. Only the part
+    reachable from the start node counts.
+
+    Reducible graphs are recognized by Tarjan's union-find test, which needs
+    no dominators. Otherwise the dominator tree is computed to report the
+    offending edges: a graph is reducible exactly when the target of every
+    retreating edge of a DFS dominates its source.
+
+    Args:
+        graph (any_graph_t): graph, start node first
+        engine (str): dominator engine, see compute_idoms
+
+    Returns:
+        whether graph is reducible, and the retreating edges whose target does
+        not dominate their source (empty when reducible)
+    """
+    csr, parent = preorder_csr(graph)
+    n = len(csr)
+    # DFS subtree sizes; parents come before their children in preorder
+    dfs_size = [1] * n
+    for i in range(n - 1, 0, -1):
+        dfs_size[parent[i]] += dfs_size[i]
+    if _no_outside_entries(csr, dfs_size):
+        return True, []
+
+    offsets, targets = csr.offsets, csr.targets
+    _, tin, size = _dom_tree_numbers(idoms_csr(csr, parent, engine))
+    rev = csr.labels
+    offending = [(rev[x], rev[y]) for x in range(n) for y in targets[offsets[x]:offsets[x + 1]]
+                 if y <= x < y + dfs_size[y] and not tin[y] <= tin[x] < tin[y] + size[y]]
+    return False, offending
+
+
+def _idf_prep(graph: any_graph_t, engine: str):
+    """Everything an IDF query needs, computed once per graph.
+
+    Nodes are laid out in dominator tree preorder so every subtree is a range
+    of positions. Each position keeps its J edge targets sorted by level and
+    jmin, the lowest of those levels, with a sparse table of range argmins of
+    jmin on top.
+    """
+    csr, parent = preorder_csr(graph)
+    n = len(csr)
+    idom = idoms_csr(csr, parent, engine)
+    level, tin, size = _dom_tree_numbers(idom)
+    offsets, targets = csr.offsets, csr.targets
+    order = [0] * n
+    for i in range(n):
+        order[tin[i]] = i
+
+    no_edge = n  # deeper than any level
+    jmin = array("i", [no_edge]) * n
+    j_offsets = array("i", [0])
+    j_targets = array("i")
+    for pos in range(n):
+        x = order[pos]
+        js = sorted((targets[e] for e in range(offsets[x], offsets[x + 1]) if idom[targets[e]] != x),
+                    key=level.__getitem__)
+        if js:
+            jmin[pos] = level[js[0]]
+            j_targets.extend(js)
+        j_offsets.append(len(j_targets))
+
+    sparse = [array("i", range(n))]
+    width = 1
+    while 2 * width <= n:
+        prev = sparse[-1]
+        row = array("i", prev[:n - 2 * width + 1])
+        for i in range(len(row)):
+            b = prev[i + width]
+            if jmin[b] < jmin[row[i]]:
+                row[i] = b
+        sparse.append(row)
+        width *= 2
+    return csr, level, tin, size, jmin, j_offsets, j_targets, sparse
+
+
+def _climbing(prep, ranges: list[tuple[int, int]], x_level: int, out: list[int]):
+    """Add to out the targets of J edges from the position ranges to a node
+    no deeper than x_level. The range argmin search only stops at positions
+    with such an edge instead of walking the whole range."""
+    _, level, _, _, jmin, j_offsets, j_targets, sparse = prep
+    while ranges:
+        lo, hi = ranges.pop()
+        k = (hi - lo).bit_length() - 1
+        a, b = sparse[k][lo], sparse[k][hi - (1 << k)]
+        pos = a if jmin[a] <= jmin[b] else b
+        if jmin[pos] > x_level:
+            continue
+        if lo < pos:
+            ranges.append((lo, pos))
+        if pos + 1 < hi:
+            ranges.append((pos + 1, hi))
+        for e in range(j_offsets[pos], j_offsets[pos + 1]):
+            y = j_targets[e]
+            if level[y] > x_level:
+                break
+            out.append(y)
+
+
+def _frontier(prep, x: int) -> list[int]:
+    """Dominance frontier of x: the targets of J edges leaving its dominator
+    subtree for a node no deeper than x"""
+    tin, size = prep[2], prep[3]
+    found = []
+    _climbing(prep, [(tin[x], tin[x] + size[x])], prep[1][x], found)
+    return list(dict.fromkeys(found))
+
+
+def _walk(prep, x: int, walked_lo: list[int], walked_hi: list[int]) -> list[int]:
+    """The part of the frontier of x that the walks of one query have not
+    found yet. Those walks covered subtrees from roots at least as deep as
+    x, taking every J edge the walk from x would, so their position ranges
+    (walked_lo and walked_hi, sorted and disjoint as subtrees nest) are
+    skipped, and then replaced by the subtree of x."""
+    tin, size = prep[2], prep[3]
+    lo, hi = tin[x], tin[x] + size[x]
+    i = bisect_left(walked_lo, lo)
+    j = bisect_left(walked_lo, hi, i)
+    ranges = []
+    for k in range(i, j):
+        if lo < walked_lo[k]:
+            ranges.append((lo, walked_lo[k]))
+        lo = walked_hi[k]
+    if lo < hi:
+        ranges.append((lo, hi))
+    walked_lo[i:j] = [tin[x]]
+    walked_hi[i:j] = [hi]
+    found = []
+    _climbing(prep, ranges, prep[1][x], found)
+    return found
+
+
+def _idf_query(prep, defs: list[int], stamp: int, in_phi: list[int], is_def: list[int],
+               bank: list[list[int]], frontiers: list | None) -> list[int]:
+    """Piggybank walk for one set of definitions (preorder numbers): nodes
+    leave the bank deepest level first and add their frontier. With
+    frontiers, a frontier is computed the first time a node needs one and
+    kept there; without, every walk only looks at what no walk of this
+    query has covered yet, so each J edge is looked at once. The flag lists
+    hold the stamp of the query that last set them, so a batch can share
+    them without clearing."""
+    level = prep[1]
+    top = -1
+    for x in defs:
+        if is_def[x] != stamp:
+            is_def[x] = stamp
+            bank[level[x]].append(x)
+            top = max(top, level[x])
+
+    idf = []
+    walked_lo = []
+    walked_hi = []
+    while top >= 0:
+        if not bank[top]:
+            top -= 1
+            continue
+        root = bank[top].pop()
+        if frontiers is None:
+            df = _walk(prep, root, walked_lo, walked_hi)
+        else:
+            df = frontiers[root]
+            if df is None:
+                df = frontiers[root] = _frontier(prep, root)
+        for y in df:
+            if in_phi[y] != stamp:
+                in_phi[y] = stamp
+                idf.append(y)
+                if is_def[y] != stamp:
+                    bank[level[y]].append(y)
+    return idf
+
+
+def iterated_dominance_frontier(graph: any_graph_t, defs: Iterable[int], engine: str="auto") -> list[int]:
+    """Iterated dominance frontier of a set of nodes (where SSA construction
+    places phi functions for a variable defined in defs), computed on the DJ
+    graph without building any per node frontier, in time linear in the
+    graph
+
+    Args:
+        graph (any_graph_t): graph, start node first
+        defs (Iterable[int]): nodes, those not reachable from the start are ignored
+        engine (str): dominator engine, see compute_idoms
+
+    Returns:
+        the nodes of the iterated dominance frontier, sorted
+    """
+    return iterated_dominance_frontier_batch(graph, [defs], engine, share_frontiers=False)[0]
+
+
+def iterated_dominance_frontier_batch(graph: any_graph_t, def_sets: Iterable[Iterable[int]],
+                                      engine: str="auto", share_frontiers: bool=True) -> list[list[int]]:
+    """iterated_dominance_frontier for many variables on the same graph. The
+    dominator tree, levels and J edge tables are built once and shared by
+    every query.
+
+    With share_frontiers, so is the frontier of every node some query
+    reached, which pays off over many queries. Those are full dominance
+    frontiers though, quadratic in the graph at worst (nested repeat-until
+    loops, for one). Without, every query is linear in the graph, as
+    iterated_dominance_frontier.
 
+    Returns:
+        sorted iterated dominance frontier for every set in def_sets
+    """
+    prep = _idf_prep(graph, engine)
+    csr, level = prep[0], prep[1]
+    n = len(csr)
+    pre, rev = csr.index, csr.labels
+    in_phi = [-1] * n
+    is_def = [-1] * n
+    bank = [[] for _ in range(max(level) + 1)]
+    frontiers = [None] * n if share_frontiers else None
+    result = []
+    for stamp, defs in enumerate(def_sets):
+        idf = _idf_query(prep, [pre[x] for x in defs if x in pre], stamp, in_phi, is_def, bank, frontiers)
+        result.append(sorted(rev[y] for y in idf))
+    return result
@@ -1,24 +1,108 @@
-from src.lib.crawler_type import graph_t, lt_graph_t
-from src.lib.graph_utils import reverse_graph
-from src.lib.lengauer_tarjan import gen_lt_graph
+from __future__ import annotations
 
+from array import array
+from functools import partial
+from typing import Iterable
 
+try:
+    import numpy as np
+except ImportError:  # optional, only used to vectorize DominatorIndex batch queries
+    np = None
 
+from src.lib.cooper_harvey_kennedy import chk_idoms_csr
+from src.lib.crawler_type import graph_t, lt_graph_t, any_graph_t, CSRGraph, g_map_t
+from src.lib.graph_utils import preorder_csr
+from src.lib.lengauer_tarjan import gen_lt_graph, lt_idoms_csr
+from src.lib.semi_nca import semi_nca_idoms_csr
+from src.lib.tarjan_scc import get_condensation
 
-def get_dominator_tree(g: graph_t)->graph_t:
+IDOM_ENGINES = {
+    "lt": lt_idoms_csr,
+    "lt_balanced": partial(lt_idoms_csr, balanced=True),
+    "semi_nca": semi_nca_idoms_csr,
+    "chk": chk_idoms_csr,
+}
+
+# Above this many nodes "auto" switches from Semi-NCA to Lengauer-Tarjan. Semi-NCA
+# has the smaller constant factor at every size we measured (about 25% faster),
+# but its NCA walk is quadratic in the worst case, which only matters once the
+# graph is big enough for a deep dominator tree.
+AUTO_SEMI_NCA_MAX_NODES = 2048
+
+
+def pick_engine(num_nodes: int, num_edges: int) -> str:
+    """Engine "auto" uses for a reachable graph of this size.
+
+    A graph with exactly num_nodes - 1 edges is its own DFS tree, so the DFS
+    parents are the idoms and no engine has to run ("tree"). The iterative
+    Cooper-Harvey-Kennedy engine is never picked: on CPython it came out
+    slower than Semi-NCA on every size and density we measured.
+    """
+    if num_edges == num_nodes - 1:
+        return "tree"
+    if num_nodes <= AUTO_SEMI_NCA_MAX_NODES:
+        return "semi_nca"
+    return "lt"
+
+
+def idoms_csr(csr: CSRGraph, parent: array, engine: str="auto") -> array:
+    """Immediate dominators over a preorder numbered CSRGraph, with the
+    engine picked as compute_idoms does.
+
+    Args:
+        csr (CSRGraph): graph numbered in DFS preorder (see preorder_csr)
+        parent (array): DFS tree parent of every preorder number
+        engine (str): see compute_idoms
+
+    Returns:
+        array of immediate dominators by preorder number, -1 for the start node
+    """
+    if engine == "auto":
+        engine = pick_engine(len(csr), csr.num_edges)
+    if engine == "tree":
+        return array("i", parent)
+    if engine in IDOM_ENGINES:
+        return IDOM_ENGINES[engine](csr, parent)
+
+    raise ValueError(f"undefined engine {engine}")
+
+
+def compute_idoms(graph: any_graph_t, engine: str="auto") -> tuple[array, g_map_t, array]:
+    """Immediate dominators of every node reachable from the start node
+
+    Args:
+        graph (any_graph_t): graph, start node first
+        engine (str): "lt" (Lengauer-Tarjan), "lt_balanced" (with balanced
+            linking), "semi_nca", "chk"
+            (Cooper-Harvey-Kennedy) or "auto" to choose by size (see pick_engine)
+
+    Returns:
+        idoms by preorder number (-1 for the start node), pre (node -> preorder)
+        and rev (preorder -> node), as gen_lt_idoms
+    """
+    csr, parent = preorder_csr(graph)
+    return idoms_csr(csr, parent, engine), csr.index, csr.labels
+
+
+def get_dominator_tree(g: any_graph_t, engine: str="auto")->graph_t:
     """Given a graph, return the dominator tree for the graph
 
     Args:
-        g (graph_t): graph to transform
+        g (any_graph_t): graph to transform, graph_t or CSRGraph
+        engine (str): "nodal" for the LTNode based gen_lt_graph, otherwise
+            any compute_idoms engine
 
     Returns:
         graph_t object
     """
-    graph, pre, rev = gen_lt_graph(g)
-    start, _ = next(iter(g.items()))
+    if engine == "nodal":
+        graph, pre, rev = gen_lt_graph(g)
+
+        # rev is the mapping from pre-ordering of lt-graph to whatever ordering the original graph came in
+        return get_dominator_tree_from_nodal(graph, rev)
 
-    # rev is the mapping from pre-ordering of lt-graph to whatever ordering the original graph came in
-    return get_dominator_tree_from_nodal(graph, rev)
+    csr, parent = preorder_csr(g)
+    return get_dominator_tree_from_idoms(idoms_csr(csr, parent, engine), csr.labels)
 
 def get_dominator_tree_from_nodal(graph: lt_graph_t, rev: dict[int, int]=None):
     if rev is None:
@@ -37,6 +121,14 @@ def get_dominator_tree_from_nodal(graph: lt_graph_t, rev: dict[int, int]=None):
 
     return dom_tree
 
+def get_dominator_tree_from_idoms(idom: array, rev: array) -> graph_t:
+    """Dominator tree from an idom array in preorder numbering, keyed by the
+    original nodes in preorder like get_dominator_tree_from_nodal"""
+    dom_tree = {x: [] for x in rev}
+    for idx in range(1, len(idom)):
+        dom_tree[rev[idom[idx]]].append(rev[idx])
+    return dom_tree
+
 def get_dominance_frontier_from_nodal(graph: lt_graph_t)->graph_t:
     """Accepts a fat graph with idoms, preds and returns a graph_t
     with the dominance frontier in pre-order"""
@@ -56,8 +148,42 @@ def get_dominance_frontier_from_nodal(graph: lt_graph_t)->graph_t:
     return {x : list(v) for x, v in dom_frontier.items()}
 
 
-def get_dominance_frontier(g:graph_t, return_orig_number=True
+def get_dominance_frontier_from_idoms(csr: CSRGraph, idom: array) -> list[list[int]]:
+    """Same walk as get_dominance_frontier_from_nodal over a preorder CSRGraph
+    and idom array. Everything a node adds is added in one go, so comparing
+    with the last entry is enough to avoid duplicates.
+
+    Returns:
+        dominance frontier of every preorder number
+    """
+    pred_offsets, pred_sources = csr.pred_offsets, csr.pred_sources
+    dom_frontier = [[] for _ in range(len(csr))]
+    for idx in range(len(csr)):
+        lo, hi = pred_offsets[idx], pred_offsets[idx + 1]
+        if idx == 0 or hi - lo >= 2:  # another node may loop back to root
+            idom_idx = idom[idx]
+            for e in range(lo, hi):
+                curr_idx = pred_sources[e]
+                while curr_idx != idom_idx:
+                    df = dom_frontier[curr_idx]
+                    if df and df[-1] == idx:
+                        break
+                    df.append(idx)
+                    curr_idx = idom[curr_idx]
+
+    return dom_frontier
+
+
+def get_dominance_frontier(g:any_graph_t, return_orig_number=True, engine: str="auto"
                            )->graph_t:
+    if engine != "nodal":
+        csr, parent = preorder_csr(g)
+        dom_frontier = get_dominance_frontier_from_idoms(csr, idoms_csr(csr, parent, engine))
+        if return_orig_number:
+            rev = csr.labels
+            return {rev[x]: [rev[z] for z in y] for x, y in enumerate(dom_frontier)}
+        return dict(enumerate(dom_frontier))
+
     graph, pre, rev = gen_lt_graph(g)
     dom_frontier = get_dominance_frontier_from_nodal(graph)
 
@@ -67,10 +193,303 @@ def get_dominance_frontier(g:graph_t, return_orig_number=True
         return dom_frontier
 
 
-def get_post_dominance_frontier(g: graph_t)-> graph_t:
-    z = -1
-    g_z = {k:v if v else [-1] for k,v in g} | {z: []}
-    g_z = reverse_graph(g_z)
-    graph_z, pre, rev = lt_graph_t(g_z)
-    df = get_dominance_frontier_from_nodal(graph_z)
-    return {x:v for x, v in df if x != z}
+# label of the virtual exit node the post-dominator functions add
+VIRTUAL_EXIT = -1
+
+
+def reverse_preorder_csr(g: any_graph_t, exit_node: int=VIRTUAL_EXIT) -> tuple[CSRGraph, array]:
+    """preorder_csr of the reverse graph, rooted at a virtual exit node.
+
+    The virtual exit gets an edge from every node without successors. Nodes
+    that cannot reach any of those (infinite loops and whatever only leads
+    into them) are connected through one node of every strongly connected
+    component they end in, so every node gets a post-dominator. The DFS runs
+    straight over the predecessor lists of the CSR form, no reversed graph is
+    built first.
+
+    Args:
+        g (any_graph_t): graph, start node first
+        exit_node (int): label for the virtual exit, must not be a node of g
+
+    Returns:
+        CSRGraph of the reverse graph in preorder (index 0 is the virtual exit,
+        whose successors are the exits and the connected loop nodes) and the
+        DFS tree parent of every preorder number (-1 for the exit)
+    """
+    csr = g if isinstance(g, CSRGraph) else CSRGraph.from_graph(g)
+    if exit_node in csr.index:
+        raise ValueError(f"exit node {exit_node} is already in the graph")
+    n = len(csr)
+    offsets, labels = csr.offsets, csr.labels
+    pred_offsets, pred_sources = csr.pred_offsets, csr.pred_sources
+
+    # preorder numbers start at 1, the virtual exit is 0
+    pre_of = array("i", [-1]) * n
+    parent = array("i", [-1])
+    visited = []
+    exit_succs = []
+
+    def dfs(root: int):
+        stack = [root]
+        stack_parent = [0]
+        while stack:
+            node = stack.pop()
+            p = stack_parent.pop()
+            if pre_of[node] == -1:
+                i = pre_of[node] = len(visited) + 1
+                visited.append(node)
+                parent.append(p)
+                for e in range(pred_offsets[node + 1] - 1, pred_offsets[node] - 1, -1):
+                    pred = pred_sources[e]
+                    if pre_of[pred] == -1:
+                        stack.append(pred)
+                        stack_parent.append(i)
+
+    for node in range(n):
+        if offsets[node] == offsets[node + 1]:
+            exit_succs.append(node)
+            dfs(node)
+
+    if len(visited) < n:
+        # what is left is closed under successors, so it holds whole strongly
+        # connected components; the ones with no way out are the infinite loops
+        cond = get_condensation(csr)
+        dag_offsets = cond.dag.offsets
+        for c in range(len(cond)):
+            # the first node of a component is the one Tarjan's DFS reached
+            # last, the loop latch
+            latch = cond.nodes[cond.offsets[c]]
+            if pre_of[latch] == -1 and dag_offsets[c] == dag_offsets[c + 1]:
+                exit_succs.append(latch)
+                dfs(latch)
+
+    new_offsets = array("i", [0, len(exit_succs)])
+    new_targets = array("i", (pre_of[x] for x in exit_succs))
+    for node in visited:
+        new_targets.extend(pre_of[pred] for pred in pred_sources[pred_offsets[node]:pred_offsets[node + 1]])
+        new_offsets.append(len(new_targets))
+    rev = array("q", [exit_node])
+    rev.extend(labels[node] for node in visited)
+    return CSRGraph(rev, new_offsets, new_targets), parent
+
+
+def compute_ipdoms(graph: any_graph_t, engine: str="auto", exit_node: int=VIRTUAL_EXIT
+                   ) -> tuple[array, g_map_t, array]:
+    """Immediate post-dominators of every node, with a virtual exit node (see
+    reverse_preorder_csr)
+
+    Args:
+        graph (any_graph_t): graph, start node first
+        engine (str): dominator engine, see compute_idoms
+        exit_node (int): label for the virtual exit
+
+    Returns:
+        ipdoms by preorder number of the reverse graph (-1 for the exit), pre
+        and rev as compute_idoms, with the exit as preorder number 0
+    """
+    csr, parent = reverse_preorder_csr(graph, exit_node)
+    return idoms_csr(csr, parent, engine), csr.index, csr.labels
+
+
+def get_post_dominator_tree(g: any_graph_t, engine: str="auto", exit_node: int=VIRTUAL_EXIT) -> graph_t:
+    """Post-dominator tree, rooted at the virtual exit node exit_node"""
+    csr, parent = reverse_preorder_csr(g, exit_node)
+    return get_dominator_tree_from_idoms(idoms_csr(csr, parent, engine), csr.labels)
+
+
+def get_post_dominance_frontier(g: any_graph_t, engine: str="auto", exit_node: int=VIRTUAL_EXIT) -> graph_t:
+    """Post-dominance frontier of every node of g: the nodes with one
+    successor it post-dominates and one it does not (the virtual exit is
+    left out)"""
+    csr, parent = reverse_preorder_csr(g, exit_node)
+    rev = csr.labels
+    pdf = get_dominance_frontier_from_idoms(csr, idoms_csr(csr, parent, engine))
+    return {rev[x]: [rev[z] for z in y] for x, y in enumerate(pdf) if x != 0}
+
+
+def get_control_dependence_graph(g: any_graph_t, engine: str="auto", exit_node: int=VIRTUAL_EXIT) -> graph_t:
+    """Control dependence graph: y is listed under x when x decides whether y
+    runs (x is in the post-dominance frontier of y). Nodes that always run
+    depend on nothing.
+
+    Returns:
+        graph_t over the nodes of g, successors in post-dominator tree preorder
+    """
+    csr, parent = reverse_preorder_csr(g, exit_node)
+    rev = csr.labels
+    pdf = get_dominance_frontier_from_idoms(csr, idoms_csr(csr, parent, engine))
+    cdg = [[] for _ in range(len(csr))]
+    for y in range(1, len(csr)):
+        for x in pdf[y]:
+            cdg[x].append(y)
+    return {rev[x]: [rev[y] for y in ys] for x, ys in enumerate(cdg) if x != 0}
+
+
+class DominatorIndex:
+    """Constant time dominance queries on a dominator tree.
+
+    Numbers the dominator tree in preorder so that a dominates b exactly when
+    tin[a] <= tin[b] <= tout[a], and answers nearest common dominator queries
+    with a sparse table over the Euler tour of the tree (O(n log n) to build,
+    O(1) per query). Per node data is stored by Lengauer-Tarjan preorder number
+    in arrays; queries take and return original nodes.
+
+    Build it from gen_lt_graph output with from_lt_graph, from any graph with
+    from_graph, or directly from an idom array and the pre/rev maps. Nodes
+    that are unreachable from the start node raise KeyError.
+    """
+    __slots__ = ("pre", "rev", "idom", "tin", "tout", "depth_of", "size", "first", "sparse", "_np")
+
+    def __init__(self, idom: Iterable[int], pre: g_map_t, rev):
+        self.pre = pre
+        self.idom = idom = array("i", idom)
+        n = len(idom)
+        # rev may be the dict from gen_lt_graph or the array from compute_idoms
+        self.rev = array("q", (rev[i] for i in range(n)))
+
+        # idom[v] < v in preorder, so sizes and depths need no tree walk
+        size = [1] * n
+        for v in range(n - 1, 0, -1):
+            size[idom[v]] += size[v]
+        depth = [0] * n
+        for v in range(1, n):
+            depth[v] = depth[idom[v]] + 1
+
+        children = [[] for _ in range(n)]
+        for v in range(1, n):
+            children[idom[v]].append(v)
+
+        # dominator tree preorder and Euler tour in one iterative walk
+        tin = [0] * n
+        first = [0] * n
+        euler = []
+        if n:
+            stack = [0]
+            cursor = [0] * n
+            tin[0] = 0
+            counter = 1
+            euler.append(0)
+            while stack:
+                v = stack[-1]
+                if cursor[v] < len(children[v]):
+                    c = children[v][cursor[v]]
+                    cursor[v] += 1
+                    tin[c] = counter
+                    counter += 1
+                    first[c] = len(euler)
+                    euler.append(c)
+                    stack.append(c)
+                else:
+                    stack.pop()
+                    if stack:
+                        euler.append(stack[-1])
+
+        # sparse[k][i] is the shallowest node of euler[i:i + 2**k]
+        sparse = [array("i", euler)]
+        k = 1
+        while (1 << k) <= len(euler):
+            prev = sparse[-1]
+            half = 1 << (k - 1)
+            row = array("i", prev[:len(euler) - (1 << k) + 1])
+            for i in range(len(row)):
+                b = prev[i + half]
+                if depth[b] < depth[row[i]]:
+                    row[i] = b
+            sparse.append(row)
+            k += 1
+
+        self.tin = array("i", tin)
+        self.size = array("i", size)
+        self.tout = array("i", (t + s - 1 for t, s in zip(tin, size)))
+        self.depth_of = array("i", depth)
+        self.first = array("i", first)
+        self.sparse = sparse
+        self._np = None
+
+    @classmethod
+    def from_lt_graph(cls, graph: lt_graph_t, pre: g_map_t, rev: g_map_t) -> DominatorIndex:
+        """Build from the output of gen_lt_graph"""
+        return cls((-1 if node["idom"] is None else node["idom"] for node in graph.values()), pre, rev)
+
+    @classmethod
+    def from_graph(cls, g: any_graph_t, engine: str="auto") -> DominatorIndex:
+        return cls(*compute_idoms(g, engine=engine))
+
+    def dominates(self, a: int, b: int) -> bool:
+        i, j = self.pre[a], self.pre[b]
+        return self.tin[i] <= self.tin[j] <= self.tout[i]
+
+    def strictly_dominates(self, a: int, b: int) -> bool:
+        return a != b and self.dominates(a, b)
+
+    def depth(self, a: int) -> int:
+        """Depth in the dominator tree, 0 for the start node"""
+        return self.depth_of[self.pre[a]]
+
+    def subtree_size(self, a: int) -> int:
+        """Number of nodes a dominates, itself included"""
+        return self.size[self.pre[a]]
+
+    def immediate_dominator(self, a: int) -> int | None:
+        d = self.idom[self.pre[a]]
+        return None if d == -1 else self.rev[d]
+
+    def _lca(self, i: int, j: int) -> int:
+        l, r = self.first[i], self.first[j]
+        if l > r:
+            l, r = r, l
+        k = (r - l + 1).bit_length() - 1
+        row = self.sparse[k]
+        x, y = row[l], row[r - (1 << k) + 1]
+        return x if self.depth_of[x] <= self.depth_of[y] else y
+
+    def nearest_common_dominator(self, a: int, b: int) -> int:
+        """Deepest node dominating both a and b (their LCA in the dominator tree)"""
+        return self.rev[self._lca(self.pre[a], self.pre[b])]
+
+    def dominates_batch(self, pairs):
+        """dominates for every (a, b) row of pairs. A NumPy (k, 2) array is
+        answered vectorized and gives a boolean array, anything else a list."""
+        if np is not None and isinstance(pairs, np.ndarray):
+            tin, tout, idx = self._numpy()
+            i, j = idx(pairs[:, 0]), idx(pairs[:, 1])
+            return (tin[i] <= tin[j]) & (tin[j] <= tout[i])
+        return [self.dominates(a, b) for a, b in pairs]
+
+    def nearest_common_dominator_batch(self, pairs):
+        """nearest_common_dominator for every (a, b) row of pairs, vectorized
+        for NumPy arrays like dominates_batch"""
+        if np is not None and isinstance(pairs, np.ndarray):
+            _, _, idx = self._numpy()
+            first = np.frombuffer(self.first, dtype=np.int32)
+            depth = np.frombuffer(self.depth_of, dtype=np.int32)
+            f1, f2 = first[idx(pairs[:, 0])], first[idx(pairs[:, 1])]
+            l, r = np.minimum(f1, f2), np.maximum(f1, f2)
+            k = np.frexp(r - l + 1)[1] - 1
+            x = np.empty(len(l), dtype=np.int32)
+            y = np.empty(len(l), dtype=np.int32)
+            for level in np.unique(k):
+                sel = k == level
+                row = np.frombuffer(self.sparse[level], dtype=np.int32)
+                x[sel] = row[l[sel]]
+                y[sel] = row[r[sel] - (1 << int(level)) + 1]
+            lca = np.where(depth[x] <= depth[y], x, y)
+            return np.frombuffer(self.rev, dtype=np.int64)[lca]
+        return [self.nearest_common_dominator(a, b) for a, b in pairs]
+
+    def _numpy(self):
+        """tin/tout as NumPy arrays and a vectorized node -> preorder lookup, built once"""
+        if self._np is None:
+            labels = np.frombuffer(self.rev, dtype=np.int64)
+            order = np.argsort(labels, kind="stable")
+            sorted_labels = labels[order]
+
+            def idx(nodes):
+                pos = np.searchsorted(sorted_labels, nodes)
+                pos = np.minimum(pos, len(sorted_labels) - 1)
+                if not np.array_equal(sorted_labels[pos], nodes):
+                    raise KeyError("node not reachable from the start node")
+                return order[pos]
+
+            self._np = (np.frombuffer(self.tin, dtype=np.int32), np.frombuffer(self.tout, dtype=np.int32), idx)
+        return self._np
@@ -0,0 +1,328 @@
+"""
+Dominator tree (and optionally dominance frontier) maintained under edge
+insertion and deletion.
+
+Insertions between reachable nodes use depth based search: with c the nearest
+common dominator of the edge's endpoints, exactly the nodes w deeper than
+depth(c) + 1 that y reaches on a path never shallower than w change, and
+their new idom is c. An insertion that makes nodes reachable computes their
+idoms on the newly reachable part alone, then replays its edges back into the
+graph as ordinary insertions. Deletions only affect the dominator subtree of
+idom(y), or of a slightly higher node when nodes get cut off, and that subtree
+is recomputed on the subgraph it induces.
+
+Ref: Loukas Georgiadis, Giuseppe F. Italiano, Luigi Laura and Federico Santaroni.
+2012. An Experimental Study of Dynamic Dominators. ESA 2012.
+G. Ramalingam and Thomas Reps. 1994. An Incremental Algorithm for Maintaining
+the Dominator Tree of a Reducible Flowgraph. POPL '94.
+"""
+import heapq
+
+from src.lib.crawler_type import graph_t
+from src.lib.dominator import compute_idoms
+from src.lib.lengauer_tarjan import gen_lt_graph
+
+
+class DynamicDominators:
+    """Dominator tree of a graph that gains and loses edges.
+
+    Seeded from gen_lt_graph. idom, depth and children only hold nodes
+    reachable from the start node; the graph itself (succs and preds) holds
+    every node seen so far. With track_frontier the dominance frontier is
+    kept up to date as well, together with its inverse (which nodes have w in
+    their frontier) so entries can be withdrawn without a full scan.
+    """
+    __slots__ = ("start", "succs", "preds", "idom", "depth", "children", "df", "df_inv")
+
+    def __init__(self, graph: graph_t, track_frontier: bool=False):
+        self.start = next(iter(graph))
+        self.succs = {node: list(succs) for node, succs in graph.items()}
+        self.preds = {node: [] for node in self.succs}
+        for node, succs in graph.items():
+            for s in succs:
+                self.succs.setdefault(s, [])
+                self.preds.setdefault(s, []).append(node)
+
+        lt_graph, pre, rev = gen_lt_graph(graph)
+        self.idom = {rev[idx]: None if node["idom"] is None else rev[node["idom"]]
+                     for idx, node in lt_graph.items()}
+        self.children = {node: set() for node in self.idom}
+        self.depth = {}
+        for idx in range(len(lt_graph)):
+            node = rev[idx]
+            d = self.idom[node]
+            # idoms come before their nodes in preorder
+            self.depth[node] = 0 if d is None else self.depth[d] + 1
+            if d is not None:
+                self.children[d].add(node)
+
+        self.df = None
+        self.df_inv = None
+        if track_frontier:
+            self.df = {node: set() for node in self.idom}
+            self.df_inv = {node: set() for node in self.idom}
+            for w in self.idom:
+                self._add_frontier_of(w)
+
+    def reachable(self, node: int) -> bool:
+        return node in self.depth
+
+    def dominates(self, a: int, b: int) -> bool:
+        """Walks up from b, O(depth(b) - depth(a))"""
+        if b not in self.depth or a not in self.depth:
+            return False
+        while self.depth[b] > self.depth[a]:
+            b = self.idom[b]
+        return a == b
+
+    def nearest_common_dominator(self, a: int, b: int) -> int:
+        depth, idom = self.depth, self.idom
+        while a != b:
+            if depth[a] >= depth[b]:
+                a = idom[a]
+            else:
+                b = idom[b]
+        return a
+
+    def dominator_tree(self) -> graph_t:
+        return {node: sorted(children) for node, children in self.children.items()}
+
+    def dominance_frontier(self) -> graph_t:
+        if self.df is None:
+            raise ValueError("dominance frontier is not tracked (use track_frontier=True)")
+        return {node: sorted(frontier) for node, frontier in self.df.items()}
+
+    def insert_edge(self, u: int, v: int) -> set[int]:
+        """Add the edge u -> v and update the dominator tree.
+
+        Returns:
+            nodes whose immediate dominator changed (including nodes that just
+            became reachable)
+        """
+        for node in (u, v):
+            if node not in self.succs:
+                self.succs[node] = []
+                self.preds[node] = []
+        if v in self.succs[u]:
+            return set()
+        self.succs[u].append(v)
+        self.preds[v].append(u)
+
+        if u not in self.depth:
+            # edges out of unreachable nodes change nothing
+            return set()
+        if v not in self.depth:
+            return self._attach(u, v)
+
+        c = self.nearest_common_dominator(u, v)
+        if c == v or c == self.idom[v]:
+            self._update_frontier(set(), v)
+            return set()
+
+        affected = self._depth_based_search(v, self.depth[c])
+        for w in affected:
+            self._set_idom(w, c)
+        return self._finish(affected, v)
+
+    def delete_edge(self, u: int, v: int) -> set[int]:
+        """Remove the edge u -> v and update the dominator tree.
+
+        Returns:
+            nodes whose immediate dominator changed (including nodes that are
+            no longer reachable)
+        """
+        if u not in self.succs or v not in self.succs[u]:
+            raise ValueError(f"edge {u} -> {v} not in graph")
+
+        if u not in self.depth:
+            self.succs[u].remove(v)
+            self.preds[v].remove(u)
+            return set()
+        if self.dominates(v, u):
+            # a back edge: every path over it has a shorter one without it
+            self.succs[u].remove(v)
+            self.preds[v].remove(u)
+            self._update_frontier(set(), v)
+            return set()
+
+        self.succs[u].remove(v)
+        self.preds[v].remove(u)
+        return self._recompute_subtree(self.idom[v], v, u)
+
+    def _depth_based_search(self, y: int, nca_depth: int) -> list[int]:
+        """Nodes whose idom becomes the nearest common dominator after adding an
+        edge into y. Candidates are handled deepest first; from each one the
+        search runs through deeper nodes, and shallower ones (still below the
+        nca's children) become candidates themselves."""
+        depth, succs = self.depth, self.succs
+        visited = {y}
+        heap = [(-depth[y], y)]
+        affected = []
+        while heap:
+            _, z = heapq.heappop(heap)
+            affected.append(z)
+            z_depth = depth[z]
+            stack = [z]
+            while stack:
+                for w in succs[stack.pop()]:
+                    if w in visited:
+                        continue
+                    d = depth[w]
+                    if d > z_depth:
+                        visited.add(w)
+                        stack.append(w)
+                    elif d > nca_depth + 1:
+                        visited.add(w)
+                        heapq.heappush(heap, (-d, w))
+        return affected
+
+    def _recompute_subtree(self, i: int, y: int, u: int) -> set[int]:
+        """After deleting u -> y with i = idom(y): as long as y stays reachable
+        only nodes dominated by i can change. Every edge into that subtree from
+        outside ends at i, so its dominators follow from the subgraph it
+        induces, rooted at i. If y is cut off, the nodes that stay reachable but
+        lose a path through the cut part all sit below the nearest common
+        dominator of u and the successors of the cut part, and the same is
+        done for that subtree."""
+        subtree, idom, pre, rev = self._subtree_idoms(i)
+        if y not in pre:
+            lost = {a for a in subtree if a not in pre}
+            top = u
+            for a in lost:
+                for s in self.succs[a]:
+                    if s not in lost:
+                        top = self.nearest_common_dominator(top, s)
+            if top != i:
+                subtree, idom, pre, rev = self._subtree_idoms(top)
+
+        changed = set()
+        gone = set()
+        for a in subtree[1:]:
+            if a not in pre:
+                gone.add(a)
+                continue
+            d = rev[idom[pre[a]]]
+            if self.idom[a] != d:
+                self._set_idom(a, d)
+                changed.add(a)
+        if not gone:
+            return self._finish(changed, y)
+
+        for a in gone:
+            old = self.idom.pop(a)
+            if old not in gone:
+                self.children[old].discard(a)
+            del self.depth[a]
+            del self.children[a]
+        if self.df is not None:
+            for a in gone:
+                for w in self.df.pop(a):
+                    if w not in gone:
+                        self.df_inv[w].discard(a)
+                for v in self.df_inv.pop(a):
+                    if v not in gone:
+                        self.df[v].discard(a)
+        # successors of dropped nodes lost a predecessor
+        lost_pred = {s for a in gone for s in self.succs[a] if s not in gone}
+        return self._finish(changed, y, lost_pred) | gone
+
+    def _subtree_idoms(self, i: int):
+        subtree = [i]
+        for a in subtree:
+            subtree.extend(self.children[a])
+        inside = set(subtree)
+        aux = {a: [s for s in self.succs[a] if s in inside] for a in subtree}
+        return (subtree, *compute_idoms(aux))
+
+    def _attach(self, u: int, v: int) -> set[int]:
+        """u -> v made v reachable. No reachable node had an edge into the newly
+        reachable part, so every path into it enters over u -> v and stays
+        inside; its idoms follow from the part alone, rooted at u. Edges from it
+        back into the old graph are then replayed as ordinary insertions."""
+        new = [v]
+        inside = {v}
+        for a in new:
+            for s in self.succs[a]:
+                if s not in inside and s not in self.depth:
+                    inside.add(s)
+                    new.append(s)
+        pending = []
+        aux = {u: [v]}
+        for a in new:
+            succs = self.succs[a]
+            aux[a] = [s for s in succs if s in inside]
+            for s in succs:
+                if s not in inside:
+                    pending.append((a, s))
+        # hide the edges out of the new part until they are replayed
+        for a, s in pending:
+            self.succs[a].remove(s)
+            self.preds[s].remove(a)
+
+        idom, pre, rev = compute_idoms(aux)
+        for a in new:
+            self.idom[a] = None
+            self.children[a] = set()
+            if self.df is not None:
+                self.df[a] = set()
+                self.df_inv[a] = set()
+        for a in new:
+            d = rev[idom[pre[a]]]
+            self.idom[a] = d
+            self.children[d].add(a)
+        changed = self._finish(new, v)
+        for a, s in pending:
+            changed |= self.insert_edge(a, s)
+        return changed
+
+    def _set_idom(self, w: int, new_idom: int):
+        self.children[self.idom[w]].discard(w)
+        self.children[new_idom].add(w)
+        self.idom[w] = new_idom
+
+    def _finish(self, changed, y: int, lost_pred: set[int]=frozenset()) -> set[int]:
+        """Fix depths below the changed nodes, then the frontier"""
+        changed = set(changed)
+        depth, idom, children = self.depth, self.idom, self.children
+        moved = set()
+        stack = [w for w in changed if idom[w] not in changed]
+        while stack:
+            w = stack.pop()
+            moved.add(w)
+            depth[w] = depth[idom[w]] + 1
+            stack.extend(children[w])
+        self._update_frontier(moved, y, lost_pred)
+        return changed
+
+    def _update_frontier(self, moved: set[int], y: int, lost_pred: set[int]=frozenset()):
+        """moved holds every node whose set of dominators changed. Only frontier
+        entries for y, for moved nodes, or for nodes with a moved predecessor
+        can change; withdraw those and run the usual runner walk for them again."""
+        if self.df is None:
+            return
+        targets = moved | lost_pred
+        if y in self.depth:
+            targets.add(y)
+        for m in moved:
+            targets.update(self.succs[m])
+        for w in targets:
+            for v in self.df_inv[w]:
+                self.df[v].discard(w)
+            self.df_inv[w] = set()
+        for w in targets:
+            self._add_frontier_of(w)
+
+    def _add_frontier_of(self, w: int):
+        """Add w to the frontier of every node between its reachable
+        predecessors and its idom (the walk in get_dominance_frontier_from_nodal)"""
+        preds = [p for p in self.preds[w] if p in self.depth]
+        if w != self.start and len(preds) < 2:
+            return
+        stop = self.idom[w]
+        for p in preds:
+            while p != stop:
+                if w in self.df[p]:
+                    break
+                self.df[p].add(w)
+                self.df_inv[w].add(p)
+                p = self.idom[p]
@@ -1,7 +1,9 @@
-from src.lib.crawler_type import graph_t, order_t
+from array import array
 
+from src.lib.crawler_type import graph_t, order_t, CSRGraph, any_graph_t
 
-def dfs_pre_order_traversal(graph: graph_t) -> order_t:
+
+def dfs_pre_order_traversal(graph: any_graph_t) -> order_t:
     """Perform depth first search and return post-order ordering
 
     Args:
@@ -10,23 +12,46 @@ def dfs_pre_order_traversal(graph: graph_t) -> order_t:
     Returns:
         ordering type
     """
+    if isinstance(graph, CSRGraph):
+        return _dfs_pre_order_csr(graph)
+
     start, children = next(iter(graph.items()))
     visited = []
+    seen = set()
     stack = [start]
 
     while stack:
         node = stack.pop()
-        if node not in visited:
+        if node not in seen:
+            seen.add(node)
             visited.append(node)
             # in case there is an order on siblings
             for child in reversed(graph[node]):
-                if child not in visited:
+                if child not in seen:
                     stack.append(child)
 
     return tuple(visited)
 
 
-def dfs_post_order_traversal(graph: graph_t)->order_t:
+def _dfs_pre_order_csr(graph: CSRGraph) -> order_t:
+    offsets, targets, labels = graph.offsets, graph.targets, graph.labels
+    seen = bytearray(len(graph))
+    order = []
+    stack = [0]
+
+    while stack:
+        node = stack.pop()
+        if not seen[node]:
+            seen[node] = 1
+            order.append(labels[node])
+            for e in range(offsets[node + 1] - 1, offsets[node] - 1, -1):
+                if not seen[targets[e]]:
+                    stack.append(targets[e])
+
+    return tuple(order)
+
+
+def dfs_post_order_traversal(graph: any_graph_t)->order_t:
     """Perform post order traversal
 
     Args:
@@ -36,29 +61,129 @@ def dfs_post_order_traversal(graph: graph_t)->order_t:
         order_t tuple of nodes
 
     """
+    if isinstance(graph, CSRGraph):
+        return _dfs_post_order_csr(graph)
+
     start, children = next(iter(graph.items()))
     stack = [start]
     processing = {g: 0 for g, _ in graph.items()} # points to index of processed child
+    # a node is pushed at most once: everything discovered is either
+    # still on the stack or already in visited
+    seen = {start}
     visited = []
 
     while stack:
         curr = stack[-1] # peek
-        children = graph.get(curr)
+        children = graph[curr]
         if len(children) > processing[curr]:
             # a child has not been processed
             curr_child = children[processing[curr]]
-            if curr_child not in stack:
-                stack.append(children[processing[curr]])
+            if curr_child not in seen:
+                seen.add(curr_child)
+                stack.append(curr_child)
             processing[curr] += 1
         else:
             # all children processed
-            if curr not in visited:
-                visited.append(curr)
+            visited.append(curr)
             stack.pop()
 
     return tuple(visited)
 
-def reverse_graph(g: graph_t)->graph_t:
+
+def _dfs_post_order_csr(graph: CSRGraph) -> order_t:
+    offsets, targets, labels = graph.offsets, graph.targets, graph.labels
+    seen = bytearray(len(graph))
+    # position of the next edge to look at for every node on the stack
+    edge = array("i", offsets)
+    order = []
+    stack = [0]
+    seen[0] = 1
+
+    while stack:
+        curr = stack[-1] # peek
+        if edge[curr] < offsets[curr + 1]:
+            child = targets[edge[curr]]
+            edge[curr] += 1
+            if not seen[child]:
+                seen[child] = 1
+                stack.append(child)
+        else:
+            order.append(labels[curr])
+            stack.pop()
+
+    return tuple(order)
+
+
+def preorder_csr(g: any_graph_t) -> tuple[CSRGraph, array]:
+    """Renumber the part of g reachable from its start node in DFS preorder.
+
+    The DFS is the one init_lt and dfs_pre_order_traversal use, so index i of
+    the result is the node init_lt numbers i. This is the common input of the
+    array based dominator engines.
+
+    Args:
+        g (any_graph_t): graph, start node first
+
+    Returns:
+        CSRGraph in preorder numbering (labels maps preorder -> node, index maps
+        node -> preorder) and the DFS tree parent of every preorder number
+        (-1 for the start node)
+    """
+    # the stack carries the preorder number of the node that pushed each entry;
+    # the first pop of a node is its latest push, so that is its DFS parent
+    stack = [0 if isinstance(g, CSRGraph) else next(iter(g))]
+    stack_parent = [-1]
+    parent = array("i")
+    visited = []
+
+    if isinstance(g, CSRGraph):
+        offsets, targets, labels = g.offsets, g.targets, g.labels
+        pre_of = array("i", [-1]) * len(g)
+        while stack:
+            node = stack.pop()
+            p = stack_parent.pop()
+            if pre_of[node] == -1:
+                i = pre_of[node] = len(visited)
+                visited.append(node)
+                parent.append(p)
+                for e in range(offsets[node + 1] - 1, offsets[node] - 1, -1):
+                    child = targets[e]
+                    if pre_of[child] == -1:
+                        stack.append(child)
+                        stack_parent.append(i)
+
+        new_offsets = array("i", [0])
+        new_targets = array("i")
+        for node in visited:
+            new_targets.extend(pre_of[c] for c in targets[offsets[node]:offsets[node + 1]])
+            new_offsets.append(len(new_targets))
+        return CSRGraph(array("q", (labels[node] for node in visited)), new_offsets, new_targets), parent
+
+    pre = {}
+    while stack:
+        node = stack.pop()
+        p = stack_parent.pop()
+        if node not in pre:
+            i = pre[node] = len(visited)
+            visited.append(node)
+            parent.append(p)
+            for child in reversed(g[node]):
+                if child not in pre:
+                    stack.append(child)
+                    stack_parent.append(i)
+
+    new_offsets = array("i", [0])
+    new_targets = array("i")
+    for node in visited:
+        new_targets.extend(pre[c] for c in g[node])
+        new_offsets.append(len(new_targets))
+    return CSRGraph(array("q", visited), new_offsets, new_targets, pre), parent
+
+
+def reverse_graph(g: any_graph_t)->any_graph_t:
+    if isinstance(g, CSRGraph):
+        return _reverse_csr(g)
+
     start, _ = next(iter(g.items()))
     new_graph = {start: []}
     found_root = False
@@ -77,7 +202,33 @@ def reverse_graph(g: graph_t)->graph_t:
             new_graph = {node: []} | new_graph
     return new_graph
 
-def get_preds(g: graph_t)->graph_t:
+
+def _reverse_csr(g: CSRGraph) -> CSRGraph:
+    offsets = g.offsets
+    exits = [i for i in range(len(g)) if offsets[i] == offsets[i + 1]]
+    if len(exits) > 1:
+        raise ValueError("Cannot reverse a graph with multiple end nodes")
+
+    # the exit (if any) becomes index 0, everything else keeps its relative order
+    order = exits + [i for i in range(len(g)) if not exits or i != exits[0]]
+    new_idx = array("i", bytes(4 * len(g)))
+    for i, old in enumerate(order):
+        new_idx[old] = i
+
+    pred_offsets, pred_sources = g.pred_offsets, g.pred_sources
+    new_offsets = array("i", [0])
+    new_targets = array("i")
+    for old in order:
+        new_targets.extend(new_idx[s] for s in pred_sources[pred_offsets[old]:pred_offsets[old + 1]])
+        new_offsets.append(len(new_targets))
+
+    return CSRGraph(array("q", (g.labels[old] for old in order)), new_offsets, new_targets)
+
+
+def get_preds(g: any_graph_t)->graph_t:
+    if isinstance(g, CSRGraph):
+        return g.to_preds()
+
     start, _ = next(iter(g.items()))
     new_graph = {start: []}
     for node, ancestors in g.items():
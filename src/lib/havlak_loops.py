@@ -0,0 +1,139 @@
+"""
+ref: "Nesting of Reducible and Irreducible Loops" -Havlak.
+https://dl.acm.org/doi/10.1145/262004.262005
+ref: "Identifying Loops In Almost Linear Time" -Ramalingam.
+https://dl.acm.org/doi/10.1145/316686.316687
+
+Havlak's loop nesting forest. Nodes are taken in reverse DFS preorder; a node
+with retreating edges into it heads a loop, whose body is what reaches the
+edge sources backwards inside its DFS subtree. Each loop is collapsed into
+its header (union-find), so enclosing loops see it as a single node. The
+nested loops of a header come out the same as in identify_loops for
+reducible graphs, but an irreducible loop is headed by its first node in
+preorder, with no dominator tree needed.
+
+Havlak hands every edge entering a loop other than at its header up to the
+header, and on to each enclosing loop in turn, which Ramalingam showed to be
+quadratic. Here an edge y -> x is kept back until the walk reaches the
+nearest common DFS ancestor of y and x: below it the edge only makes the
+loops around x irreducible, which a minimum over the collapsed sets tells,
+and from there on it is an ordinary edge of the loop holding both ends.
+"""
+from array import array
+
+from src.lib.crawler_type import any_graph_t, LoopForest, LoopKind
+from src.lib.graph_utils import preorder_csr
+
+
+def get_loop_forest(graph: any_graph_t) -> LoopForest:
+    """Loop nesting forest of the part of graph reachable from its start node
+
+    Args:
+        graph (any_graph_t): graph, start node first
+
+    Returns:
+        LoopForest with per node loop depth, innermost header and loop kind
+    """
+    csr, parent = preorder_csr(graph)
+    n = len(csr)
+    pred_offsets, pred_sources = csr.pred_offsets, csr.pred_sources
+
+    # last preorder number in the DFS subtree of each node
+    last = list(range(n))
+    for i in range(n - 1, 0, -1):
+        if last[i] > last[parent[i]]:
+            last[parent[i]] = last[i]
+
+    # nearest common ancestor of both ends of every edge that is not a
+    # retreating edge (Tarjan's offline LCA): walking the nodes in preorder,
+    # a node whose subtree is done joins its parent, so find gives the
+    # nearest ancestor still open, on the path to the current node
+    up = list(range(n))
+
+    def find_open(x: int) -> int:
+        while up[x] != x:
+            up[x] = up[up[x]]
+            x = up[x]
+        return x
+
+    lowest = list(range(n))  # smallest common ancestor of an edge into the node from outside its subtree
+    activate = [[] for _ in range(n)]  # edges (source, target) by common ancestor
+    open_path = []
+    for y in range(n):
+        while open_path and last[open_path[-1]] < y:
+            done = open_path.pop()
+            up[done] = parent[done]
+        open_path.append(y)
+        # edges out of y, for targets already numbered
+        for e in range(csr.offsets[y], csr.offsets[y + 1]):
+            x = csr.targets[e]
+            if x <= y <= last[x]:
+                continue  # retreating edge, x heads a loop
+            a = y if y < x else find_open(x)
+            activate[a].append((y, x))
+            if a < lowest[x]:
+                lowest[x] = a
+
+    rep = list(range(n))
+
+    def find(x: int) -> int:
+        while rep[x] != x:
+            rep[x] = rep[rep[x]]
+            x = rep[x]
+        return x
+
+    preds = [[] for _ in range(n)]  # edges into the set of each representative, once their ancestor is reached
+    header = array("i", [-1]) * n
+    kind = array("b", bytes(n))
+    mark = [-1] * n
+    for w in range(n - 1, -1, -1):
+        for y, x in activate[w]:
+            preds[find(x)].append(y)
+
+        body = []
+        self_loop = False
+        for e in range(pred_offsets[w], pred_offsets[w + 1]):
+            v = pred_sources[e]
+            if w <= v <= last[w]:
+                if v == w:
+                    self_loop = True
+                    continue
+                r = find(v)
+                if mark[r] != w:
+                    mark[r] = w
+                    body.append(r)
+        if not body:
+            if self_loop:
+                kind[w] = LoopKind.SELF
+            continue
+
+        # body grows while it is walked
+        for r in body:
+            for y in preds[r]:
+                q = find(y)
+                if q != w and mark[q] != w:
+                    mark[q] = w
+                    body.append(q)
+        irreducible = False
+        for r in body:
+            header[r] = w
+            rep[r] = w
+            if lowest[r] < w:
+                irreducible = True
+            if lowest[r] < lowest[w]:
+                lowest[w] = lowest[r]
+        kind[w] = LoopKind.IRREDUCIBLE if irreducible else LoopKind.REDUCIBLE
+
+    # header holds the header around each node; make headers their own
+    loop_parent = header
+    header = array("i", [-1]) * n
+    depth = array("i", bytes(4 * n))
+    for i in range(n):
+        h = loop_parent[i]
+        if kind[i]:
+            header[i] = i
+            depth[i] = 1 + (depth[h] if h != -1 else 0)
+        elif h != -1:
+            header[i] = h
+            depth[i] = depth[h]
+    return LoopForest(csr.labels, csr.index, header, loop_parent, depth, kind)
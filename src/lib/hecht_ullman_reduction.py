@@ -1,4 +1,9 @@
-from src.lib.crawler_type import T1T2Data_t
+from array import array
+from bisect import bisect_left
+import heapq
+from itertools import count
+
+from src.lib.crawler_type import T1T2Data_t, HULog, HUCheckpoint_t, hu_log_t
 from src.lib.crawler_type import graph_t, weights_t, Reduce
 from src.lib.graph_utils import get_preds
 
@@ -6,126 +11,178 @@ from src.lib.graph_utils import get_preds
 Ref: Matthew S. Hecht and Jeffrey D. Ullman. 1972. Flow graph reducibility. In Proceedings of the fourth annual ACM symposium on Theory of computing (STOC '72).
 
 """
-def _reduce_t1(data: T1T2Data_t)->T1T2Data_t:
-    """Do T1 reduction. The node that is modified is written
-    to the log
+def reduce_t1t2_data(data: T1T2Data_t) -> T1T2Data_t:
+    """Apply Hecht-Ullman T1 T2 Analysis to reduce graph. Mutates data.
+
+    Makes the same passes as sweeping the whole graph with T1 and then T2
+    until nothing changes, so the log comes out in the same order, but only
+    looks at the nodes a pass can change: those that gained a self-loop (T1)
+    or lost predecessors (T2). Adjacency is kept in dicts used as ordered
+    sets while reducing and written back to lists at the end. The dict
+    values are the sequence numbers a HULog identifies adjacency entries by.
 
     Args:
-       data (T1T2Data_t): graph data for T1T2 Analysis
+        data (T1T2Data_t): Graph data (call init_t1t2 to gen from graph)
 
     Returns:
-        (T1T2Data) reduced_graph
+        (T1T2Data) data
 
     """
-    graph = data["graph"]
-    preds = data["preds"]
-    weights = data["weights"]
     log = data["log"]
-
-    for node, anc in graph.items():
-        # check for self-loop
-        if node in anc:
-            # log state first
-            node_anc = [x for x in anc]
-            node_pred = [x for x in graph[node]]
-            log.append(
-                (Reduce.T1, node,
-                 (),
-                 (),
-                 tuple(node_anc),
-                 tuple(node_pred),
-                 weights[node]
-                 )
-            )
-            graph[node] = [x for x in anc if x != node]
-            preds[node] = [x for x in preds[node] if x != node]
-
+    succs, preds, seq = _numbered_adjacency(data)
+    position = {x: i for i, x in enumerate(succs)}
+    seq = reduce_worklist(data["start"], succs, preds, data["weights"], log, succs, seq, position)
+
+    # write back into the same dicts, callers may hold on to them
+    for key, adj in (("graph", succs), ("preds", preds)):
+        data[key].clear()
+        data[key].update((x, list(v)) for x, v in adj.items())
+    if isinstance(log, HULog):
+        log.state = tuple({x: array("q", v.values()) for x, v in adj.items()} for adj in (succs, preds))
+        log.next_seq = seq
+        if log.stream is not None:
+            log.close()
     return data
 
 
-def _reduce_t2(data: T1T2Data_t)->T1T2Data_t:
-    """Apply T2 transformation. The node that is absorbed
-       is written into the log. Mutates T1T2Data.
+def reduce_worklist(start: int, succs: dict, preds: dict, weights: weights_t, log: hu_log_t | HULog,
+                    work, seq: int, position: dict[int, int]) -> int:
+    """The T1/T2 passes of reduce_t1t2_data on dict adjacency, starting from
+    the nodes in work rather than the whole graph, for callers that change
+    a reduced graph and reduce again around the change (node splitting).
 
     Args:
-        data (T1T2Data_t): graph data for reduction
+        start (int): start node, never absorbed
+        succs (dict): node -> dict of successors used as an ordered set, the
+            values being HULog sequence numbers (anything with a tuple log)
+        preds (dict): node -> dict of predecessors, the same way
+        weights (weights_t): weight of every node, absorbed weight is added up
+        log (hu_log_t | HULog): log the steps are appended to
+        work: nodes whose self-loops or predecessors changed
+        seq (int): next free sequence number
+        position (dict): node -> its place in a pass over the whole graph,
+            which the passes visit nodes in
 
     Returns:
-        (T1T2Data) reduced graph
-
+        the next free sequence number
     """
-    graph = data["graph"]
-    preds = data["preds"]
-    weights = data["weights"]
+    compact = isinstance(log, HULog)
+    loops = {x for x in work if x in succs[x]}
+    pending = set(work)
+    while loops or pending:
+        # T1 pass: drop the self-loops
+        for node in sorted(loops, key=position.__getitem__):
+            node_succs = succs[node]
+            if not compact:
+                log.append((Reduce.T1, node, (), (), tuple(node_succs), tuple(node_succs), weights[node]))
+            succ_seq = node_succs.pop(node)
+            pred_seq = preds[node].pop(node)
+            if compact:
+                log.append(HULog.T1, node, weights[node], (succ_seq, pred_seq))
+            pending.add(node)
+        loops = set()
+
+        # T2 pass: nodes whose predecessors changed, in position order. The
+        # ones changed ahead of the pass join it on a heap, the ones changed
+        # behind it wait for the next pass.
+        sweep = sorted((position[x], x) for x in pending if x in succs)
+        heap = []
+        queued = pending
+        pending = set()
+        i = 0
+        while i < len(sweep) or heap:
+            if heap and (i == len(sweep) or heap[0] < sweep[i]):
+                at, node = heapq.heappop(heap)
+            else:
+                at, node = sweep[i]
+                i += 1
+            queued.discard(node)
+            node_preds = preds[node]
+            if node == start or len(node_preds) != 1 or node in node_preds:
+                continue
+
+            # u is the only predecessor, it absorbs node
+            u = next(iter(node_preds))
+            u_succs = succs[u]
+            node_succs = succs[node]
+            if compact:
+                payload = [u, u_succs[node], node_preds[u]]
+            else:
+                log.append((Reduce.T2, node, tuple(u_succs), tuple(preds[u]), tuple(node_succs), (u,),
+                            weights[node]))
+
+            del u_succs[node]
+            for j, j_seq in node_succs.items():
+                flags = 0
+                if j not in u_succs:
+                    u_succs[j] = seq
+                    seq += 1
+                    flags = 1
+                j_preds = preds[j]
+                node_seq = j_preds.pop(node)
+                if u not in j_preds:
+                    j_preds[u] = seq
+                    seq += 1
+                    flags |= 2
+                if compact:
+                    payload += (j, j_seq, 4 * node_seq + flags)
+                if j == u:
+                    loops.add(u)
+                elif flags & 2:
+                    # node was swapped for u, j has as many predecessors as before
+                    continue
+                elif position[j] > at:
+                    if j not in queued:
+                        queued.add(j)
+                        heapq.heappush(heap, (position[j], j))
+                else:
+                    pending.add(j)
+            if compact:
+                log.append(HULog.T2, node, weights[node], payload)
+
+            del succs[node]
+            del preds[node]
+            weights[u] += weights[node]
+            del weights[node]
+    return seq
+
+
+def _numbered_adjacency(data: T1T2Data_t) -> tuple[dict, dict, int]:
+    """succs and preds of data as dicts from node to sequence number, in list
+    order, and the next free sequence number. A HULog that already recorded
+    the state of this graph supplies the numbers; otherwise they are handed
+    out fresh. Lists a rewind left out of sequence number order are numbered
+    afresh, and the numbers they had recorded with HULog.renumber."""
     log = data["log"]
-    start = data["start"]
-
-    to_traverse = {x:v for x, v in graph.items()}
-
-    for node, _ in to_traverse.items():
-        if node != start:
-            pred = preds[node]
-            if pred and len(pred) == 1 and pred != [node]:
-                u = pred[0] # this the node that will absorb node
-                # Log change before mutating
-                u_preds = [x for x in preds[u]]
-                u_succs = [x for x in graph[u]]
-                node_preds = [x for x in preds[node]]
-                node_succs = [x for x in graph[node]]
-
-                log.append(
-                    (Reduce.T2,
-                        node,
-                        tuple(u_succs),
-                        tuple(u_preds),
-                        tuple(node_succs),
-                        tuple(node_preds),
-                        weights[node]
-                    )
-                )
-
-                # delete node as a child of u
-                graph[u].remove(node)
-
-                # add children of node back to u
-                graph[u] += [x for x in graph[node] if x not in graph[u]]
-
-                # fix predecessors of the children of node:
-                #  - For every element that views itself as a child of node
-                #  - it is now a child of u (if it wasn't before)
-                for j in graph[node]:
-                    if u not in preds[j]:
-                        preds[j].append(u)
-                    preds[j].remove(node)
-
-                del preds[node]
-                del graph[node]
-                weights[u] += weights[node]
-                del weights[node]
-
-    return data
-
-def reduce_t1t2_data(data: T1T2Data_t) -> T1T2Data_t:
-    """Apply Hecht-Ullman T1 T2 Analysis to reduce graph. Mutates data.
-
-    Args:
-        data (T1T2Data_t): Graph data (call init_t1t2 to gen from graph)
-
-    Returns:
-        (T1T2Data) data
-
-    """
-    while True:
-        ops_before = len(data["log"])
-        data = _reduce_t2(_reduce_t1(data))
-        ops_after = len(data["log"])
-
-        if ops_before == ops_after:
-            break
-
-    return data
-
-def init_t1t2(graph: graph_t, weights: weights_t | None=None) -> T1T2Data_t:
+    if not isinstance(log, HULog) or log.state is None:
+        numbers = count()
+        succs = {x: {j: next(numbers) for j in v} for x, v in data["graph"].items()}
+        preds = {x: {j: next(numbers) for j in v} for x, v in data["preds"].items()}
+        return succs, preds, next(numbers)
+
+    seq = log.next_seq
+    quads = array("q")
+    numbered = []
+    for side, (lists, seqs) in enumerate(zip((data["graph"], data["preds"]), log.state)):
+        if lists.keys() != seqs.keys() or any(len(v) != len(seqs[x]) for x, v in lists.items()):
+            raise ValueError("graph was changed after the HU log recorded its state")
+        adj = {}
+        for x, v in lists.items():
+            numbers = seqs[x]
+            if any(a > b for a, b in zip(numbers, numbers[1:])):
+                for j, old in zip(v, numbers):
+                    quads.extend((side, x, j, old))
+                numbers = range(seq, seq + len(v))
+                seq += len(v)
+            adj[x] = dict(zip(v, numbers))
+        numbered.append(adj)
+    if quads:
+        log.renumber(len(log), quads)
+    return numbered[0], numbered[1], seq
+
+
+def init_t1t2(graph: graph_t, weights: weights_t | None=None, log: HULog | None=None) -> T1T2Data_t:
+    """Pass a HULog as log to have the reduction write the compact log"""
     # make copy as we will be mutating
     new_graph = {x: [t for t in v] for x, v in graph.items()}
     start, _ = next(iter(graph.items()))
@@ -135,98 +192,567 @@ def init_t1t2(graph: graph_t, weights: weights_t | None=None) -> T1T2Data_t:
         "graph": new_graph,
         "preds": get_preds(new_graph),
         "weights": weights or {node: 1 for node, _ in new_graph.items()},
-        "log": []
+        "log": [] if log is None else log
         }
 
 
-def get_reduced_graph(graph: graph_t, weights: weights_t=None) -> T1T2Data_t:
+def get_reduced_graph(graph: graph_t, weights: weights_t=None, log: HULog | None=None) -> T1T2Data_t:
     """Reduce graph according to T1-T2 Hecht-Ullman reduction.
 
     Args:
         graph (graph_t): graph to reduce
         weights (weight_t): weight dict of each node
+        log (HULog): compact log to write instead of a hu_log_t list
 
     Returns:
         T1T2Data for the reduced graph
 
     """
-    data = init_t1t2(graph, weights)
+    data = init_t1t2(graph, weights, log)
     return reduce_t1t2_data(data)
 
 
+def decode_log(data: T1T2Data_t) -> hu_log_t:
+    """The hu_log_t a HULog stands for, oldest entry first. Does not mutate data."""
+    log = data["log"]
+    if not len(log):
+        return []
+    succs, preds = _numbering(data["graph"], data["preds"], log.state)
+    entries = []
+    for _, op, node, w, payload in _undo_compact(log, succs, preds, dict(data["weights"]),
+                                                 _compact_entries(log, range(len(log) - 1, -1, -1)), len(log)):
+        # the reduction kept every list in sequence number order
+        if op == HULog.T1:
+            node_succs = _by_seq(succs[node])
+            entries.append((Reduce.T1, node, (), (), node_succs, node_succs, w))
+        else:
+            u = payload[0]
+            entries.append((Reduce.T2, node, _by_seq(succs[u]), _by_seq(preds[u]), _by_seq(succs[node]), (u,), w))
+    entries.reverse()
+    return entries
+
+
+def _by_seq(d: dict) -> tuple[int, ...]:
+    return tuple(sorted(d, key=d.__getitem__))
+
+
 def recover_orig_data(data: T1T2Data_t) -> T1T2Data_t:
     """Recovers original graph by unwinding log. Mutates T1T2Data (including orig log)
 
+    A HULog is undone straight from the changes it records (entries a stream
+    holds are read back chunk by chunk), and leaves the same lists, in the
+    same order, as undoing the hu_log_t it stands for.
+
     Args:
         data (T1T1Data): reduced data
 
     Returns:
         orig data
     """
+    return rewind(data, 0)
+
+
+def rewind(data: T1T2Data_t, step: int) -> T1T2Data_t:
+    """Undo log entries step and later, leaving data as it was right before
+    entry step was applied. Mutates data (including its log), costs time in
+    the entries undone and the lists they touch.
+
+    Args:
+        data (T1T2Data_t): reduced data
+        step (int): number of log entries to keep
+
+    Returns:
+        data
+    """
     log = data["log"]
+    if not 0 <= step <= len(log):
+        raise ValueError(f"undefined step {step}, the log has {len(log)} entries")
     graph = data["graph"]
     preds = data["preds"]
     weights = data["weights"]
 
-    while log:
-        action, node, parent_succs, parent_preds, node_succs, node_preds, node_weight = log.pop()
+    if not isinstance(log, HULog):
+        while len(log) > step:
+            _undo(log.pop(), graph, preds, weights)
+        return data
+
+    if len(log) == step:
+        return data
+    state = log.state
+    numbered = _numbering(graph, preds, state)
+    for _ in _undo_compact(log, *numbered, weights, _compact_entries(log, range(len(log) - 1, step - 1, -1)),
+                           len(log)):
+        pass
+    _write_back(graph, preds, state, numbered)
+    log.truncate(step)
+    log.state = state
+    return data
+
 
-        node_succs = list(node_succs)
-        node_preds = list(node_preds)
+class _Numbered(dict):
+    """node -> {entry: sequence number} for one side (succs or preds) of a
+    graph, read off its lists and their HULog numbers the first time a node
+    is looked up, so undoing a few steps only reads the lists they touch.
 
-        if action is Reduce.T1:
-            # add self-loop
-            assert node in graph
-            if graph[node]:
-                graph[node].append(node)
+    Undoing as _undo does puts some entries back at the end of their list
+    rather than where they were; those are kept in tails, in order. A list is
+    its other entries by sequence number, then its tail. Lists read in out
+    of sequence number order (left so by a rewind) get a tail from the first
+    entry out of order on.
+    """
+    __slots__ = ("lists", "seqs", "tails")
+
+    def __init__(self, lists: graph_t, seqs: dict[int, array]):
+        super().__init__()
+        self.lists = lists
+        self.seqs = seqs
+        self.tails = {}
+
+    def __missing__(self, x: int) -> dict:
+        entries, numbers = self.lists[x], self.seqs[x]
+        k = 1
+        while k < len(numbers) and numbers[k - 1] < numbers[k]:
+            k += 1
+        if k < len(numbers):
+            self.tails[x] = dict.fromkeys(entries[k:])
+        d = self[x] = dict(zip(entries, numbers))
+        return d
+
+    def ordered(self, x: int) -> list[int]:
+        d = self[x]
+        tail = self.tails.get(x, {})
+        return sorted((j for j in d if j not in tail), key=d.__getitem__) + list(tail)
+
+    def restore(self, x: int, d: dict | None=None):
+        """The list of x (set to d if given) is as a snapshot had it, in
+        sequence number order"""
+        if d is None:
+            self[x]
+        else:
+            self[x] = d
+        self.tails.pop(x, None)
+
+    def append(self, x: int, j: int, seq: int):
+        self[x][j] = seq
+        self.tails.setdefault(x, {})[j] = None
+
+    def remove(self, x: int, j: int):
+        del self[x][j]
+        self.tails.get(x, {}).pop(j, None)
+
+
+def _numbering(graph: graph_t, preds: graph_t, state) -> tuple[_Numbered, _Numbered]:
+    if state is None:
+        raise ValueError("HU log has no recorded state")
+    return _Numbered(graph, state[0]), _Numbered(preds, state[1])
+
+
+def _undo_compact(log: HULog, succs: _Numbered, preds: _Numbered | None, weights: weights_t, entries, end: int):
+    """Undo HULog entries before end, given newest first as by
+    _compact_entries, the way _undo undoes the hu_log_t entries they stand
+    for, on numbered adjacency (numbered as after entry end - 1) and weights.
+    Yields each entry once undone. preds None leaves the predecessors alone,
+    for when entries in between are skipped."""
+    records = sorted(k for k in log.renumbered if k <= end)
+    for entry in entries:
+        k, op, node, w, payload = entry
+        while records and records[-1] > k:
+            _renumber_back(log.renumbered[records.pop()], (succs, preds))
+        if op == HULog.T1:
+            # _undo appends the self-loop
+            succs.append(node, node, payload[0])
+            if preds is not None:
+                preds.append(node, node, payload[1])
+            yield entry
+            continue
+
+        # the lists of u and node come back from their snapshots, node is
+        # appended to the preds of its other successors
+        u = payload[0]
+        u_succs = succs[u]
+        succs.restore(u)
+        node_succs = {}
+        for q in range(3, len(payload), 3):
+            j, j_seq, code = payload[q], payload[q + 1], payload[q + 2]
+            node_succs[j] = j_seq
+            if code & 1:
+                del u_succs[j]
+            if preds is None:
+                continue
+            if code & 2:
+                preds.remove(j, u)
+            if j == u:
+                preds[j][node] = code >> 2
             else:
-                graph[node] = [node]
-            # update preds
-            preds[node].append(node)
+                preds.append(j, node, code >> 2)
+        u_succs[node] = payload[1]
+        succs.restore(node, node_succs)
+        if preds is not None:
+            preds.restore(node, {u: payload[2]})
+            preds.restore(u)
+        weights[u] -= w
+        weights[node] = w
+        yield entry
+
+
+def _renumber_back(quads: array, numbered: tuple[_Numbered, _Numbered | None]):
+    """Going back past a reduction that numbered lists afresh, put back the
+    numbers they had (see HULog.renumber). The lists keep their order."""
+    lists = {}
+    for q in range(0, len(quads), 4):
+        lists.setdefault((quads[q], quads[q + 1]), []).append((quads[q + 2], quads[q + 3]))
+    for (side, x), old in lists.items():
+        adj = numbered[side]
+        if adj is None or x not in adj and x not in adj.lists:
             continue
+        order = adj.ordered(x)
+        d = adj[x]
+        for j, seq in old:
+            if j in d:
+                d[j] = seq
+        adj.tails[x] = dict.fromkeys(order)
 
-        elif action is Reduce.T2:
-            parent = node_preds[0]
-            p_succs = list(parent_succs)
-            p_preds = list(parent_preds)
 
-            # fix up parent
-            graph[parent] = p_succs
-            preds[parent] = p_preds
+def _write_back(graph: graph_t, preds: graph_t, state, numbered: tuple[_Numbered, _Numbered]):
+    """Bring the lists of the nodes numbered holds, and their numbers in
+    state, up to date"""
+    for lists, seqs, adj in zip((graph, preds), state, numbered):
+        for x, d in adj.items():
+            lists[x] = adj.ordered(x)
+            seqs[x] = array("q", map(d.__getitem__, lists[x]))
 
-            # add node to graph
-            graph[node] = node_succs
-            preds[node] = [parent]
 
-            # make sure descendents of node have right predecessors
-            for node_child in graph[node]:
-                if node not in preds[node_child]:
-                    preds[node_child].append(node)
+def make_checkpoints(data: T1T2Data_t, every: int) -> list[HUCheckpoint_t]:
+    """Copies of data at every log step that is a multiple of every, for
+    state_at. Costs one recovery; does not mutate data.
 
-                if parent in preds[node_child] and node_child not in graph[parent]:
-                    preds[node_child].remove(parent)
+    Args:
+        data (T1T2Data_t): reduced data
+        every (int): log steps between two checkpoints
 
-            # make sure descendents of parent have the right predecessors
-            for parent_child in graph[parent]:
-                if parent not in preds[parent_child]:
-                    preds[parent_child].append(parent)
-                if node in preds[parent_child] and parent_child not in graph[node]:
-                    preds[parent_child].remove(node)
+    Returns:
+        checkpoints ordered by step
+    """
+    if every < 1:
+        raise ValueError(f"undefined checkpoint interval {every}")
+    log = data["log"]
+    if not len(log):
+        return []
+    work = {
+        "start": data["start"],
+        "graph": {x: list(v) for x, v in data["graph"].items()},
+        "preds": {x: list(v) for x, v in data["preds"].items()},
+        "weights": dict(data["weights"]),
+        "log": log,
+        }
+    steps = range(len(log) - 1, -1, -1)
+    if isinstance(log, HULog):
+        numbered = _numbering(data["graph"], data["preds"], log.state)
+        state = tuple(map(dict, log.state))
+        steps = (e[0] for e in _undo_compact(log, *numbered, work["weights"], _compact_entries(log, steps), len(log)))
+
+    checkpoints = []
+    for step in steps:
+        if not isinstance(log, HULog):
+            _undo(log[step], work["graph"], work["preds"], work["weights"])
+        if step % every == 0:
+            if isinstance(log, HULog):
+                _write_back(work["graph"], work["preds"], state, numbered)
+            checkpoints.append({
+                "step": step,
+                "graph": {x: list(v) for x, v in work["graph"].items()},
+                "preds": {x: list(v) for x, v in work["preds"].items()},
+                "weights": dict(work["weights"]),
+                "state": tuple(map(dict, state)) if isinstance(log, HULog) else None,
+                })
+    checkpoints.reverse()
+    return checkpoints
+
+
+def state_at(data: T1T2Data_t, checkpoints: list[HUCheckpoint_t], step: int) -> T1T2Data_t:
+    """data as it was right before log entry step was applied, the same
+    rewind(data, step) leaves behind, without mutating data. Starts from the
+    nearest checkpoint at or after step (or data itself), so costs time in
+    the entries between the two plus a copy of the graph.
 
-            # make sure predecessors of node know they are predecessors
-            for x in preds[node]:
-                if node not in graph[x]:
-                    graph[x].append(node)
+    Args:
+        data (T1T2Data_t): reduced data
+        checkpoints (list[HUCheckpoint_t]): from make_checkpoints
+        step (int): number of log entries applied
 
-                if parent in graph[x] and x not in preds[parent]:
-                    graph[x].remove(parent)
+    Returns:
+        new T1T2Data_t; its log is empty
+    """
+    log = data["log"]
+    if not 0 <= step <= len(log):
+        raise ValueError(f"undefined step {step}, the log has {len(log)} entries")
+    i = bisect_left(checkpoints, step, key=lambda c: c["step"])
+    # checkpoints past the end of a rewound log no longer apply
+    base = checkpoints[i] if i < len(checkpoints) and checkpoints[i]["step"] <= len(log) else data
+    end = base.get("step", len(log))
+    new = {
+        "start": data["start"],
+        "graph": {x: list(v) for x, v in base["graph"].items()},
+        "preds": {x: list(v) for x, v in base["preds"].items()},
+        "weights": dict(base["weights"]),
+        "log": [],
+        }
+    if end == step:
+        return new
+
+    if isinstance(log, HULog):
+        state = log.state if base is data else base["state"]
+        numbered = _numbering(base["graph"], base["preds"], state)
+        for _ in _undo_compact(log, *numbered, new["weights"], _compact_entries(log, range(end - 1, step - 1, -1)),
+                               end):
+            pass
+        _write_back(new["graph"], new["preds"], tuple(map(dict, state)), numbered)
+    else:
+        for k in range(end - 1, step - 1, -1):
+            _undo(log[k], new["graph"], new["preds"], new["weights"])
+    return new
+
+
+def absorbed_at(data: T1T2Data_t, node: int) -> int | None:
+    """Index of the T2 entry in which node was absorbed by its predecessor,
+    None if it was not"""
+    log = data["log"]
+    if not isinstance(log, HULog):
+        for k, entry in enumerate(log):
+            if entry[0] is Reduce.T2 and entry[1] == node:
+                return k
+        return None
+    index = len(log)
+    for ops, nodes, _, _, _ in log.chunks():
+        index -= len(ops)
+        for i in range(len(ops)):
+            if nodes[i] == node and ops[i] == HULog.T2:
+                return index + i
+    return None
+
+
+def absorbed_steps(data: T1T2Data_t) -> dict[int, list[tuple[int, int]]]:
+    """The log entries that folded something into each node, newest first, as
+    (step, node absorbed) pairs: the T2 entries in which it absorbed a node,
+    and the T1 entries that dropped its self-loop, paired with itself. One
+    pass over the log that does not decode it; keep it next to the
+    checkpoints to expand several regions.
 
-            weights[parent] -= node_weight
-            weights[node] = node_weight
-            continue
+    Args:
+        data (T1T2Data_t): reduced data
 
-        else:
-            raise ValueError(f"Unrecognized action type {action}")
+    Returns:
+        node -> (step, node absorbed) pairs
+    """
+    log = data["log"]
+    index = {}
+    if not isinstance(log, HULog):
+        for k in range(len(log) - 1, -1, -1):
+            e = log[k]
+            index.setdefault(e[5][0] if e[0] is Reduce.T2 else e[1], []).append((k, e[1]))
+        return index
+    k = len(log)
+    for ops, nodes, _, offsets, buf in log.chunks():
+        k -= len(ops)
+        for i in range(len(ops) - 1, -1, -1):
+            x = buf[offsets[i]] if ops[i] == HULog.T2 else nodes[i]
+            index.setdefault(x, []).append((k + i, nodes[i]))
+    return index
+
+
+def _compact_entries(log: HULog, steps):
+    """(step, op, node, weight, payload) of the entries of log at steps, which
+    are given newest first"""
+    steps = iter(steps)
+    k = next(steps, None)
+    index = len(log)
+    for ops, nodes, weights, offsets, buf in log.chunks():
+        if k is None:
+            return
+        index -= len(ops)
+        while k is not None and k >= index:
+            i = k - index
+            yield k, ops[i], nodes[i], weights[i], buf[offsets[i]:offsets[i + 1]]
+            k = next(steps, None)
+
+
+def expand_region(data: T1T2Data_t, node: int,
+                  index: dict[int, list[tuple[int, int]]] | None=None) -> T1T2Data_t:
+    """data with the nodes node absorbed split back out of it, while every
+    other node stays collapsed. Does not mutate data.
+
+    T2 only absorbs a node whose one predecessor is the absorber, so edges
+    from outside a region all enter it at node, and the nodes its edges
+    leave it for are still in the reduced graph. Undoing only the entries
+    that folded something into the region, found through index, gives its
+    nodes the successor lists recover_orig_data gives them; predecessors
+    follow from those. Costs time in the region's entries plus a copy of
+    the graph.
 
-    return data
+    Args:
+        data (T1T2Data_t): reduced data
+        node (int): node of the reduced graph to expand
+        index (dict): from absorbed_steps, built here if not given
+
+    Returns:
+        new T1T2Data_t; its log is empty
+    """
+    graph = data["graph"]
+    if node not in graph:
+        raise ValueError(f"undefined node {node}")
+    log = data["log"]
+    if index is None:
+        index = absorbed_steps(data)
+
+    region = [node]
+    steps = []
+    for x in region:
+        for k, y in index.get(x, ()):
+            steps.append(k)
+            if y != x:
+                region.append(y)
+    steps.sort(reverse=True)
+
+    weights = dict(data["weights"])
+    if not isinstance(log, HULog):
+        succs = {node: list(graph[node])}
+        for k in steps:
+            action, x, u_succs, _, x_succs, x_preds, w = log[k]
+            if action is Reduce.T1:
+                succs[x].append(x)
+                continue
+            u = x_preds[0]
+            succs[u] = list(u_succs)
+            succs[x] = list(x_succs)
+            weights[u] -= w
+            weights[x] = w
+    elif steps:
+        succs = _expand_compact(data, node, steps, weights)
+    else:
+        succs = {node: list(graph[node])}
+
+    # edges leaving the region for outside nodes replace their edge from node
+    members = set(region)
+    into = {}
+    inner = {x: [] for x in region}
+    for x in region:
+        for s in succs[x]:
+            (inner[s] if s in members else into.setdefault(s, [])).append(x)
+    new_graph = {x: list(v) for x, v in graph.items()}
+    new_graph.update(succs)
+    new_preds = {x: list(v) for x, v in data["preds"].items()}
+    for s, xs in into.items():
+        new_preds[s] = [y for p in new_preds[s] for y in (xs if p == node else (p,))]
+    # a loop on node is one of the region's own edges
+    new_preds[node] = [p for p in new_preds.get(node, ()) if p != node] + inner.pop(node)
+    new_preds.update(inner)
+    return {
+        "start": data["start"],
+        "graph": new_graph,
+        "preds": new_preds,
+        "weights": weights,
+        "log": [],
+        }
+
+
+def _expand_compact(data: T1T2Data_t, node: int, steps: list[int], weights: weights_t) -> graph_t:
+    """Successor lists of the region of node, from the HULog entries at steps
+    (newest first), in the order _undo leaves them"""
+    log = data["log"]
+    if log.state is None:
+        raise ValueError("HU log has no recorded state")
+    succs = _Numbered(data["graph"], log.state[0])
+    region = [node]
+    for _, op, x, _, _ in _undo_compact(log, succs, None, weights, _compact_entries(log, steps), len(log)):
+        if op == HULog.T2:
+            region.append(x)
+    return {x: succs.ordered(x) for x in region}
 
+
+def redo_entry(entry, succs: dict, preds: dict, weights: weights_t):
+    """Apply a hu_log_t entry again to dict adjacency, the way
+    reduce_worklist applied it, so the dicts end up in the same order.
+
+    Args:
+        entry: hu_log_t entry
+        succs (dict): node -> dict of successors used as an ordered set
+        preds (dict): node -> dict of predecessors, the same way
+        weights (weights_t): weight of every node
+    """
+    action, node = entry[0], entry[1]
+    if action is Reduce.T1:
+        del succs[node][node]
+        del preds[node][node]
+        return
+    u = entry[5][0]
+    u_succs = succs[u]
+    del u_succs[node]
+    for j in succs.pop(node):
+        if j not in u_succs:
+            u_succs[j] = 0
+        j_preds = preds[j]
+        del j_preds[node]
+        if u not in j_preds:
+            j_preds[u] = 0
+    del preds[node]
+    weights[u] += weights[node]
+    del weights[node]
+
+
+def _undo(entry, graph: graph_t, preds: graph_t, weights: weights_t):
+    action, node, parent_succs, parent_preds, node_succs, node_preds, node_weight = entry
+
+    node_succs = list(node_succs)
+    node_preds = list(node_preds)
+
+    if action is Reduce.T1:
+        # add self-loop
+        assert node in graph
+        if graph[node]:
+            graph[node].append(node)
+        else:
+            graph[node] = [node]
+        # update preds
+        preds[node].append(node)
+
+    elif action is Reduce.T2:
+        parent = node_preds[0]
+        p_succs = list(parent_succs)
+        p_preds = list(parent_preds)
+
+        # fix up parent
+        graph[parent] = p_succs
+        preds[parent] = p_preds
+
+        # add node to graph
+        graph[node] = node_succs
+        preds[node] = [parent]
+
+        # make sure descendents of node have right predecessors
+        for node_child in graph[node]:
+            if node not in preds[node_child]:
+                preds[node_child].append(node)
+
+            if parent in preds[node_child] and node_child not in graph[parent]:
+                preds[node_child].remove(parent)
+
+        # make sure descendents of parent have the right predecessors
+        for parent_child in graph[parent]:
+            if parent not in preds[parent_child]:
+                preds[parent_child].append(parent)
+            if node in preds[parent_child] and parent_child not in graph[node]:
+                preds[parent_child].remove(node)
+
+        # make sure predecessors of node know they are predecessors
+        for x in preds[node]:
+            if node not in graph[x]:
+                graph[x].append(node)
+
+            if parent in graph[x] and x not in preds[parent]:
+                graph[x].remove(parent)
+
+        weights[parent] -= node_weight
+        weights[node] = node_weight
+
+    else:
+        raise ValueError(f"Unrecognized action type {action}")
@@ -0,0 +1,188 @@
+"""
+Strongly connected components maintained while edges are added.
+
+The components are kept in a topological order of the condensation. An edge
+that agrees with the order changes nothing. Otherwise only the components
+placed between its endpoints can be affected: a forward search from the head
+and a backward search from the tail, both confined to that stretch of the
+order, find the ones that must move, and the components found by both form
+the new cycle and are merged. The found components are then rearranged on
+the positions they held before. This is the Pearce-Kelly order maintenance;
+the later algorithms with better worst case bounds (Haeupler et al.,
+Bender-Fineman-Gilbert-Tarjan) search the same region, in a more careful
+interleaving.
+
+Ref: David J. Pearce and Paul H. J. Kelly. 2007. A Dynamic Topological Sort
+Algorithm for Directed Acyclic Graphs. ACM J. Exp. Algorithmics 11.
+Bernhard Haeupler, Telikepalli Kavitha, Rogers Mathew, Siddhartha Sen and
+Robert E. Tarjan. 2012. Incremental Cycle Detection, Topological Ordering, and
+Strong Component Maintenance. ACM Trans. Algorithms 8, 1.
+"""
+from src.lib.crawler_type import graph_t
+from src.lib.tarjan_scc import get_tarjan_scc
+
+
+class IncrementalSCC:
+    """Strongly connected components of a graph that gains edges.
+
+    Seeded from get_tarjan_scc (or a result of it handed in), whose i-th
+    component gets id i. Components that merge keep the id of the largest;
+    new nodes get new ids. succs holds the graph, comp the component of
+    every node, members the nodes of every component, out and into the
+    edges of the condensation and order a position of every component, so
+    that every edge of the condensation goes to a higher position.
+
+    changed collects the components whose nodes or inner edges changed, or
+    that gained an edge from another component, since the last pop_changed,
+    to invalidate results that depend on them (a new entry edge can make a
+    loop irreducible without merging anything).
+    """
+    __slots__ = ("succs", "comp", "members", "out", "into", "order", "changed", "next_id", "next_pos")
+
+    def __init__(self, graph: graph_t, sccs: list[list[int]]=None):
+        if sccs is None:
+            sccs = get_tarjan_scc(graph)
+        self.succs = {node: list(succs) for node, succs in graph.items()}
+        self.comp = {}
+        self.members = {}
+        self.order = {}
+        k = len(sccs)
+        for c, scc in enumerate(sccs):
+            self.members[c] = list(scc)
+            # get_tarjan_scc lists the components in reverse topological order
+            self.order[c] = k - 1 - c
+            for node in scc:
+                self.comp[node] = c
+                self.succs.setdefault(node, [])
+        self.out = {c: set() for c in self.members}
+        self.into = {c: set() for c in self.members}
+        for node, succs in graph.items():
+            c = self.comp[node]
+            for s in succs:
+                d = self.comp[s]
+                if c != d:
+                    self.out[c].add(d)
+                    self.into[d].add(c)
+        self.changed = set()
+        self.next_id = k
+        self.next_pos = k
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def component_of(self, node: int) -> int:
+        return self.comp[node]
+
+    def components(self) -> list[list[int]]:
+        """Every component, in reverse topological order as get_tarjan_scc"""
+        return [self.members[c] for c in sorted(self.members, key=self.order.__getitem__, reverse=True)]
+
+    def condensation(self) -> graph_t:
+        """The condensation, keyed in topological order"""
+        return {c: sorted(self.out[c]) for c in sorted(self.members, key=self.order.__getitem__)}
+
+    def pop_changed(self) -> set[int]:
+        """Components changed since the last call"""
+        changed = self.changed
+        self.changed = set()
+        return changed
+
+    def _add_node(self, node: int):
+        c = self.next_id
+        self.next_id += 1
+        self.succs[node] = []
+        self.comp[node] = c
+        self.members[c] = [node]
+        self.out[c] = set()
+        self.into[c] = set()
+        self.order[c] = self.next_pos
+        self.next_pos += 1
+
+    def add_edge(self, u: int, v: int) -> tuple[int, ...]:
+        """Add the edge u -> v and update the components.
+
+        Returns:
+            if the edge closes a cycle through several components, the
+            component they were merged into followed by the ones merged away
+            (which no longer exist), otherwise ()
+        """
+        for node in (u, v):
+            if node not in self.succs:
+                self._add_node(node)
+        if v in self.succs[u]:
+            return ()
+        self.succs[u].append(v)
+
+        cu, cv = self.comp[u], self.comp[v]
+        if cu == cv:
+            self.changed.add(cu)
+            return ()
+        order = self.order
+        if order[cu] < order[cv]:
+            self.out[cu].add(cv)
+            self.into[cv].add(cu)
+            self.changed.add(cv)
+            return ()
+
+        # the components between cv and cu in the order that cv reaches, and
+        # the ones that reach cu
+        lo, hi = order[cv], order[cu]
+        forward = self._search(cv, self.out, lambda c: order[c] <= hi)
+        backward = self._search(cu, self.into, lambda c: order[c] >= lo)
+        cycle = forward & backward if cu in forward else set()
+        forward -= cycle
+        backward -= cycle
+
+        # the ones reaching cu first, then the new cycle, then the ones cv
+        # reaches, on the positions they had
+        pool = sorted(order[c] for c in forward | backward | cycle)
+        backward = sorted(backward, key=order.__getitem__)
+        forward = sorted(forward, key=order.__getitem__)
+        for c, pos in zip(backward, pool):
+            order[c] = pos
+        for c, pos in zip(forward, pool[len(pool) - len(forward):]):
+            order[c] = pos
+        if not cycle:
+            self.out[cu].add(cv)
+            self.into[cv].add(cu)
+            self.changed.add(cv)
+            return ()
+
+        kept = max(cycle, key=lambda c: len(self.members[c]))
+        order[kept] = pool[len(backward)]
+        return (kept, *sorted(self._merge(kept, cycle - {kept})))
+
+    @staticmethod
+    def _search(start: int, edges: dict[int, set[int]], inside) -> set[int]:
+        found = {start}
+        stack = [start]
+        while stack:
+            for c in edges[stack.pop()]:
+                if c not in found and inside(c):
+                    found.add(c)
+                    stack.append(c)
+        return found
+
+    def _merge(self, kept: int, merged: set[int]) -> set[int]:
+        """Fold the components merged into kept"""
+        cycle = merged | {kept}
+        members = self.members[kept]
+        out, into = self.out[kept], self.into[kept]
+        for c in merged:
+            for node in self.members.pop(c):
+                self.comp[node] = kept
+                members.append(node)
+            out |= self.out.pop(c)
+            into |= self.into.pop(c)
+            del self.order[c]
+        out -= cycle
+        into -= cycle
+        for d in out:
+            self.into[d] -= merged
+            self.into[d].add(kept)
+        for d in into:
+            self.out[d] -= merged
+            self.out[d].add(kept)
+        self.changed -= merged
+        self.changed.add(kept)
+        return merged
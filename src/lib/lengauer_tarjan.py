@@ -1,4 +1,7 @@
-from src.lib.crawler_type import graph_t, lt_graph_t, g_map_t, g_node_t
+from array import array
+
+from src.lib.crawler_type import graph_t, lt_graph_t, g_map_t, g_node_t, CSRGraph, any_graph_t
+from src.lib.graph_utils import preorder_csr
 
 PRE = "pre"
 SUCCS = "succs"
@@ -11,13 +14,18 @@ IDOM = "idom"
 ANC = "anc"
 
 
-def init_lt(graph: graph_t) -> tuple[lt_graph_t, g_map_t, g_map_t]:
+def init_lt(graph: any_graph_t) -> tuple[lt_graph_t, g_map_t, g_map_t]:
     """
     Initializes the graph for L-T algorithm.
     """
+    if isinstance(graph, CSRGraph):
+        return _init_lt_csr(graph)
+
     start, _ = next(iter(graph.items()))
     stack = [start]
     visited = []
+    # preorder number, assigned on first pop; doubles as the visited set
+    pre = {}
 
     # Track predecessors for ALL nodes initially
     raw_pred_map = {g: set() for g in graph}
@@ -25,17 +33,17 @@ def init_lt(graph: graph_t) -> tuple[lt_graph_t, g_map_t, g_map_t]:
 
     while stack:
         node = stack.pop()
-        if node not in visited:
+        if node not in pre:
+            pre[node] = len(visited)
             visited.append(node)
             # Use strict list to ensure order doesn't fluctuate
             children = graph.get(node, [])
             for child in reversed(children):
                 raw_pred_map[child].add(node)
-                if child not in visited:
+                if child not in pre:
                     dfs_parent[child] = node
                     stack.append(child)
 
-    pre = {node: i for i, node in enumerate(visited)}
     rev = {i: node for i, node in enumerate(visited)}
 
     ancestor = {}
@@ -59,6 +67,47 @@ def init_lt(graph: graph_t) -> tuple[lt_graph_t, g_map_t, g_map_t]:
     return lt_graph, pre, rev
 
 
+def _init_lt_csr(graph: CSRGraph) -> tuple[lt_graph_t, g_map_t, g_map_t]:
+    """init_lt for a CSRGraph: the DFS runs over node indices and the
+    predecessors come from the precomputed reverse CSR"""
+    offsets, targets, labels = graph.offsets, graph.targets, graph.labels
+    pred_offsets, pred_sources = graph.pred_offsets, graph.pred_sources
+    n = len(graph)
+    # preorder number of each node index, -1 while unvisited
+    pre_of = array("i", [-1]) * n
+    dfs_parent = array("i", [-1]) * n
+    visited = []
+    stack = [0]
+
+    while stack:
+        node = stack.pop()
+        if pre_of[node] == -1:
+            pre_of[node] = len(visited)
+            visited.append(node)
+            for e in range(offsets[node + 1] - 1, offsets[node] - 1, -1):
+                child = targets[e]
+                if pre_of[child] == -1:
+                    dfs_parent[child] = node
+                    stack.append(child)
+
+    pre = {labels[node]: i for i, node in enumerate(visited)}
+    rev = {i: labels[node] for i, node in enumerate(visited)}
+
+    lt_graph = {idx: {
+        PRE: idx,
+        SUCCS: [pre_of[c] for c in targets[offsets[node]:offsets[node + 1]] if pre_of[c] != -1],
+        PREDS: [pre_of[u] for u in pred_sources[pred_offsets[node]:pred_offsets[node + 1]] if pre_of[u] != -1],
+        PARENT: pre_of[dfs_parent[node]] if idx else None,
+        SEMI: idx,
+        BEST: idx,
+        BUCKET: [],
+        IDOM: None,
+        ANC: None
+    } for idx, node in enumerate(visited)}
+
+    return lt_graph, pre, rev
+
+
 def lt_eval(node: g_node_t, graph: lt_graph_t) -> g_node_t:
     """
     Iterative version of Find/Compress.
@@ -101,7 +150,7 @@ def lt_eval(node: g_node_t, graph: lt_graph_t) -> g_node_t:
     return graph[node[BEST]]
 
 
-def gen_lt_graph(g: graph_t) -> tuple[lt_graph_t, g_map_t, g_map_t]:
+def gen_lt_graph(g: any_graph_t) -> tuple[lt_graph_t, g_map_t, g_map_t]:
     graph, pre, rev = init_lt(g)
 
     # first pass (decreasing for semi-doms)
@@ -140,4 +189,209 @@ def gen_lt_graph(g: graph_t) -> tuple[lt_graph_t, g_map_t, g_map_t]:
             node[IDOM] = graph[node[IDOM]][IDOM]
 
     graph[0][IDOM] = None
-    return graph, pre, rev
\ No newline at end of file
+    return graph, pre, rev
+
+
+def lt_idoms_csr(csr: CSRGraph, parent: array, balanced: bool=False, stats: dict | None=None) -> array:
+    """Lengauer-Tarjan on flat arrays.
+
+    Same algorithm as gen_lt_graph, but semi, best, anc, idom and the buckets
+    are integer sequences indexed by preorder number instead of LTNode dicts.
+    Buckets are singly linked lists threaded through bucket_head/bucket_next.
+    The working sequences are plain lists (faster to index than arrays) and
+    only the result is packed into an array.
+
+    Args:
+        csr (CSRGraph): graph numbered in DFS preorder (see preorder_csr)
+        parent (array): DFS tree parent of every preorder number
+        balanced (bool): use the size/child balanced link and eval of the
+            paper, O(E α(E, V)) instead of O(E log V)
+        stats (dict): if given, filled with "evals" (number of eval calls) and
+            "compressed_path_length" (total number of ancestor pointers rewritten
+            by path compression)
+
+    Returns:
+        array of immediate dominators by preorder number, -1 for the start node
+    """
+    if balanced:
+        return _lt_idoms_balanced(csr, parent, stats)
+
+    n = len(csr)
+    pred_offsets, pred_sources = csr.pred_offsets, csr.pred_sources
+    semi = list(range(n))
+    best = list(range(n))
+    anc = [-1] * n
+    idom = [-1] * n
+    bucket_head = [-1] * n
+    bucket_next = [-1] * n
+    path = []
+    compressed = 0
+
+    for w in range(n - 1, 0, -1):
+        semi_w = semi[w]
+        for v in pred_sources[pred_offsets[w]:pred_offsets[w + 1]]:
+            # lt_eval inlined: unlinked nodes are their own best, nodes hanging
+            # directly off a DSU root need no compression
+            a = anc[v]
+            if a == -1:
+                u = v
+            else:
+                if anc[a] != -1:
+                    u = v
+                    while anc[anc[u]] != -1:
+                        path.append(u)
+                        u = anc[u]
+                    compressed += len(path)
+                    while path:
+                        u = path.pop()
+                        a = anc[u]
+                        if semi[best[a]] < semi[best[u]]:
+                            best[u] = best[a]
+                        anc[u] = anc[a]
+                u = best[v]
+            if semi[u] < semi_w:
+                semi_w = semi[u]
+        semi[w] = semi_w
+        bucket_next[w] = bucket_head[semi_w]
+        bucket_head[semi_w] = w
+
+        # link to DSU forest
+        p = parent[w]
+        anc[w] = p
+
+        v = bucket_head[p]
+        while v != -1:
+            # everything in a bucket has been linked already
+            if anc[anc[v]] != -1:
+                u = v
+                while anc[anc[u]] != -1:
+                    path.append(u)
+                    u = anc[u]
+                compressed += len(path)
+                while path:
+                    u = path.pop()
+                    a = anc[u]
+                    if semi[best[a]] < semi[best[u]]:
+                        best[u] = best[a]
+                    anc[u] = anc[a]
+            u = best[v]
+            idom[v] = u if semi[u] < semi[v] else p
+            v = bucket_next[v]
+        bucket_head[p] = -1
+
+    for w in range(1, n):
+        if idom[w] != semi[w]:
+            idom[w] = idom[idom[w]]
+
+    if stats is not None:
+        stats["evals"] = len(pred_sources) - (pred_offsets[1] - pred_offsets[0]) + n - 1
+        stats["compressed_path_length"] = compressed
+    return array("i", idom)
+
+
+def _lt_idoms_balanced(csr: CSRGraph, parent: array, stats: dict | None) -> array:
+    """Sophisticated Lengauer-Tarjan: LINK keeps the DSU trees balanced with
+    size and child, so the compressed paths stay short even on the deep, chain
+    like DFS trees where simple linking degrades.
+
+    Follows the paper closely, including its 1-based numbering: vertex v lives
+    at v + 1 and slot 0 is the null vertex with size 0 and semi 0.
+    """
+    n = len(csr)
+    pred_offsets, pred_sources = csr.pred_offsets, csr.pred_sources
+    semi = list(range(n + 1))
+    label = list(range(n + 1))
+    anc = [0] * (n + 1)
+    child = [0] * (n + 1)
+    size = [1] * (n + 1)
+    size[0] = 0
+    idom = [0] * (n + 1)
+    bucket_head = [0] * (n + 1)
+    bucket_next = [0] * (n + 1)
+    path = []
+    compressed = 0
+    evals = 0
+
+    def sophisticated_eval(v: int) -> int:
+        nonlocal compressed
+        a = anc[v]
+        if a == 0:
+            return label[v]
+        if anc[a] != 0:
+            u = v
+            while anc[anc[u]] != 0:
+                path.append(u)
+                u = anc[u]
+            compressed += len(path)
+            while path:
+                u = path.pop()
+                a = anc[u]
+                if semi[label[a]] < semi[label[u]]:
+                    label[u] = label[a]
+                anc[u] = anc[a]
+            a = anc[v]
+        return label[v] if semi[label[a]] >= semi[label[v]] else label[a]
+
+    for w in range(n, 1, -1):
+        semi_w = semi[w]
+        for e in range(pred_offsets[w - 1], pred_offsets[w]):
+            u = sophisticated_eval(pred_sources[e] + 1)
+            if semi[u] < semi_w:
+                semi_w = semi[u]
+        evals += pred_offsets[w] - pred_offsets[w - 1]
+        semi[w] = semi_w
+        bucket_next[w] = bucket_head[semi_w]
+        bucket_head[semi_w] = w
+
+        # LINK(p, w)
+        p = parent[w - 1] + 1
+        s = w
+        while semi[label[w]] < semi[label[child[s]]]:
+            cs = child[s]
+            if size[s] + size[child[cs]] >= 2 * size[cs]:
+                anc[cs] = s
+                child[s] = child[cs]
+            else:
+                size[cs] = size[s]
+                anc[s] = cs
+                s = cs
+        label[s] = label[w]
+        size[p] += size[w]
+        if size[p] < 2 * size[w]:
+            s, child[p] = child[p], s
+        while s != 0:
+            anc[s] = p
+            s = child[s]
+
+        v = bucket_head[p]
+        while v != 0:
+            u = sophisticated_eval(v)
+            evals += 1
+            idom[v] = u if semi[u] < semi[v] else p
+            v = bucket_next[v]
+        bucket_head[p] = 0
+
+    for w in range(2, n + 1):
+        if idom[w] != semi[w]:
+            idom[w] = idom[idom[w]]
+
+    if stats is not None:
+        stats["evals"] = evals
+        stats["compressed_path_length"] = compressed
+    return array("i", (d - 1 for d in idom[1:]))
+
+
+def gen_lt_idoms(g: any_graph_t, balanced: bool=False, stats: dict | None=None) -> tuple[array, g_map_t, array]:
+    """Array based alternative to gen_lt_graph.
+
+    Args:
+        g (any_graph_t): graph, start node first
+        balanced (bool): use balanced linking (see lt_idoms_csr)
+        stats (dict): optional dict for eval/compression counters (see lt_idoms_csr)
+
+    Returns:
+        idoms by preorder number (-1 for the start node), pre (node -> preorder)
+        and rev (preorder -> node, an array so rev[i] works as with gen_lt_graph)
+    """
+    csr, parent = preorder_csr(g)
+    return lt_idoms_csr(csr, parent, balanced=balanced, stats=stats), csr.index, csr.labels
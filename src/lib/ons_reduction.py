@@ -4,162 +4,327 @@ Reducible Regions by Optimized Node Splitting' Sebastian Unger
 M.S. thesis, Humboldt University Berlin, Germany (1998).
 
 """
-from src.lib.crawler_type import ONS_Node_t, ons_graph_t, lt_graph_t, g_node_t, graph_t
-from src.lib.dominator import gen_lt_graph, get_dominator_tree, get_dominator_tree_from_nodal
-from src.lib.graph_utils import dfs_post_order_traversal
-
-PRE = "pre"
-SUCCS = "succs"
-PREDS = "preds"
-IDOM = "idom"
-SUCCS_DOM = "succs_dom"
-LEVEL = "level"
-WEIGHT = "weight"
-COPY = "copy"
-HEADER = "header"
-DONE = "done"
-ACTIVE = "active"
-SP_BACK_DATA = "sp_back_data"
-
-
-def _get_dom_post_order(g: ons_graph_t, start: ONS_Node_t, restrict_to: list[ONS_Node_t]=None)->list[ONS_Node_t]:
-    """Perform post order traversal subject to node restriction"""
-    if restrict_to and not start in restrict_to:
+from bisect import bisect_right
+
+from src.lib.cns_reduction import SplitBudget
+from src.lib.crawler_type import ONSNode, ons_graph_t, graph_t, weights_t, split_data_t, CNSStop
+from src.lib.dominator import compute_idoms
+from src.lib.tarjan_scc import get_tarjan_scc
+
+
+def _get_dom_post_order(start: ONSNode, restrict_to: set[ONSNode]=None) -> list[ONSNode]:
+    """Perform post order traversal of the dominator tree below start subject to node restriction"""
+    if restrict_to is not None and start not in restrict_to:
         return []
 
+    # a preorder has every subtree after its root, so reversed it is a post order
+    order = []
     stack = [start]
-    visited = []
-    processing = {g: 0 for g, _ in g.items()}
+    while stack:
+        curr = stack.pop()
+        order.append(curr)
+        for child in reversed(curr.succs_dom):
+            if restrict_to is None or child in restrict_to:
+                stack.append(child)
+    order.reverse()
+    return order
+
 
+def _dominate(ons_g: ons_graph_t, region: list[ONSNode], engine: str="auto"):
+    """Set idom and succs_dom of the nodes of region, which is only entered
+    through its first node. Nodes of region that one no longer reaches are
+    dropped from ons_g."""
+    inside = set(region)
+    idoms, _, rev = compute_idoms({x.label: [s.label for s in x.succs if s in inside] for x in region}, engine)
+    for x in region:
+        x.succs_dom = []
+    nodes = [ons_g[label] for label in rev]
+    for i in range(1, len(nodes)):
+        d = nodes[idoms[i]]
+        nodes[i].idom = d
+        d.succs_dom.append(nodes[i])
+
+    if len(nodes) < len(region):
+        reached = set(nodes)
+        for dead in region:
+            if dead not in reached:
+                del ons_g[dead.label]
+                for s in dead.succs:
+                    s.preds = [p for p in s.preds if p is not dead]
+
+
+def _number(start: ONSNode, pre: int=0, dirty: set[ONSNode]=None):
+    """Set level, pre and last of every node below start in the dominator
+    tree, numbering from pre, and take them out of dirty"""
+    order = []
+    stack = [start]
     while stack:
-        curr = stack[-1]  # peek
-        children = [node for node in curr.get(SUCCS_DOM)
-                    if (not restrict_to) or node in restrict_to]
-
-        if len(children) > processing[curr]:
-            # a child has not been processed
-            curr_child = children[processing[curr]]
-            if curr_child not in stack:
-                stack.append(children[processing[curr]])
-            processing[curr] += 1
-        else:
-            # all children processed
-            if curr not in visited:
-                visited.append(curr)
-            stack.pop()
-
-    return visited
-
-def populate_pointers(graph:ons_graph_t) -> None:
-    for idx, g in graph.items():
-        g[SUCCS] = [graph[id_t] for id_t in g[SUCCS]]
-        g[PREDS] = [graph[id_t] for id_t in g[PREDS]]
-        for id_s in g[IDOM]:
-            graph[id_s][SUCCS_DOM].append(g)
-
-def mark_back_edges(graph: ons_graph_t, start_node: ONS_Node_t):
-        """
-        Finds back-edges (indicating loops) using iterative DFS.
-        Returns a list of (source, target) tuples.
-        """
-        # call stack: stores (node, iterator_of_children)
-        # We use iter() so we know exactly where we left off when we return to a node.
-        stack = [(start_node, iter(start_node[SUCCS]))]
-        path_set = {start_node}
-        visited = {start_node}
-        while stack:
-            parent, children_iter = stack[-1]
-            try:
-                child = next(children_iter)
-                if child in path_set:
-                    parent[SP_BACK_DATA] = (parent[PRE], child[PRE])
-
-                elif child not in visited:
-                    visited.add(child)
-                    path_set.add(child)
-                    stack.append((child, iter(child[SUCCS])))
-
-            except StopIteration:
-                # We have finished all children of 'parent'.
-                stack.pop()
-                path_set.remove(parent)
-        return
-
-def _build_ons_graph_from_lt(g: lt_graph_t)->ons_graph_t:
-    lt_graph, pre, rev = gen_lt_graph(g)
-    post_order = dfs_post_order_traversal(lt_graph)
-    ons_g = {idx: {
-        PRE: idx,
-        SUCCS: node["succs"],
-        PREDS: node["preds"],
-        IDOM: node["idom"],
-        SUCCS_DOM: [],
-        LEVEL: None,
-        WEIGHT: 1,
-        COPY: None,
-        HEADER: None,
-        DONE: False,
-        ACTIVE: False,
-        SP_BACK_DATA: None
-    }
-        for idx, node in lt_graph_t.items()
-    }
-    populate_pointers(ons_g)
-    return ons_g
+        curr = stack.pop()
+        curr.pre = pre + len(order)
+        order.append(curr)
+        if dirty:
+            dirty.discard(curr)
+        for child in reversed(curr.succs_dom):
+            child.level = curr.level + 1
+            stack.append(child)
+    for curr in reversed(order):
+        curr.last = curr.succs_dom[-1].last if curr.succs_dom else curr.pre
+
+
+def init_ons(g: graph_t, weights: weights_t=None, engine: str="auto") -> tuple[ons_graph_t, ONSNode]:
+    """Returns fresh graph with all dominator info. Nodes not reachable from
+    the start node are left out."""
+    ons_g = {x: ONSNode(x, 1 if weights is None else weights[x]) for x in g}
+    for x, succs in g.items():
+        node = ons_g[x]
+        for s in succs:
+            if s not in ons_g:
+                ons_g[s] = ONSNode(s, 1 if weights is None else weights[s])
+            node.succs.append(ons_g[s])
+            ons_g[s].preds.append(node)
+    start = ons_g[next(iter(g))]
+    _dominate(ons_g, list(ons_g.values()), engine)
+    _number(start)
+    return ons_g, start
+
 
 def clear_marks(ons_g: ons_graph_t):
-    for idx, g in ons_graph_t.items():
-        g[DONE] = False
-        g[ACTIVE] = False
-
-def clear_back_edges(ons_g: ons_graph_t):
-    for idx, g in ons_graph_t.items():
-        g[SP_BACK_DATA] = None
-
-def init_ons(g: graph_t)->tuple[ons_graph_t, ONS_Node_t]:
-    """Returns fresh graph with all
-    dominator info and back-edges marked"""
-    ons_g = _build_ons_graph_from_lt(g)
-    start_node = ons_g[0]
-    mark_back_edges(ons_g, start_node)
-    return ons_g, start_node
-
-def split_loops(start_node: ONS_Node_t, ons_graph: ons_graph_t, restrict_to: list[ONS_Node_t]=None)->bool:
+    for g in ons_g.values():
+        g.copy = None
+        g.header = None
+
+
+def split_loops(start_node: ONSNode, ons_graph: ons_graph_t, restrict_to: set[ONSNode]=None,
+                engine: str="auto", budget: SplitBudget | None=None) -> bool:
+    """Split the irreducible loops below start_node, innermost first.
+
+    Going up the dominator tree from the leaves, look at each node top for
+    SCCs among the nodes it strictly dominates. Any such SCC not found below
+    top already is entered through at least two children of top, its headers,
+    and is irreducible exactly then. Contracting the subtree of each child of
+    top to a single node, those children are the cyclic SCCs of what is left,
+    so the SCCs of the nodes themselves are only searched for below them.
+    After splitting (see split_scc) only the dominator tree below top
+    changes; it is recomputed and walked again before top is looked at once
+    more. Preorder numbers are only compared within the subtree of the node
+    being looked at, so the nodes above top are renumbered when their turn
+    comes.
+
+    With a budget, each SCC is only split if the budget allows the weight
+    of its copies (see split_scc); at the first one it does not, splitting
+    stops and budget.stop names the limit. The graph is then left as after
+    the last split made: every path of it is still one of the original
+    graph, but loops are left irreducible.
+
+    Args:
+        start_node (ONSNode): Is the dominators whose subtree we will investigate
+        ons_graph (ons_graph_t): graph, copies are added to it, start node first
+        restrict_to (set[ONSNode]): Do not leave this set (e.g. can be a domain or subgraph),
+            copies are added to it
+        engine (str): dominator engine, see compute_idoms
+        budget (SplitBudget): limits on the splits, none if not given
+
+    Returns:
+        (bool) true if there was an irreducible loop in this subtree, now split
+        (as far as the budget allowed)
+
     """
+    work = _get_dom_post_order(start_node, restrict_to)
+    work.reverse()
+    dirty = set()
+    split = False
+    while work:
+        top = work.pop()
+        if top in dirty:
+            _number(top, top.pre, dirty)
+        children = [c for c in top.succs_dom if restrict_to is None or c in restrict_to]
+        if len(children) < 2:
+            continue
+
+        # edges between the subtrees of the children, to the child entered
+        firsts = [c.pre for c in top.succs_dom]
+        entered = {c: [] for c in children}
+        for c in children:
+            for p in c.preds:
+                if p is not top and not c.dominates(p):
+                    a = top.succs_dom[bisect_right(firsts, p.pre) - 1]
+                    if a in entered and (restrict_to is None or p in restrict_to):
+                        entered[a].append(c)
+        if sum(map(bool, entered.values())) < 2:
+            continue
+        copies = []
+        for headers in get_tarjan_scc(entered):
+            if len(headers) < 2:
+                continue
+            region = set()
+            for h in headers:
+                region.update(_get_dom_post_order(h, restrict_to))
+            for scc in get_tarjan_scc({x: [s for s in x.succs if s in region] for x in region}):
+                if headers[0] in scc:
+                    copies.extend(split_scc(top, scc, ons_graph, budget))
+                    break
+            if budget is not None and budget.stop is not CNSStop.DONE:
+                break
+        if not copies:
+            if budget is not None and budget.stop is not CNSStop.DONE:
+                return split
+            continue
+
+        split = True
+        if restrict_to is not None:
+            restrict_to.update(copies)
+        below = _get_dom_post_order(top)
+        below.reverse()
+        _dominate(ons_graph, below + copies, engine)
+        _number(top, top.pre)
+        x = top.idom
+        while x is not None and x not in dirty:
+            dirty.add(x)
+            x = x.idom
+        if budget is not None and budget.stop is not CNSStop.DONE:
+            return split
+        work.append(top)
+        work.extend(reversed(_get_dom_post_order(top, restrict_to)[:-1]))
+    return split
+
+
+def _keep_region(headers: list[ONSNode], weight: dict[ONSNode, int],
+                 succs: dict[ONSNode, set[ONSNode]]) -> ONSNode:
+    """Header of the region split_scc keeps.
+
+    Whatever of the regions still forms a loop without the kept one is left
+    twice: among the original regions, and among their copies below the kept
+    header. Keeping the heaviest region regardless doubles the copies at
+    every level of a dense SCC. Each header is scored by what its split
+    copies plus twice what splitting each loop left behind copies at least
+    (all but its heaviest region), and the lowest score wins, the first
+    header on ties.
+
     Args:
-        ons_graph (ons_graph_t):
-        start_node (ONS_Node_t): Is the dominators whose subtree we will investigate
-        restrict_to (list[OnsNode]): Do not leave this list (e.g. can be a domain or subgraph)
+        headers (list[ONSNode]): headers of the SCC in preorder
+        weight (dict[ONSNode, int]): weight of the region of each header
+        succs (dict[ONSNode, set[ONSNode]]): headers each region has edges to
 
     Returns:
-        (bool) true if there is an irreducible loop in this subtree
+        header to keep
+    """
+    total = sum(weight.values())
+    best, best_cost = None, None
+    for keep in headers:
+        cost = total - weight[keep]
+        rest = {h: [s for s in succs[h] if s is not keep] for h in headers if h is not keep}
+        for loop in get_tarjan_scc(rest):
+            if len(loop) > 1:
+                cost += 2 * (sum(weight[h] for h in loop) - max(weight[h] for h in loop))
+        if best_cost is None or cost < best_cost:
+            best, best_cost = keep, cost
+    return best
+
+
+def split_scc(top: ONSNode, scc: list[ONSNode], ons_graph: ons_graph_t,
+              budget: SplitBudget | None=None) -> list[ONSNode]:
+    """Make an irreducible SCC below top single entry.
 
+    Each header of scc (a node of it top is the idom of) dominates a region,
+    the nodes of scc below it. One region is kept (see _keep_region), every
+    other region gets a copy that takes over the edges from the kept region
+    and from the copies, so the kept header is the only way into the loop
+    that is left. The original regions keep the edges from outside scc and
+    among themselves, and lead into the loop; if they still form a loop with
+    more than one header it is a smaller one, split in turn.
+
+    Args:
+        top (ONSNode): idom of the headers of scc
+        scc (list[ONSNode]): the SCC, every node of it below top
+        ons_graph (ons_graph_t): graph, the copies are added to it
+        budget (SplitBudget): nothing is copied unless it allows the weight
+            of the copies
+
+    Returns:
+        the copies, added to ons_graph with labels above its largest, none
+        if the budget did not allow them
     """
-    if restrict_to and start_node not in restrict_to:
-        print(f"cannot process as start node not in restriction set")
-        return False
+    headers = sorted((x for x in scc if x.idom is top), key=lambda x: x.pre)
+    firsts = [h.pre for h in headers]
+    region_weight = {}
+    for x in scc:
+        h = headers[bisect_right(firsts, x.pre) - 1]
+        x.header = h
+        region_weight[h] = region_weight.get(h, 0) + x.weight
+    region_succs = {h: set() for h in headers}
+    for x in scc:
+        for s in x.succs:
+            if s.header is s and s is not x.header:
+                region_succs[x.header].add(s)
+    keep = _keep_region(headers, region_weight, region_succs)
+    if budget is not None and not budget.allows(sum(w for h, w in region_weight.items() if h is not keep)):
+        for x in scc:
+            x.header = None
+        return []
 
-    stack = [start_node]
-    processing = {g: 0 for g, _ in ons_graph.items()} # points to index of processed child
-    to_visit = []
+    label = max(ons_graph) + 1
+    copied = []
+    for x in scc:
+        if x.header is not keep:
+            x.copy = ONSNode(label, x.weight, x.original)
+            ons_graph[label] = x.copy
+            copied.append(x)
+            label += 1
 
-    while stack:
-        curr = stack[-1] # peek
-        children = [x for x in ons_graph.get(SUCCS_DOM) if (not restrict_to or x in restrict_to)]
-        if len(children) > processing[curr]:
-            curr_child = children[processing[curr]]
-            if curr_child not in stack:
-                stack.append(children[processing[curr]])
-            processing[curr] += 1
-        else:
-            # all children processed
-            if curr not in to_visit:
-                to_visit.append(curr)
-            stack.pop()
+    for h in headers:
+        if h is keep:
+            continue
+        preds = []
+        for p in h.preds:
+            if p.header is keep:
+                p.succs = [h.copy if s is h else s for s in p.succs]
+                h.copy.preds.append(p)
+            else:
+                preds.append(p)
+        h.preds = preds
 
+    for x in copied:
+        c = x.copy
+        for s in x.succs:
+            t = s.copy or s
+            c.succs.append(t)
+            t.preds.append(c)
 
+    copies = [x.copy for x in copied]
+    for x in scc:
+        x.copy = x.header = None
+    return copies
 
 
+def ons_reduce(graph: graph_t, weights: weights_t=None, engine: str="auto", time_limit: float | None=None,
+               max_splits: int | None=None, max_growth: int | None=None) -> tuple[graph_t, weights_t, split_data_t,
+                                                                                 CNSStop]:
+    """Make graph reducible with optimized node splitting
 
+    Unlike controlled node splitting, which copies one node at a time and
+    reduces in between, ONS copies whole regions of an irreducible SCC at
+    once (see split_scc). Some graphs take exponentially many copies either
+    way, close to complete ones for a start. With a budget set, splitting
+    stops before the split of an SCC that would run over it, and the graph
+    is returned as far as it got, with the limit that stopped it.
 
+    Args:
+        graph (graph_t): graph
+        weights (weights_t): weight, 1 for every node if not given
+        engine (str): dominator engine, see compute_idoms
+        time_limit (float): seconds the whole call may take
+        max_splits (int): number of SCCs that may be split
+        max_growth (int): weight the copies may add in total
 
+    Returns:
+        the split graph (without the nodes the start node does not reach),
+        its weights, each copy in it with the node of graph it copies, and
+        why splitting stopped: CNSStop.DONE when the graph is reducible
+    """
+    ons_g, start = init_ons(graph, weights, engine)
+    budget = SplitBudget(time_limit, max_splits, max_growth)
+    split_loops(start, ons_g, engine=engine, budget=budget)
+    return ({x.label: [s.label for s in x.succs] for x in ons_g.values()},
+            {x.label: x.weight for x in ons_g.values()},
+            tuple({"duplicate": x.label, "original": x.original} for x in ons_g.values() if x.label != x.original),
+            budget.stop)
@@ -1,15 +1,31 @@
-from src.lib.crawler_type import graph_t
+from array import array
+from itertools import accumulate, chain
+from typing import Iterable
 
-def get_tarjan_scc(graph: graph_t)->list[set[int]]:
+from src.lib.crawler_type import graph_t, CSRGraph, any_graph_t, Condensation
+from src.lib.graph_utils import get_preds
+
+def get_tarjan_scc(graph: any_graph_t, engine: str="tarjan")->list[list[int]]:
     """Find strongly connected components
 
     Args:
         graph (graph_t): graph to search
+        engine (str): "tarjan", or "pearce" for Pearce's variant, which keeps
+            one word per node instead of several dict entries (for very large
+            graphs, see get_pearce_scc)
 
     Returns:
-        list of sets of nodes, each a strongly connected component
+        list of lists of nodes, each a strongly connected component, in
+        reverse topological order. get_condensation is faster on int nodes
 
     """
+    if engine == "pearce":
+        return get_pearce_scc(graph)
+    if engine != "tarjan":
+        raise ValueError(f"undefined engine {engine}")
+    if isinstance(graph, CSRGraph):
+        return _get_tarjan_scc_csr(graph)
+
     ids = {}  # Discovery time (id) of each node
     low = {}  # Low-link value
     on_stack = set()  # Fast lookup for "is node on recursion stack?"
@@ -76,4 +92,361 @@ def get_tarjan_scc(graph: graph_t)->list[set[int]]:
                     real_parent = work_stack[-1][0]
                     low[real_parent] = min(low[real_parent], low[parent])
 
-    return results
\ No newline at end of file
+    return results
+
+def _get_tarjan_scc_csr(graph: CSRGraph) -> list[list[int]]:
+    """Same traversal as get_tarjan_scc on node indices, see _tarjan_arrays"""
+    _, offsets, nodes, _, _ = _tarjan_arrays(len(graph), graph.offsets.tolist(), graph.targets.tolist())
+    labels = graph.labels
+    return [[labels[i] for i in nodes[offsets[c]:offsets[c + 1]]] for c in range(len(offsets) - 1)]
+
+
+def _tarjan_arrays(n: int, offsets: list[int], targets: list[int]
+                   ) -> tuple[list[int], list[int], list[int], list[int], list[int]]:
+    """Tarjan's algorithm over flat successor lists.
+
+    Every pass of the outer loop scans the edges of the node on top of the
+    call stack until it meets an unvisited node, so there is one pass per
+    node entered or resumed rather than per edge. The nodes of a finished
+    component get id n, which no low-link value reaches, so the edges into
+    them drop out without an on-stack flag, and the component is cut off the
+    Tarjan stack as one slice. An edge into a node still on the stack stays
+    inside a component, so the edges between components are exactly the ones
+    into finished nodes, and those are collected on the way.
+
+    Returns:
+        component of each node, the start of each component in nodes, nodes
+        grouped by component (within one, the node reached last first), and
+        the edges between components as source node and target component
+    """
+    ids = [-1] * n
+    low = [0] * n
+    comp = [-1] * n
+    edge = offsets[:]
+    at = [0] * n  # position on the Tarjan stack
+    stack = []
+    work = []
+    nodes = []
+    comp_offsets = [0]
+    cross_from = []
+    cross_to = []
+    counter = 0
+
+    for root in range(n):
+        if ids[root] != -1:
+            continue
+        ids[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        work.append(root)
+
+        while work:
+            v = work[-1]
+            lv = low[v]
+            for i in range(edge[v], offsets[v + 1]):
+                w = targets[i]
+                iw = ids[w]
+                if iw == -1:
+                    # tree edge, carry on from the child
+                    edge[v] = i + 1
+                    low[v] = lv
+                    ids[w] = low[w] = counter
+                    counter += 1
+                    at[w] = len(stack)
+                    stack.append(w)
+                    work.append(w)
+                    break
+                if iw < lv:
+                    lv = iw
+                elif iw == n:
+                    cross_from.append(v)
+                    cross_to.append(comp[w])
+            else:
+                work.pop()
+                if lv == ids[v]:
+                    c = len(comp_offsets) - 1
+                    if stack[-1] == v:
+                        # most components of a CFG are single nodes
+                        stack.pop()
+                        comp[v] = c
+                        ids[v] = n
+                        nodes.append(v)
+                    else:
+                        members = stack[at[v]:]
+                        del stack[at[v]:]
+                        members.reverse()
+                        for w in members:
+                            comp[w] = c
+                            ids[w] = n
+                        nodes += members
+                    comp_offsets.append(len(nodes))
+                    if work:
+                        cross_from.append(work[-1])
+                        cross_to.append(c)
+                else:
+                    low[v] = lv
+                    u = work[-1]
+                    if lv < low[u]:
+                        low[u] = lv
+
+    return comp, comp_offsets, nodes, cross_from, cross_to
+
+
+def get_condensation(graph: any_graph_t) -> Condensation:
+    """Strongly connected components with the condensation DAG
+
+    Same components as get_tarjan_scc, in the same order, on flat lists
+    instead of dicts.
+
+    Args:
+        graph (any_graph_t): graph to search
+
+    Returns:
+        Condensation with the component of every node, the components in
+        reverse topological order and the DAG between them in CSR form
+    """
+    if isinstance(graph, CSRGraph):
+        labels, index = graph.labels, graph.index
+        offsets, targets = graph.offsets.tolist(), graph.targets.tolist()
+    else:
+        labels = array("q", graph)
+        index = dict(zip(labels, range(len(labels))))
+        offsets = list(accumulate(map(len, graph.values()), initial=0))
+        successors = list(chain.from_iterable(graph.values()))
+        try:
+            targets = list(map(index.__getitem__, successors))
+        except KeyError:
+            # nodes that are only successors go last, as in CSRGraph.from_graph
+            for s in successors:
+                if s not in index:
+                    index[s] = len(labels)
+                    labels.append(s)
+            targets = list(map(index.__getitem__, successors))
+            offsets += [len(targets)] * (len(labels) + 1 - len(offsets))
+    n = len(labels)
+    comp, comp_offsets, nodes, cross_from, cross_to = _tarjan_arrays(n, offsets, targets)
+
+    # edges between components, once each and grouped by source; every one
+    # goes to a lower component
+    k = len(comp_offsets) - 1
+    edges = sorted(set(zip(map(comp.__getitem__, cross_from), cross_to)))
+    counts = [0] * k
+    for c, _ in edges:
+        counts[c] += 1
+    dag = CSRGraph(array("q", range(k)), array("i", accumulate(counts, initial=0)),
+                   array("i", [d for _, d in edges]), dict(zip(range(k), range(k))))
+    return Condensation(labels, index, array("i", comp), array("i", comp_offsets), array("i", nodes), dag)
+
+
+def _pearce_arrays(n: int, offsets: array, targets: array) -> tuple[array, array]:
+    """Pearce's algorithm (PEA_FIND_SCC2) over a successor CSR.
+
+    rindex is the only array over all nodes besides a root bit: the preorder
+    number of a node while it is visited, the low-link once a successor lowers
+    it, and its component once that is done. Components are numbered down
+    from n - 1 and the numbers of their nodes are given back to the preorder
+    counter, so a finished node always has a larger rindex than any node
+    still open and needs no on-stack flag. The stacks only hold the open
+    nodes.
+
+    Returns:
+        the start of each component in nodes, and nodes grouped by component
+        (within one, the root last)
+    """
+    rindex = array("i", bytes(4 * n))  # 0: not visited yet
+    root = bytearray(n)
+    stack = array("i")
+    call = array("i")
+    edge = array("i")
+    nodes = array("i")
+    comp_offsets = array("i", [0])
+    index = 1
+    c = n - 1
+
+    for r in range(n):
+        if rindex[r]:
+            continue
+        rindex[r] = index
+        index += 1
+        root[r] = 1
+        call.append(r)
+        edge.append(offsets[r])
+
+        while call:
+            v = call[-1]
+            rv = rindex[v]
+            for i in range(edge[-1], offsets[v + 1]):
+                w = targets[i]
+                rw = rindex[w]
+                if not rw:
+                    edge[-1] = i + 1
+                    rindex[v] = rv
+                    rindex[w] = index
+                    index += 1
+                    root[w] = 1
+                    call.append(w)
+                    edge.append(offsets[w])
+                    break
+                if rw < rv:
+                    rv = rw
+                    root[v] = 0
+            else:
+                call.pop()
+                edge.pop()
+                if root[v]:
+                    index -= 1
+                    while stack and rv <= rindex[stack[-1]]:
+                        w = stack.pop()
+                        rindex[w] = c
+                        index -= 1
+                        nodes.append(w)
+                    rindex[v] = rv = c
+                    c -= 1
+                    nodes.append(v)
+                    comp_offsets.append(len(nodes))
+                else:
+                    rindex[v] = rv
+                    stack.append(v)
+                if call:
+                    u = call[-1]
+                    if rv < rindex[u]:
+                        rindex[u] = rv
+                        root[u] = 0
+
+    return comp_offsets, nodes
+
+
+def get_pearce_scc(graph: any_graph_t) -> list[list[int]]:
+    """Find strongly connected components with Pearce's space efficient
+    variant of Tarjan's algorithm
+
+    ref: "A space-efficient algorithm for finding strongly connected
+    components" -Pearce. https://doi.org/10.1016/j.ipl.2015.08.010
+
+    Args:
+        graph (any_graph_t): graph to search
+
+    Returns:
+        list of lists of nodes, each a strongly connected component, in the
+        order of get_tarjan_scc (the nodes within one may come in another)
+    """
+    if isinstance(graph, CSRGraph):
+        labels, offsets, targets = graph.labels, graph.offsets, graph.targets
+    else:
+        # flat arrays straight from the dict, without the predecessor lists
+        # CSRGraph would add
+        labels = list(graph)
+        index = dict(zip(labels, range(len(labels))))
+        for s in chain.from_iterable(graph.values()):
+            if s not in index:
+                index[s] = len(labels)
+                labels.append(s)
+        offsets = array("i", accumulate(map(len, graph.values()), initial=0))
+        offsets.extend([offsets[-1]] * (len(labels) + 1 - len(offsets)))
+        targets = array("i", map(index.__getitem__, chain.from_iterable(graph.values())))
+        del index
+    comp_offsets, nodes = _pearce_arrays(len(labels), offsets, targets)
+    return [[labels[i] for i in nodes[comp_offsets[c]:comp_offsets[c + 1]]] for c in range(len(comp_offsets) - 1)]
+
+
+
+def _scc_search(node, succ_of, pred_of, fwd: dict, bwd: dict, q: int, settled: dict) -> list:
+    """The component of node, by forward and backward search from it.
+
+    The two searches take turns until one of them has found everything it
+    can reach; the component is what the other direction reaches from node
+    within that set, so only the smaller side is explored in full. fwd and
+    bwd hold the number of the last query that saw each node, and nodes
+    settled by earlier queries are skipped: they are in other components,
+    and so is anything the search would only reach through them.
+    """
+    fwd[node] = bwd[node] = q
+    fstack = [node]
+    bstack = [node]
+    while fstack and bstack:
+        for s in succ_of(fstack.pop()):
+            if fwd.get(s) != q and s not in settled:
+                fwd[s] = q
+                fstack.append(s)
+        for p in pred_of(bstack.pop()):
+            if bwd.get(p) != q and p not in settled:
+                bwd[p] = q
+                bstack.append(p)
+
+    if fstack:
+        region, other, mark = bwd, succ_of, fwd
+    else:
+        region, other, mark = fwd, pred_of, bwd
+    # ~q is no query number, it marks the nodes of the component
+    scc = [node]
+    mark[node] = ~q
+    stack = [node]
+    while stack:
+        for y in other(stack.pop()):
+            if region.get(y) == q and mark.get(y) != ~q:
+                mark[y] = ~q
+                scc.append(y)
+                stack.append(y)
+    return scc
+
+
+def _sccs_of(succ_of, pred_of, nodes) -> dict:
+    settled = {}
+    fwd = {}
+    bwd = {}
+    result = {}
+    for q, node in enumerate(nodes):
+        if node not in settled:
+            scc = _scc_search(node, succ_of, pred_of, fwd, bwd, q, settled)
+            for x in scc:
+                settled[x] = scc
+        result[node] = settled[node]
+    return result
+
+
+def sccs_of(graph: any_graph_t, nodes: Iterable[int], preds: graph_t=None) -> dict[int, list[int]]:
+    """Strongly connected components of some nodes, without decomposing the
+    whole graph
+
+    The marks of the searches are shared by all queries, and a node already
+    found in the component of an earlier one is answered straight away.
+
+    Args:
+        graph (any_graph_t): graph to search
+        nodes (Iterable[int]): nodes to find the components of
+        preds (graph_t): predecessor lists of graph as get_preds gives them,
+            computed if not given (a CSRGraph has its own)
+
+    Returns:
+        the component of every node of nodes. Nodes of the same component
+        share one list, which starts with the first of them asked for
+    """
+    if isinstance(graph, CSRGraph):
+        offsets, targets = graph.offsets, graph.targets
+        pred_offsets, pred_sources = graph.pred_offsets, graph.pred_sources
+        labels, index = graph.labels, graph.index
+        nodes = list(nodes)
+        for node in nodes:
+            if node not in index:
+                raise ValueError(f"undefined node {node}")
+        found = _sccs_of(lambda i: targets[offsets[i]:offsets[i + 1]],
+                         lambda i: pred_sources[pred_offsets[i]:pred_offsets[i + 1]],
+                         [index[node] for node in nodes])
+        as_labels = {}
+        for scc in found.values():
+            if id(scc) not in as_labels:
+                as_labels[id(scc)] = [labels[i] for i in scc]
+        return {labels[i]: as_labels[id(scc)] for i, scc in found.items()}
+
+    if preds is None:
+        preds = get_preds(graph)
+    nodes = list(nodes)
+    for node in nodes:
+        if node not in graph and node not in preds:
+            raise ValueError(f"undefined node {node}")
+    return _sccs_of(lambda x: graph.get(x, ()), lambda x: preds.get(x, ()), nodes)
+
+
+def scc_of(graph: any_graph_t, node: int, preds: graph_t=None) -> list[int]:
+    """Strongly connected component of node, node first (see sccs_of)"""
+    return sccs_of(graph, (node,), preds)[node]
@@ -0,0 +1,167 @@
+import unittest
+
+import networkx as nx
+
+from benchmarks.graph_gen import random_cfg, structured_cfg, multi_region_cfg
+from src.lib.crawler_type import CNSStop
+from src.lib.cns_reduction import cns_reduce, get_split, SplitQueue, cns_reduce_sccs, iter_cns_reduce
+from src.lib.dominator import get_dominator_tree
+from src.lib.graph_utils import get_preds
+from tests.base_test import BaseCase
+from tests.helper import sort_dict, g_to_nx
+
+
+class TestCNS(BaseCase):
+
+    def assert_cns(self, g, strategy_name="normal_node"):
+        res = cns_reduce(g, strategy_name=strategy_name)
+        self.assertEqual(1, len(res[-1][0]["graph"]))
+        self.assertEqual((), res[0][1])
+
+        total = len(g)
+        for (before, _), (after, split) in zip(res, res[1:]):
+            # the split the incremental driver made is the one a fresh
+            # dominator tree of the graph before it leads to
+            node = split[0]["original"]
+            self.assertEqual(get_split(before["preds"], get_dominator_tree(before["graph"]), before["weights"],
+                                       strategy_name), node)
+            self.assertEqual(len(before["preds"][node]), len(split))
+            self.assertEqual(node, split[0]["duplicate"])
+            total += before["weights"][node] * (len(split) - 1)
+
+            self.assertEqual(sort_dict(get_preds(after["graph"])), sort_dict(after["preds"]))
+            self.assertEqual(total, sum(after["weights"].values()))
+        return res
+
+    def test_cns_reduce(self):
+        graphs = list(self.graphs) + [random_cfg(10 + seed, seed=seed) for seed in range(40)] \
+            + [structured_cfg(150, goto_prob=0.05, seed=seed) for seed in range(10)] \
+            + [structured_cfg(2000, goto_prob=0.05, seed=seed) for seed in range(2)]
+        for g in graphs:
+            self.assert_cns(g)
+            self.assert_cns(g, "back_edge")
+
+    def test_irreducible(self):
+        res = self.assert_cns({0: [1, 2], 1: [2], 2: [1]})
+        self.assertEqual(2, len(res))
+        self.assertEqual({0: [1, 2], 1: [2], 2: [1]}, res[0][0]["graph"])
+        self.assertEqual(({"duplicate": 1, "original": 1}, {"duplicate": 3, "original": 1}), res[1][1])
+        self.assertEqual({0: 4}, res[1][0]["weights"])
+
+    def test_split_queue(self):
+        for g in list(self.graphs) + [random_cfg(10 + seed, seed=seed) for seed in range(20)]:
+            preds = get_preds(g)
+            dom_tree = get_dominator_tree(g)
+            weights = {x: 1 + x % 3 for x in g}
+            for strategy_name in ("normal_node", "back_edge"):
+                queue = SplitQueue(preds, g, dom_tree, weights, strategy_name)
+                self.assertEqual(get_split(preds, dom_tree, weights, strategy_name), queue.best())
+                # a heavier node gives way to the next one
+                node = queue.best()
+                if node is not None:
+                    weights[node] += 100
+                    queue.update([node])
+                    self.assertEqual(get_split(preds, dom_tree, weights, strategy_name), queue.best())
+                    weights[node] -= 100
+
+    def test_cns_reduce_sccs(self):
+        graphs = list(self.graphs) + [random_cfg(10 + seed, seed=seed) for seed in range(30)] \
+            + [structured_cfg(300, goto_prob=0.05, seed=seed) for seed in range(5)] + [multi_region_cfg(4, 30)]
+        for g in graphs:
+            for strategy_name in ("normal_node", "back_edge"):
+                res = cns_reduce_sccs(g, strategy_name=strategy_name, max_workers=1)
+                self.assertEqual(cns_reduce(g)[0], res[0])
+                self.assertEqual(1, len(res[-1][0]["graph"]))
+                total = len(g)
+                for (before, _), (after, split) in zip(res, res[1:]):
+                    # predecessors outside the SCC share one copy
+                    node = split[0]["original"]
+                    self.assertLessEqual(len(split), len(before["preds"][node]))
+                    total += before["weights"][node] * (len(split) - 1)
+                    self.assertEqual(sort_dict(get_preds(after["graph"])), sort_dict(after["preds"]))
+                    self.assertEqual(total, sum(after["weights"].values()))
+
+    def test_cns_reduce_sccs_parallel(self):
+        g = multi_region_cfg(3, 40)
+        self.assertEqual(cns_reduce_sccs(g, max_workers=1), cns_reduce_sccs(g, max_workers=2))
+
+    def test_history(self):
+        graphs = [random_cfg(10 + seed, seed=seed) for seed in range(20)] \
+            + [structured_cfg(300, goto_prob=0.05, seed=seed) for seed in range(3)]
+        for g in graphs:
+            for strategy_name in ("normal_node", "back_edge"):
+                res = cns_reduce(g, strategy_name=strategy_name)
+                # rebuilding a step from the deltas gives the state the
+                # reduction was in, adjacency order included
+                items = list(iter_cns_reduce(g, strategy_name=strategy_name))
+                self.assertEqual(items, list(res))
+                self.assertEqual(len(items), len(res))
+                for k in reversed(range(len(res))):
+                    self.assertEqual(items[k], res[k])
+                self.assertEqual(items[-1], res[-1])
+                self.assertEqual(items[1::2], res[1::2])
+
+    def test_history_sccs(self):
+        g = multi_region_cfg(4, 30)
+        res = cns_reduce_sccs(g, max_workers=1)
+        last = res[-1]
+        self.assertEqual(res[len(res) // 2], res[len(res) // 2])
+        self.assertEqual(last, list(res)[-1])
+        with self.assertRaises(IndexError):
+            res[len(res)]
+
+    def test_budget(self):
+        g = structured_cfg(300, goto_prob=0.05, seed=0)
+        full = cns_reduce(g)
+        self.assertIs(CNSStop.DONE, full.stop)
+        self.assertEqual([], full.remaining)
+        self.assertEqual(sum(full[-1][0]["weights"].values()) - len(g), full.growth)
+        self.assertGreater(len(full), 4)
+
+        res = cns_reduce(g, max_splits=3)
+        self.assertIs(CNSStop.SPLITS, res.stop)
+        self.assertEqual(full[:4], list(res))
+        last = res[-1][0]["graph"]
+        self.assertEqual(sorted(sorted(c) for c in nx.strongly_connected_components(g_to_nx(last)) if len(c) > 1),
+                         sorted(res.remaining))
+        self.assertTrue(res.remaining)
+
+        growth = [sum(after["weights"].values()) - len(g) for after, _ in full]
+        limit = growth[3] - 1
+        res = cns_reduce(g, max_growth=limit)
+        self.assertIs(CNSStop.GROWTH, res.stop)
+        self.assertLessEqual(res.growth, limit)
+        self.assertGreater(growth[len(res)], limit)
+
+        res = cns_reduce(g, time_limit=0)
+        self.assertIs(CNSStop.TIME, res.stop)
+        self.assertEqual(1, len(res))
+        self.assertTrue(res.remaining)
+
+        def run():
+            return (yield from iter_cns_reduce(g, max_splits=2))
+        steps = run()
+        self.assertEqual(full[:3], [next(steps) for _ in range(3)])
+        with self.assertRaises(StopIteration) as stop:
+            next(steps)
+        self.assertIs(CNSStop.SPLITS, stop.exception.value)
+
+    def test_budget_sccs(self):
+        g = multi_region_cfg(4, 30)
+        full = cns_reduce_sccs(g, max_workers=1)
+        self.assertIs(CNSStop.DONE, full.stop)
+        res = cns_reduce_sccs(g, max_workers=1, max_splits=len(full) // 2)
+        self.assertIs(CNSStop.SPLITS, res.stop)
+        self.assertEqual(full[:len(full) // 2 + 1], list(res))
+        self.assertTrue(res.remaining)
+        res = cns_reduce_sccs(g, max_workers=1, time_limit=0)
+        self.assertIs(CNSStop.TIME, res.stop)
+        self.assertEqual(1, len(res))
+
+    def test_undefined_strategy(self):
+        with self.assertRaises(ValueError):
+            cns_reduce({0: [1, 2], 1: [2], 2: [1]}, strategy_name="normal_mode")
+
+
+if __name__ == '__main__':
+    unittest.main()
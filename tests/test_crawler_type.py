@@ -0,0 +1,41 @@
+import unittest
+
+from src.lib.crawler_type import CSRGraph
+from src.lib.graph_utils import get_preds, reverse_graph
+from tests.base_test import BaseCase
+from tests.helper import sort_dict
+
+
+class TestCSRGraph(BaseCase):
+
+    def test_round_trip(self):
+        for g in self.graphs:
+            csr = CSRGraph.from_graph(g)
+            self.assertEqual(g, csr.to_graph())
+            self.assertEqual(list(g), list(csr.to_graph()))
+            self.assertEqual(next(iter(g)), csr.start)
+
+    def test_preds(self):
+        for g in self.graphs:
+            csr = CSRGraph.from_graph(g)
+            self.assertEqual(sort_dict(get_preds(g)), sort_dict(csr.to_preds()))
+            for i in range(len(csr)):
+                self.assertEqual(list(csr.preds(i)), sorted(csr.preds(i)))
+
+    def test_successor_only_nodes(self):
+        csr = CSRGraph.from_graph({0: [1, 2], 1: [2]})
+        self.assertEqual(3, len(csr))
+        self.assertEqual(3, csr.num_edges)
+        self.assertEqual({0: [1, 2], 1: [2], 2: []}, csr.to_graph())
+
+    def test_reverse(self):
+        g = {0: [1, 2], 1: [3], 2: [3], 3: []}
+        rev = reverse_graph(CSRGraph.from_graph(g))
+        self.assertEqual(reverse_graph(g), rev.to_graph())
+        self.assertEqual(3, rev.start)
+        with self.assertRaises(ValueError):
+            reverse_graph(CSRGraph.from_graph({0: [1, 2], 1: [], 2: []}))
+
+
+if __name__ == '__main__':
+    unittest.main()
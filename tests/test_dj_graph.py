@@ -0,0 +1,150 @@
+import random
+import unittest
+
+import networkx as nx
+
+from benchmarks.graph_gen import random_cfg, structured_cfg, nested_loops_cfg
+from src.lib.crawler_type import CSRGraph
+from src.lib.dj_graph import gen_dj_graph, identify_loops, loop_body, iterated_dominance_frontier, \
+    iterated_dominance_frontier_batch, is_reducible
+from src.lib.hecht_ullman_reduction import get_reduced_graph
+from tests.base_test import BaseCase
+from tests.helper import g_to_nx
+
+
+class TestDJGraph(BaseCase):
+
+    def assert_loops_match(self, g):
+        loops = identify_loops(g)
+        start = next(iter(g))
+        nx_g = g_to_nx(g)
+        sub = nx_g.subgraph(nx.descendants(nx_g, start) | {start})
+        idoms = nx.immediate_dominators(sub, start)
+
+        # the outermost loops are exactly the cyclic strongly connected components
+        sccs = [sorted(c) for c in nx.strongly_connected_components(sub)
+                if len(c) > 1 or sub.has_edge(next(iter(c)), next(iter(c)))]
+        outer = [sorted(loop_body(loops, i)) for i, loop in enumerate(loops) if loop["parent"] is None]
+        self.assertEqual(sorted(sccs), sorted(outer))
+
+        seen = set()
+        for i, loop in enumerate(loops):
+            self.assertFalse(seen & set(loop["nodes"]))
+            seen.update(loop["nodes"])
+            body = set(loop_body(loops, i))
+            self.assertTrue(nx.is_strongly_connected(sub.subgraph(body)))
+            if loop["parent"] is not None:
+                self.assertLess(i, loop["parent"])
+            if loop["reducible"]:
+                self.assertEqual([loop["header"]], loop["entries"])
+                for x in body:
+                    while x not in (loop["header"], start):
+                        x = idoms[x]
+                    self.assertEqual(loop["header"], x)
+            else:
+                entries = [x for x in body if x == start or any(p not in body for p in sub.predecessors(x))]
+                self.assertEqual(sorted(entries), sorted(loop["entries"]))
+                self.assertEqual(loop["entries"][0], loop["header"])
+
+    def test_gen_dj_graph(self):
+        for g in self.graphs:
+            dj = gen_dj_graph(g)
+            nx_g = g_to_nx(g)
+            start = next(iter(g))
+            idoms = nx.immediate_dominators(nx_g, start)
+            for node, data in dj.items():
+                self.assertEqual(None if node == start else idoms[node], data["idom"])
+                self.assertEqual(sorted(s for s in g[node] if s == start or idoms[s] != node),
+                                 sorted(data["bj_succs"] + data["cj_succs"]))
+                for s in data["bj_succs"]:
+                    self.assertIn(s, _dominators(idoms, node, start))
+                for s in data["d_succs"]:
+                    self.assertEqual(node, idoms[s])
+                    self.assertEqual(data["level"] + 1, dj[s]["level"])
+            self.assertEqual(gen_dj_graph(CSRGraph.from_graph(g)), dj)
+
+    def test_loops(self):
+        for g in self.graphs:
+            self.assert_loops_match(g)
+        for seed in range(40):
+            self.assert_loops_match(random_cfg(5 + seed, seed=seed))
+            self.assert_loops_match(structured_cfg(150, goto_prob=0.05, seed=seed))
+
+    def test_irreducible(self):
+        loops = identify_loops({0: [1, 2], 1: [2], 2: [1, 3], 3: []})
+        self.assertEqual([{"header": 1, "entries": [1, 2], "reducible": False, "nodes": [1, 2], "parent": None}],
+                         loops)
+
+    def test_nested(self):
+        # 1 heads the outer loop, 2 the inner one
+        g = {0: [1], 1: [2], 2: [3], 3: [2, 4], 4: [1, 5], 5: []}
+        self.assertEqual([
+            {"header": 2, "entries": [2], "reducible": True, "nodes": [2, 3], "parent": 1},
+            {"header": 1, "entries": [1], "reducible": True, "nodes": [1, 4], "parent": None},
+        ], identify_loops(g))
+        self.assertEqual([1, 2, 3, 4], sorted(loop_body(identify_loops(g), 1)))
+
+    def test_iterated_dominance_frontier(self):
+        def via_nx(g, defs):
+            df = nx.dominance_frontiers(g_to_nx(g), next(iter(g)))
+            idf = set()
+            work = list(defs)
+            while work:
+                for y in df.get(work.pop(), ()):
+                    if y not in idf:
+                        idf.add(y)
+                        work.append(y)
+            return sorted(idf)
+
+        rnd = random.Random(0)
+        graphs = list(self.graphs) + [random_cfg(5 + seed, seed=seed) for seed in range(20)] \
+            + [structured_cfg(100, goto_prob=0.05, seed=seed) for seed in range(20)]
+        for g in graphs:
+            nodes = list(g)
+            def_sets = [rnd.sample(nodes, rnd.randint(1, min(5, len(nodes)))) for _ in range(8)]
+            expected = [via_nx(g, defs) for defs in def_sets]
+            self.assertEqual(expected, iterated_dominance_frontier_batch(g, def_sets))
+            self.assertEqual(expected, iterated_dominance_frontier_batch(g, def_sets, share_frontiers=False))
+            self.assertEqual(expected[0], iterated_dominance_frontier(CSRGraph.from_graph(g), def_sets[0]))
+
+    def test_iterated_dominance_frontier_loop(self):
+        # a def inside the loop needs a phi at the header and after the if
+        g = {0: [1], 1: [2, 3], 2: [4], 3: [4], 4: [1, 5], 5: []}
+        self.assertEqual([1, 4], iterated_dominance_frontier(g, [2]))
+        self.assertEqual([], iterated_dominance_frontier(g, [0]))
+        self.assertEqual([], iterated_dominance_frontier(g, [42]))
+
+    def test_is_reducible(self):
+        graphs = list(self.graphs) + [random_cfg(3 + seed, seed=seed) for seed in range(40)] \
+            + [structured_cfg(150, goto_prob=0.03, seed=seed) for seed in range(20)] + [nested_loops_cfg(20)]
+        for g in graphs:
+            reducible, edges = is_reducible(g)
+            start = next(iter(g))
+            nx_g = g_to_nx(g)
+            reach = nx.descendants(nx_g, start) | {start}
+            data = get_reduced_graph({x: g[x] for x in reach})
+            self.assertEqual(len(data["graph"]) == 1, reducible)
+            self.assertEqual(reducible, not edges)
+            idoms = nx.immediate_dominators(nx_g, start)
+            for x, y in edges:
+                self.assertIn(y, g[x])
+                self.assertNotIn(y, _dominators(idoms, x, start))
+                # retreating edges close a cycle
+                self.assertTrue(nx.has_path(nx_g, y, x))
+
+    def test_is_reducible_edges(self):
+        self.assertEqual((False, [(2, 1)]), is_reducible({0: [1, 2], 1: [2], 2: [1]}))
+        self.assertEqual((True, []), is_reducible(nested_loops_cfg(3)))
+        self.assertEqual((True, []), is_reducible({0: [0]}))
+
+
+def _dominators(idoms, node, start):
+    doms = [node]
+    while node != start:
+        node = idoms[node]
+        doms.append(node)
+    return doms
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,15 @@
 import unittest
 
-from src.lib.dominator import get_dominator_tree, get_dominance_frontier
+from src.lib.crawler_type import CSRGraph
+import networkx as nx
+
+from benchmarks.graph_gen import random_cfg, chain_cfg, structured_cfg
+from src.lib.dominator import get_dominator_tree, get_dominance_frontier, compute_idoms, pick_engine, IDOM_ENGINES, \
+    DominatorIndex, reverse_preorder_csr, get_post_dominator_tree, get_post_dominance_frontier, \
+    get_control_dependence_graph, compute_ipdoms, VIRTUAL_EXIT
+from src.lib.lengauer_tarjan import gen_lt_graph
 from tests.base_test import BaseCase
-from tests.helper import get_dominator_tree_via_nx, get_dominance_frontier_via_nx
+from tests.helper import get_dominator_tree_via_nx, get_dominance_frontier_via_nx, g_to_nx
 
 
 def sort_dict(d:dict)->dict:
@@ -25,6 +32,58 @@ class TestDominator(BaseCase):
             print(f"g is {g}")
             self.assertEqual(sort_dict(df_nx), sort_dict(df_ours))
 
+    def test_csr_input(self):
+        for g in self.graphs:
+            csr = CSRGraph.from_graph(g)
+            self.assertEqual(sort_dict(get_dominator_tree_via_nx(g)), sort_dict(get_dominator_tree(csr)))
+            self.assertEqual(sort_dict(get_dominance_frontier_via_nx(g)), sort_dict(get_dominance_frontier(csr)))
+
+    def test_engines_agree(self):
+        for g in self.graphs:
+            self.assertEqual(get_dominator_tree(g, engine="nodal"), get_dominator_tree(g, engine="lt"))
+            self.assertEqual(sort_dict(get_dominance_frontier(g, engine="nodal")),
+                             sort_dict(get_dominance_frontier(g, engine="lt")))
+            self.assertEqual(sort_dict(get_dominance_frontier(g, return_orig_number=False, engine="nodal")),
+                             sort_dict(get_dominance_frontier(g, return_orig_number=False, engine="lt")))
+        with self.assertRaises(ValueError):
+            get_dominator_tree({0: []}, engine="nope")
+
+    def test_compute_idoms_engines_agree(self):
+        graphs = self.graphs + [random_cfg(n, extra_edges=k, back_edge_prob=p, seed=s)
+                                for n in (10, 100, 1000) for k in (1, 3) for p in (0.1, 0.5) for s in range(3)]
+        graphs.append(chain_cfg(500))
+        for g in graphs:
+            results = {engine: compute_idoms(g, engine=engine) for engine in list(IDOM_ENGINES) + ["auto"]}
+            idom, pre, rev = results["lt"]
+            for engine, res in results.items():
+                self.assertEqual(idom, res[0], engine)
+                self.assertEqual(pre, res[1])
+                self.assertEqual(rev, res[2])
+
+            start = next(iter(g))
+            idoms_ours = {rev[idx]: rev[d] for idx, d in enumerate(idom) if d != -1}
+            self.assertEqual(nx.immediate_dominators(g_to_nx(g), start=start), idoms_ours)
+
+    def test_semi_nca_deep_parent(self):
+        # every y hangs off the end of a long chain but is also reached from the
+        # root, the Semi-NCA walk is as long as the chain for each of them
+        k = 300
+        g = {0: [1] + list(range(k + 1, 2 * k))}
+        g |= {i: [i + 1] for i in range(1, k)}
+        g[k] = list(range(k + 1, 2 * k))
+        g |= {y: [] for y in range(k + 1, 2 * k)}
+        idom, pre, rev = compute_idoms(g, engine="semi_nca")
+        self.assertEqual(idom, compute_idoms(g, engine="lt")[0])
+        self.assertTrue(all(idom[pre[y]] == 0 for y in range(k + 1, 2 * k)))
+
+    def test_pick_engine(self):
+        self.assertEqual("tree", pick_engine(10, 9))
+        self.assertEqual("semi_nca", pick_engine(10, 20))
+        self.assertEqual("lt", pick_engine(100_000, 200_000))
+        self.assertEqual("tree", pick_engine(1, 0))
+        with self.assertRaises(ValueError):
+            compute_idoms({0: []}, engine="nope")
+
     def test_get_dominance_frontier_root(self):
         g = {
             0:[1],
@@ -36,5 +95,123 @@ class TestDominator(BaseCase):
         print(f"g is {g}")
         self.assertEqual(sort_dict(df_nx), sort_dict(df_ours))
 
+
+class TestPostDominator(BaseCase):
+
+    def via_nx(self, g):
+        """post-dominator tree and frontier from networkx, with the virtual exit
+        connected to the same nodes reverse_preorder_csr picked"""
+        csr, _ = reverse_preorder_csr(g)
+        nx_g = g_to_nx(g)
+        for i in csr.succs(0):
+            nx_g.add_edge(csr.labels[i], VIRTUAL_EXIT)
+        rev_g = nx_g.reverse()
+        tree = {node: [] for node in nx_g}
+        for node, d in nx.immediate_dominators(rev_g, VIRTUAL_EXIT).items():
+            if node != VIRTUAL_EXIT:
+                tree[d].append(node)
+        df = nx.dominance_frontiers(rev_g, VIRTUAL_EXIT)
+        return tree, {node: df[node] for node in g_to_nx(g)}
+
+    def graphs_to_check(self):
+        return list(self.graphs) + [random_cfg(5 + seed, seed=seed) for seed in range(30)] \
+            + [structured_cfg(100, goto_prob=0.05, seed=seed) for seed in range(30)]
+
+    def test_post_dominator_tree(self):
+        for g in self.graphs_to_check():
+            tree, pdf = self.via_nx(g)
+            self.assertEqual(sort_dict(tree), sort_dict(get_post_dominator_tree(g)))
+            self.assertEqual(sort_dict(pdf), sort_dict(get_post_dominance_frontier(g)))
+            self.assertEqual(sort_dict(pdf), sort_dict(get_post_dominance_frontier(CSRGraph.from_graph(g))))
+
+    def test_exit_connections(self):
+        # every exit, and one node of every strongly connected component with no way out
+        for g in self.graphs_to_check():
+            csr, _ = reverse_preorder_csr(g)
+            connected = {csr.labels[i] for i in csr.succs(0)}
+            cond = nx.condensation(g_to_nx(g))
+            for c in cond:
+                members = cond.nodes[c]["members"]
+                expected = 1 if cond.out_degree(c) == 0 else 0
+                self.assertEqual(expected, len(connected & members))
+
+    def test_multiple_exits_and_loops(self):
+        g = {0: [1, 2], 1: [], 2: [3], 3: [2]}
+        self.assertEqual({VIRTUAL_EXIT: [0, 1, 3], 1: [], 3: [2], 2: [], 0: []}, sort_dict(get_post_dominator_tree(g)))
+        ipdom, pre, rev = compute_ipdoms(g)
+        self.assertEqual(VIRTUAL_EXIT, rev[ipdom[pre[0]]])
+        with self.assertRaises(ValueError):
+            get_post_dominator_tree({0: [-1], -1: []})
+
+    def test_control_dependence_graph(self):
+        # 0: if (..) 1 else 2; 3: while (..) 4; 5
+        g = {0: [1, 2], 1: [3], 2: [3], 3: [4, 5], 4: [3], 5: []}
+        self.assertEqual({0: [1, 2], 3: [3, 4]}, {x: sorted(ys) for x, ys in get_control_dependence_graph(g).items() if ys})
+        for g in self.graphs_to_check():
+            _, pdf = self.via_nx(g)
+            cdg = get_control_dependence_graph(g)
+            self.assertEqual(sorted((x, y) for y, xs in pdf.items() for x in xs),
+                             sorted((x, y) for x, ys in cdg.items() for y in ys))
+
+
+def dominators_via_nx(g) -> dict:
+    """node -> list of all its dominators, walking the networkx idoms"""
+    start = next(iter(g))
+    idoms = nx.immediate_dominators(g_to_nx(g), start)
+    doms = {start: [start]}
+    for node in idoms:
+        chain = [node]
+        while chain[-1] != start:
+            chain.append(idoms[chain[-1]])
+        doms[node] = chain
+    return doms
+
+
+class TestDominatorIndex(BaseCase):
+
+    def _graphs(self):
+        return self.graphs + [random_cfg(60, extra_edges=2, back_edge_prob=p, seed=s)
+                              for p in (0.1, 0.5) for s in range(4)]
+
+    def test_queries(self):
+        for g in self._graphs():
+            doms = dominators_via_nx(g)
+            index = DominatorIndex.from_lt_graph(*gen_lt_graph(g))
+            for b, b_doms in doms.items():
+                self.assertEqual(len(b_doms) - 1, index.depth(b))
+                self.assertEqual(None if len(b_doms) == 1 else b_doms[1], index.immediate_dominator(b))
+                for a in doms:
+                    self.assertEqual(a in b_doms, index.dominates(a, b))
+                    self.assertEqual(a in b_doms and a != b, index.strictly_dominates(a, b))
+                    common = next(x for x in doms[a] if x in b_doms)
+                    self.assertEqual(common, index.nearest_common_dominator(a, b))
+            self.assertEqual(len(doms), index.subtree_size(next(iter(g))))
+
+    def test_from_graph(self):
+        for g in self._graphs():
+            a = DominatorIndex.from_lt_graph(*gen_lt_graph(g))
+            b = DominatorIndex.from_graph(g)
+            self.assertEqual((a.tin, a.tout, a.depth_of), (b.tin, b.tout, b.depth_of))
+
+    def test_batch(self):
+        g = random_cfg(200, extra_edges=2, back_edge_prob=0.3, seed=7)
+        index = DominatorIndex.from_graph(g)
+        pairs = [(a, b) for a in range(0, 200, 7) for b in range(0, 200, 3)]
+        expected_dom = [index.dominates(a, b) for a, b in pairs]
+        expected_lca = [index.nearest_common_dominator(a, b) for a, b in pairs]
+        self.assertEqual(expected_dom, index.dominates_batch(pairs))
+        self.assertEqual(expected_lca, index.nearest_common_dominator_batch(pairs))
+
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest("numpy not installed")
+        arr = np.array(pairs)
+        self.assertEqual(expected_dom, index.dominates_batch(arr).tolist())
+        self.assertEqual(expected_lca, index.nearest_common_dominator_batch(arr).tolist())
+        with self.assertRaises(KeyError):
+            index.dominates_batch(np.array([[0, 1000]]))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,63 @@
+import random
+import unittest
+
+import networkx as nx
+
+from benchmarks.graph_gen import random_cfg
+from src.lib.dynamic_dominator import DynamicDominators
+from tests.base_test import BaseCase
+from tests.helper import g_to_nx
+
+
+class TestDynamicDominators(BaseCase):
+
+    def assert_matches_nx(self, dd: DynamicDominators):
+        nx_g = g_to_nx(dd.succs)
+        idoms = nx.immediate_dominators(nx_g, dd.start)
+        self.assertEqual({dd.start: None} | idoms, dd.idom)
+        for node, d in dd.idom.items():
+            self.assertEqual(0 if d is None else dd.depth[d] + 1, dd.depth[node])
+        if dd.df is not None:
+            df = nx.dominance_frontiers(nx_g, dd.start)
+            self.assertEqual({k: sorted(v) for k, v in df.items()}, dd.dominance_frontier())
+
+    def test_seed(self):
+        for g in self.graphs:
+            self.assert_matches_nx(DynamicDominators(g, track_frontier=True))
+
+    def test_insert_changes_idoms(self):
+        g = {0: [1], 1: [2], 2: [3], 3: []}
+        dd = DynamicDominators(g)
+        self.assertEqual({3}, dd.insert_edge(0, 3))
+        self.assertEqual(0, dd.idom[3])
+        self.assertEqual(set(), dd.insert_edge(3, 1))
+        self.assert_matches_nx(dd)
+
+    def test_new_and_lost_nodes(self):
+        dd = DynamicDominators({0: [1], 1: []}, track_frontier=True)
+        self.assertEqual({2, 3}, dd.insert_edge(1, 2) | dd.insert_edge(2, 3))
+        self.assertEqual(2, dd.idom[3])
+        self.assertEqual({2, 3}, dd.delete_edge(1, 2))
+        self.assertFalse(dd.reachable(3))
+        self.assert_matches_nx(dd)
+        with self.assertRaises(ValueError):
+            dd.delete_edge(1, 2)
+
+    def test_random_updates(self):
+        rng = random.Random(3)
+        for trial in range(60):
+            n = rng.randrange(2, 40)
+            g = random_cfg(n, extra_edges=rng.randrange(0, 3), back_edge_prob=0.4, seed=trial)
+            dd = DynamicDominators(g, track_frontier=trial % 2 == 0)
+            nodes = list(range(n + 3))
+            for step in range(30):
+                edges = [(a, b) for a, succs in dd.succs.items() for b in succs]
+                if edges and rng.random() < 0.45:
+                    dd.delete_edge(*rng.choice(edges))
+                else:
+                    dd.insert_edge(rng.choice(nodes), rng.choice(nodes))
+                self.assert_matches_nx(dd)
+
+
+if __name__ == '__main__':
+    unittest.main()
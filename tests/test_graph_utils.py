@@ -1,7 +1,9 @@
 import unittest
 
+from src.lib.crawler_type import CSRGraph
 from src.lib.graph_utils import dfs_pre_order_traversal, dfs_post_order_traversal
 from tests.base_test import BaseCase
+from benchmarks.graph_gen import random_cfg
 from tests.helper import get_nx_post_order, get_nx_pre_order
 
 
@@ -19,6 +21,26 @@ class TestTraversals(BaseCase):
             traversal_nx = get_nx_post_order(g)
             self.assertEqual(traversal_nx, traversal_ours)
 
+    def test_pre_order_csr(self):
+        for g in self.graphs:
+            self.assertEqual(get_nx_pre_order(g), dfs_pre_order_traversal(CSRGraph.from_graph(g)))
+
+    def test_post_order_csr(self):
+        for g in self.graphs:
+            self.assertEqual(get_nx_post_order(g), dfs_post_order_traversal(CSRGraph.from_graph(g)))
+
+    def test_random_graphs(self):
+        for seed in range(20):
+            g = random_cfg(300, extra_edges=2, seed=seed)
+            self.assertEqual(get_nx_pre_order(g), dfs_pre_order_traversal(g))
+            self.assertEqual(get_nx_post_order(g), dfs_post_order_traversal(g))
+
+    def test_deep_chain(self):
+        # deep enough that a recursive traversal would blow the stack
+        g = {i: [i + 1, 0] for i in range(5000)} | {5000: [0]}
+        self.assertEqual(tuple(range(5001)), dfs_pre_order_traversal(g))
+        self.assertEqual(tuple(range(5000, -1, -1)), dfs_post_order_traversal(g))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+
+import networkx as nx
+
+from benchmarks.graph_gen import random_cfg, structured_cfg, multi_region_cfg
+from src.lib.crawler_type import CSRGraph, LoopKind
+from src.lib.dj_graph import identify_loops, is_reducible
+from src.lib.havlak_loops import get_loop_forest
+from tests.base_test import BaseCase
+from tests.helper import g_to_nx
+
+
+class TestHavlakLoops(BaseCase):
+
+    def graph_cases(self):
+        return self.graphs + [random_cfg(10 + seed, seed=seed) for seed in range(30)] \
+            + [structured_cfg(300, goto_prob=0.05, seed=seed) for seed in range(3)] \
+            + [structured_cfg(300, seed=seed) for seed in range(3)] + [multi_region_cfg(4, 30)]
+
+    def assert_forest(self, g):
+        forest = get_loop_forest(g)
+        start = next(iter(g))
+        nx_g = g_to_nx(g)
+        reached = nx.descendants(nx_g, start) | {start}
+        self.assertEqual(reached, set(forest.labels))
+        sub = nx_g.subgraph(reached)
+
+        # outermost loops are the cyclic SCCs
+        headers = forest.headers()
+        outer = {frozenset(forest.body(h)) for h in headers if forest.parent[forest.index[h]] == -1}
+        cyclic = {frozenset(c) for c in nx.strongly_connected_components(sub)
+                  if len(c) > 1 or sub.has_edge(*(next(iter(c)),) * 2)}
+        self.assertEqual(cyclic, outer)
+
+        idoms = nx.immediate_dominators(sub, start)
+        for h, kind in headers.items():
+            body = forest.body(h)
+            loop = sub.subgraph(body)
+            self.assertTrue(nx.is_strongly_connected(loop))
+            self.assertEqual(len(body) == 1, kind == LoopKind.SELF)
+            outside = [x for x in body if x != h and any(p not in body for p in sub.predecessors(x))]
+            self.assertEqual(bool(outside), kind == LoopKind.IRREDUCIBLE)
+            depth = forest.depth_of(h)
+            for x in body:
+                self.assertLessEqual(depth, forest.depth_of(x))
+            if kind == LoopKind.REDUCIBLE:
+                # the header dominates its body
+                for x in body:
+                    while x not in (h, start):
+                        x = idoms[x]
+                    self.assertEqual(h, x)
+
+        # depth counts the loops a node is in
+        for x in reached:
+            self.assertEqual(sum(x in forest.body(h) for h in headers), forest.depth_of(x))
+        return forest
+
+    def test_loop_forest(self):
+        for g in self.graph_cases():
+            self.assert_forest(g)
+
+    def test_irreducible(self):
+        forest = self.assert_forest({0: [1, 2], 1: [2], 2: [1]})
+        self.assertEqual({1: LoopKind.IRREDUCIBLE}, forest.headers())
+        self.assertEqual([0, 1, 1], [forest.depth_of(x) for x in range(3)])
+        self.assertEqual([None, 1, 1], [forest.header_of(x) for x in range(3)])
+
+    def test_nested(self):
+        g = {0: [1], 1: [2], 2: [3], 3: [2, 4], 4: [1, 5], 5: [5]}
+        forest = self.assert_forest(g)
+        self.assertEqual({1: LoopKind.REDUCIBLE, 2: LoopKind.REDUCIBLE, 5: LoopKind.SELF}, forest.headers())
+        self.assertEqual({0: 0, 1: 1, 2: 2, 3: 2, 4: 1, 5: 1}, {x: forest.depth_of(x) for x in g})
+        self.assertEqual({0: None, 1: 1, 2: 2, 3: 2, 4: 1, 5: 5}, {x: forest.header_of(x) for x in g})
+        self.assertEqual([1, 2, 3, 4], sorted(forest.body(1)))
+        self.assertEqual(0, forest.depth_of(6))
+
+    def test_identify_loops(self):
+        # on reducible graphs the loops are the natural loops
+        for g in self.graph_cases():
+            if not is_reducible(g)[0]:
+                continue
+            forest = get_loop_forest(g)
+            innermost = {x: None for x in forest.labels}
+            for loop in identify_loops(g):
+                self.assertTrue(loop["reducible"])
+                innermost.update((x, loop["header"]) for x in loop["nodes"])
+            self.assertEqual(innermost, {x: forest.header_of(x) for x in forest.labels})
+
+    def test_csr(self):
+        for g in self.graphs:
+            forest = get_loop_forest(g)
+            csr_forest = get_loop_forest(CSRGraph.from_graph(g))
+            self.assertEqual(list(forest.labels), list(csr_forest.labels))
+            self.assertEqual((forest.header, forest.parent, forest.depth, forest.kind),
+                             (csr_forest.header, csr_forest.parent, csr_forest.depth, csr_forest.kind))
+
+
+if __name__ == '__main__':
+    unittest.main()
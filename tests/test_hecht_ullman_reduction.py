@@ -1,9 +1,13 @@
 import copy
+import io
 import unittest
 
-from src.lib.crawler_type import Reduce
+from src.lib.crawler_type import Reduce, HULog
 from src.lib.graph_utils import get_preds
-from src.lib.hecht_ullman_reduction import init_t1t2, get_reduced_graph, recover_orig_data
+from benchmarks.graph_gen import random_cfg, structured_cfg, nested_loops_cfg, fan_cfg
+from src.lib.hecht_ullman_reduction import init_t1t2, get_reduced_graph, recover_orig_data, reduce_t1t2_data, \
+    decode_log, rewind, make_checkpoints, state_at, absorbed_at, expand_region, \
+    absorbed_steps
 from tests.base_test import BaseCase
 from tests.helper import g_to_nx, sort_dict
 
@@ -105,6 +109,213 @@ class TestHechtUllman(BaseCase):
             self.assertEqual(data_recover["log"], [])
             self.assertEqual(sort_dict(data), sort_dict(data_recover))
 
+    def test_random_graphs_reversible(self):
+        graphs = [random_cfg(3 + seed, seed=seed) for seed in range(40)] \
+            + [structured_cfg(150, goto_prob=0.03, seed=seed) for seed in range(20)]
+        for g in graphs:
+            data = get_reduced_graph(g)
+            self.assertEqual(sort_dict(get_preds(data["graph"])), sort_dict(data["preds"]))
+            self.assertEqual(len(g), sum(data["weights"].values()))
+            recovered = recover_orig_data(data)
+            self.assertEqual(sort_dict(g), sort_dict(recovered["graph"]))
+            self.assertEqual({node: 1 for node in g}, recovered["weights"])
+
+    def test_reducible_to_one_node(self):
+        for g in [nested_loops_cfg(30), fan_cfg(30)] + [structured_cfg(200, goto_prob=0, seed=s) for s in range(10)]:
+            data = get_reduced_graph(g)
+            self.assertEqual({next(iter(g)): []}, data["graph"])
+
+    def test_mutates_in_place(self):
+        data = init_t1t2({0: [1], 1: [0, 2], 2: []})
+        graph, preds = data["graph"], data["preds"]
+        self.assertIs(data, reduce_t1t2_data(data))
+        self.assertIs(graph, data["graph"])
+        self.assertIs(preds, data["preds"])
+        self.assertEqual({0: []}, graph)
+
+    def test_pass_order(self):
+        # a pass drops every self-loop before it absorbs anything, and
+        # visits nodes in key order
+        g = {0: [1, 7, 10], 1: [2, 5], 2: [3], 3: [4], 4: [0, 3], 5: [3, 6], 6: [3], 7: [8, 10, 11],
+             8: [9], 9: [8], 10: [11], 11: [11, 9]}
+        for log in (None, HULog()):
+            data = get_reduced_graph(g, log=log)
+            entries = decode_log(data) if log else data["log"]
+            self.assertEqual([(Reduce.T1, 11), (Reduce.T2, 1), (Reduce.T2, 2), (Reduce.T2, 4), (Reduce.T2, 5),
+                              (Reduce.T2, 6), (Reduce.T2, 7), (Reduce.T2, 10), (Reduce.T2, 11), (Reduce.T1, 3),
+                              (Reduce.T2, 3), (Reduce.T1, 0)], [e[:2] for e in entries])
+        # 2 gets a self-loop again by absorbing 3 and waits for the next pass
+        g = {0: [1], 1: [2], 2: [2, 3], 3: [2]}
+        self.assertEqual([(Reduce.T1, 2), (Reduce.T2, 1), (Reduce.T2, 3), (Reduce.T1, 2), (Reduce.T2, 2)],
+                         [e[:2] for e in get_reduced_graph(g)["log"]])
+
+    def compact_cases(self):
+        return list(self.graphs) + [random_cfg(3 + seed, seed=seed) for seed in range(30)] \
+            + [structured_cfg(150, goto_prob=0.03, seed=seed) for seed in range(10)] \
+            + [nested_loops_cfg(15), fan_cfg(30)]
+
+    def test_compact_log(self):
+        for g in self.compact_cases():
+            expected = get_reduced_graph(g)
+            data = get_reduced_graph(g, log=HULog())
+            self.assertEqual(expected["graph"], data["graph"])
+            self.assertEqual(expected["preds"], data["preds"])
+            self.assertEqual(expected["weights"], data["weights"])
+            self.assertEqual(expected["log"], decode_log(data))
+            self.assertEqual(len(expected["log"]), len(data["log"]))
+
+            # same lists, in the same order, as recovering from the tuple log
+            recover_orig_data(expected)
+            recover_orig_data(data)
+            self.assertEqual(expected["graph"], data["graph"])
+            self.assertEqual(expected["preds"], data["preds"])
+            self.assertEqual(expected["weights"], data["weights"])
+            self.assertEqual(0, len(data["log"]))
+
+    def test_compact_log_stream(self):
+        for g in self.compact_cases():
+            expected = recover_orig_data(get_reduced_graph(g))
+            stream = io.BytesIO()
+            data = get_reduced_graph(g, log=HULog(stream, chunk_entries=7))
+            self.assertEqual(0, data["log"].nbytes() - data["log"].offsets.itemsize)
+
+            data["log"] = HULog.from_stream(io.BytesIO(stream.getvalue()))
+            recover_orig_data(data)
+            self.assertEqual(expected["graph"], data["graph"])
+            self.assertEqual(expected["preds"], data["preds"])
+            self.assertEqual(expected["weights"], data["weights"])
+
+    def test_compact_log_size(self):
+        g = fan_cfg(300)
+        tuples = get_reduced_graph(g)["log"]
+        log = get_reduced_graph(g, log=HULog())["log"]
+        items = sum(len(e[2]) + len(e[3]) + len(e[4]) + len(e[5]) for e in tuples)
+        self.assertLess(len(log.buf), items // 10)
+
+    def test_compact_log_rereduce(self):
+        # reducing an already reduced graph picks up the recorded numbering
+        g = {0: [1, 2], 1: [2], 2: [1, 3], 3: [0]}
+        data = get_reduced_graph(g, log=HULog())
+        self.assertEqual(1, len(data["log"]))
+        reduce_t1t2_data(data)
+        self.assertEqual(1, len(data["log"]))
+        self.assertEqual(sort_dict(g), sort_dict(recover_orig_data(data)["graph"]))
+
+        data = get_reduced_graph(g, log=HULog())
+        data["graph"][0].append(0)
+        with self.assertRaises(ValueError):
+            reduce_t1t2_data(data)
+
+    def test_rewind(self):
+        for g in self.compact_cases():
+            for log in (None, HULog(), HULog(io.BytesIO(), chunk_entries=5)):
+                data = get_reduced_graph(g, log=log)
+                n = len(data["log"])
+                checkpoints = make_checkpoints(data, 4)
+                self.assertEqual(list(range(0, n, 4)), [c["step"] for c in checkpoints])
+                for step in sorted({n, n // 2, n // 3, min(n, 1), 0}, reverse=True):
+                    expected = rewind(copy_data(get_reduced_graph(g)), step)
+                    at = state_at(data, checkpoints, step)
+                    for key in ("graph", "preds", "weights"):
+                        self.assertEqual(expected[key], at[key])
+                    rewind(data, step)
+                    self.assertEqual(step, len(data["log"]))
+                    for key in ("graph", "preds", "weights"):
+                        self.assertEqual(expected[key], data[key])
+                self.assertEqual(sort_dict(g), sort_dict(data["graph"]))
+
+    def test_rewind_then_reduce(self):
+        # a rewound compact log can be reduced again and still recovers exactly
+        for g in self.compact_cases():
+            expected = get_reduced_graph(g)
+            rewind(expected, len(expected["log"]) // 2)
+            reduce_t1t2_data(expected)
+            stream = io.BytesIO()
+            data = get_reduced_graph(g, log=HULog(stream, chunk_entries=3))
+            rewind(data, len(data["log"]) // 2)
+            reduce_t1t2_data(data)
+            self.assertEqual(get_reduced_graph(g)["weights"], data["weights"])
+            self.assertEqual(expected["log"], decode_log(data))
+            data["log"] = HULog.from_stream(io.BytesIO(stream.getvalue()))
+            # the same lists as the tuple log, also where rewinding left them
+            # out of sequence number order
+            recover_orig_data(expected)
+            recover_orig_data(data)
+            self.assertEqual(expected["graph"], data["graph"])
+            self.assertEqual(expected["preds"], data["preds"])
+
+    def test_state_before_absorbed(self):
+        g = {0: [1], 1: [2], 2: [1, 3], 3: []}
+        data = get_reduced_graph(g)
+        step = absorbed_at(data, 2)
+        self.assertEqual(step, absorbed_at(get_reduced_graph(g, log=HULog()), 2))
+        before = state_at(data, make_checkpoints(data, 2), step)
+        self.assertIn(2, before["graph"])
+        self.assertEqual(2, data["log"][step][1])
+        self.assertIsNone(absorbed_at(data, 0))
+
+    def test_expand_region(self):
+        graphs = [random_cfg(6 + seed, seed=seed) for seed in range(30)] \
+            + [structured_cfg(150, goto_prob=0.03, seed=seed) for seed in range(10)] + [nested_loops_cfg(6)]
+        for g in graphs:
+            for log in (None, HULog()):
+                data = get_reduced_graph(g, log=log)
+                entries = decode_log(data) if log is not None else data["log"]
+                holder = {x: x for x in g}
+                for e in entries:
+                    if e[0] is Reduce.T2:
+                        for x in holder:
+                            if holder[x] == e[1]:
+                                holder[x] = e[5][0]
+                for node in data["graph"]:
+                    region = {x for x in g if holder[x] == node}
+                    new = expand_region(data, node)
+                    expected = {x: set(v) for x, v in data["graph"].items() if x != node}
+                    for x in expected:
+                        expected[x] = {s for s in expected[x] if s != node}
+                    for x in region:
+                        expected[x] = set()
+                    for x, succs in g.items():
+                        for s in succs:
+                            if x in region or s in region:
+                                a = x if x in region else holder[x]
+                                b = s if s in region else holder[s]
+                                expected[a].add(b)
+                    self.assertEqual(expected, {x: set(v) for x, v in new["graph"].items()})
+                    self.assertEqual(sort_dict(get_preds(new["graph"])), sort_dict(new["preds"]))
+                    self.assertEqual(len(g), sum(new["weights"].values()))
+                    for x in region:
+                        self.assertEqual(1, new["weights"][x])
+
+    def test_expand_region_order(self):
+        # the region's lists come out as recover_orig_data leaves them, also
+        # after rewinding and reducing again left some out of sequence number order
+        for g in self.compact_cases():
+            expected = get_reduced_graph(g)
+            rewind(expected, len(expected["log"]) // 2)
+            reduce_t1t2_data(expected)
+            full = copy_data(expected)
+            recover_orig_data(full)
+            for log in (None, HULog(), HULog(io.BytesIO(), chunk_entries=3)):
+                data = get_reduced_graph(g, log=log)
+                rewind(data, len(data["log"]) // 2)
+                reduce_t1t2_data(data)
+                index = absorbed_steps(data)
+                before = copy.deepcopy({key: data[key] for key in ("graph", "preds", "weights")})
+                for node in data["graph"]:
+                    new = expand_region(data, node, index)
+                    self.assertEqual(new, expand_region(data, node))
+                    for x in new["graph"].keys() - data["graph"].keys() | {node}:
+                        self.assertEqual(full["graph"][x], new["graph"][x])
+                    self.assertEqual(sort_dict(get_preds(new["graph"])), sort_dict(new["preds"]))
+                for key in ("graph", "preds", "weights"):
+                    self.assertEqual(before[key], data[key])
+
+
+def copy_data(data):
+    return {**data, "graph": copy.deepcopy(data["graph"]), "preds": copy.deepcopy(data["preds"]),
+            "weights": dict(data["weights"]), "log": list(data["log"])}
+
 
 if __name__ == '__main__':
     unittest.main()
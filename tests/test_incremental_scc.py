@@ -0,0 +1,87 @@
+import random
+import unittest
+
+import networkx as nx
+
+from benchmarks.graph_gen import random_cfg, structured_cfg
+from src.lib.dj_graph import is_reducible
+from src.lib.incremental_scc import IncrementalSCC
+from src.lib.tarjan_scc import get_tarjan_scc
+from tests.base_test import BaseCase
+from tests.helper import g_to_nx
+
+
+class TestIncrementalSCC(BaseCase):
+
+    def assert_matches_nx(self, inc: IncrementalSCC):
+        nx_g = g_to_nx(inc.succs)
+        self.assertEqual(sorted(sorted(c) for c in nx.strongly_connected_components(nx_g)),
+                         sorted(sorted(c) for c in inc.components()))
+        for node, c in inc.comp.items():
+            self.assertIn(node, inc.members[c])
+        # the condensation, in topological order
+        edges = {(inc.comp[u], inc.comp[v]) for u, v in nx_g.edges if inc.comp[u] != inc.comp[v]}
+        self.assertEqual(edges, {(c, d) for c, succs in inc.out.items() for d in succs})
+        self.assertEqual(edges, {(c, d) for d, preds in inc.into.items() for c in preds})
+        for c, d in edges:
+            self.assertLess(inc.order[c], inc.order[d])
+        self.assertEqual(len(inc.order), len(set(inc.order.values())))
+
+    def test_seed(self):
+        for g in self.graphs:
+            inc = IncrementalSCC(g)
+            self.assertEqual(get_tarjan_scc(g), inc.components())
+            self.assert_matches_nx(inc)
+
+    def test_add_edge(self):
+        inc = IncrementalSCC({0: [1], 1: [2], 2: [3], 3: []})
+        self.assertEqual([[3], [2], [1], [0]], inc.components())
+        self.assertEqual((), inc.add_edge(0, 2))
+        # 2 gains an entry edge
+        self.assertEqual({1}, inc.pop_changed())
+        self.assertEqual((1, 2), inc.add_edge(2, 1))
+        self.assertEqual({1}, inc.pop_changed())
+        self.assertEqual((), inc.add_edge(1, 2))
+        self.assertEqual((), inc.add_edge(2, 2))
+        self.assertEqual({1}, inc.pop_changed())
+        # 3 -> 0 closes the cycle through everything
+        self.assertEqual((1, 0, 3), inc.add_edge(3, 0))
+        self.assertEqual([[0, 1, 2, 3]], [sorted(c) for c in inc.components()])
+        self.assertEqual((), inc.add_edge(3, 4))
+        self.assertEqual(4, inc.component_of(4))
+        self.assertEqual({1: [4], 4: []}, inc.condensation())
+        self.assert_matches_nx(inc)
+
+    def test_entry_edge(self):
+        g = {0: [1, 3], 1: [2], 2: [1], 3: []}
+        inc = IncrementalSCC(g)
+        self.assertTrue(is_reducible(g)[0])
+        # 3 -> 2 merges nothing, but gives the loop {1, 2} a second entry
+        self.assertEqual((), inc.add_edge(3, 2))
+        self.assertEqual({inc.component_of(2)}, inc.pop_changed())
+        self.assertFalse(is_reducible(inc.succs)[0])
+
+    def test_random_edges(self):
+        rng = random.Random(0)
+        for g in [random_cfg(60, back_edge_prob=0.0, seed=seed) for seed in range(10)] \
+                + [structured_cfg(80, seed=seed) for seed in range(5)] + self.graphs[:10]:
+            inc = IncrementalSCC(g)
+            nodes = list(inc.succs)
+            for _ in range(40):
+                u, v = rng.choice(nodes), rng.choice(nodes)
+                before = {node: inc.comp[node] for node in nodes}
+                new = v not in inc.succs[u]
+                merged = inc.add_edge(u, v)
+                self.assert_matches_nx(inc)
+                changed = inc.pop_changed()
+                if merged:
+                    self.assertEqual({merged[0]}, changed)
+                    for node, c in before.items():
+                        self.assertEqual(merged[0] if c in merged else c, inc.comp[node])
+                else:
+                    # a new edge changes the component it goes into
+                    self.assertEqual({before[v]} if new else set(), changed)
+                    self.assertEqual(before, {node: inc.comp[node] for node in nodes})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,9 @@ import unittest
 
 import networkx as nx
 
-from src.lib.lengauer_tarjan import init_lt, gen_lt_graph
+from benchmarks.graph_gen import deep_cfg
+from src.lib.crawler_type import CSRGraph
+from src.lib.lengauer_tarjan import init_lt, gen_lt_graph, gen_lt_idoms
 from tests.base_test import BaseCase
 from tests.helper import g_to_nx
 
@@ -120,6 +122,43 @@ class TestExamples(BaseCase):
             idoms_nx = nx.immediate_dominators(nx_g, start=start)
             self.assertEqual(idoms_ours, idoms_nx)
 
+    def test_lt_with_examples_csr(self):
+        for g in self.graphs:
+            start, _ = next(iter(g.items()))
+            graph, pre, rev = gen_lt_graph(CSRGraph.from_graph(g))
+            idoms_ours = {rev[idx]: rev[node["idom"]] for idx, node in graph.items() if node["idom"] is not None }
+            self.assertEqual(idoms_ours, nx.immediate_dominators(g_to_nx(g), start=start))
+
+    def test_lt_idoms_array(self):
+        for g in self.graphs:
+            start, _ = next(iter(g.items()))
+            graph, pre, rev = gen_lt_graph(g)
+            idom, pre_arr, rev_arr = gen_lt_idoms(g)
+            self.assertEqual(pre, pre_arr)
+            self.assertEqual(list(rev.values()), list(rev_arr))
+            self.assertEqual([-1 if node["idom"] is None else node["idom"] for node in graph.values()], list(idom))
+
+            idoms_ours = {rev_arr[idx]: rev_arr[d] for idx, d in enumerate(idom) if d != -1}
+            self.assertEqual(idoms_ours, nx.immediate_dominators(g_to_nx(g), start=start))
+
+    def test_lt_idoms_balanced(self):
+        for g in self.graphs:
+            simple_stats, balanced_stats = {}, {}
+            idom, pre, rev = gen_lt_idoms(g, stats=simple_stats)
+            idom_b, pre_b, rev_b = gen_lt_idoms(g, balanced=True, stats=balanced_stats)
+            self.assertEqual(idom, idom_b)
+            self.assertEqual(simple_stats["evals"], balanced_stats["evals"])
+            self.assertIn("compressed_path_length", balanced_stats)
+
+    def test_balanced_deep_graph(self):
+        g = deep_cfg(2000, seed=3)
+        simple_stats, balanced_stats = {}, {}
+        idom, pre, rev = gen_lt_idoms(g, stats=simple_stats)
+        self.assertEqual(idom, gen_lt_idoms(g, balanced=True, stats=balanced_stats)[0])
+        idoms_nx = nx.immediate_dominators(g_to_nx(g), start=0)
+        self.assertEqual(idoms_nx, {rev[i]: rev[d] for i, d in enumerate(idom) if d != -1})
+        self.assertLess(balanced_stats["compressed_path_length"], simple_stats["compressed_path_length"])
+
 
 if __name__ == '__main__':
     unittest.main()
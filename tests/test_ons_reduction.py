@@ -0,0 +1,108 @@
+import unittest
+
+import networkx as nx
+
+from benchmarks.graph_gen import random_cfg, structured_cfg, multi_region_cfg
+from src.lib.cns_reduction import cns_reduce
+from src.lib.crawler_type import CNSStop
+from src.lib.dj_graph import is_reducible
+from src.lib.hecht_ullman_reduction import get_reduced_graph
+from src.lib.ons_reduction import ons_reduce, init_ons, split_loops
+from tests.base_test import BaseCase
+from tests.helper import g_to_nx
+
+
+class TestONS(BaseCase):
+
+    def assert_ons(self, g, weights=None, max_growth=None):
+        res, res_weights, split, stop = ons_reduce(g, weights, max_growth=max_growth)
+        start = next(iter(g))
+        self.assertEqual(start, next(iter(res)))
+        # a split is only left out when it was needed
+        self.assertIn(stop, (CNSStop.DONE, CNSStop.GROWTH))
+        self.assertEqual(stop is CNSStop.DONE, is_reducible(res)[0])
+        if stop is CNSStop.DONE:
+            self.assertEqual(1, len(get_reduced_graph(res)["graph"]))
+        else:
+            self.assertLessEqual(sum(res_weights[d["duplicate"]] for d in split), max_growth)
+
+        # every node is reachable and is a node of g with the same edges
+        nx_g = g_to_nx(g)
+        self.assertEqual(set(res), nx.descendants(g_to_nx(res), start) | {start})
+        self.assertEqual(nx.descendants(nx_g, start) | {start}, set(res) - {d["duplicate"] for d in split})
+        original = {x: x for x in res}
+        original.update((d["duplicate"], d["original"]) for d in split)
+        for x, succs in res.items():
+            self.assertEqual(sorted(g[original[x]]), sorted(original[s] for s in succs))
+            self.assertEqual(1 if weights is None else weights[original[x]], res_weights[x])
+        return res, res_weights, split, stop
+
+    def test_ons_reduce(self):
+        # splitting a graph close to complete copies exponentially many nodes,
+        # so the copies are capped
+        graphs = self.graphs + [random_cfg(10 + seed, seed=seed) for seed in range(40)] \
+            + [structured_cfg(300, goto_prob=0.05, seed=seed) for seed in range(5)] + [multi_region_cfg(4, 30)]
+        for g in graphs:
+            self.assert_ons(g, max_growth=10_000)
+            data = get_reduced_graph(g)
+            self.assert_ons(data["graph"], data["weights"], max_growth=10_000)
+
+    def test_irreducible(self):
+        # of equal regions the one first in preorder is kept
+        self.assertEqual(({0: [1, 2], 1: [3], 2: [1], 3: [1]}, {0: 1, 1: 1, 2: 1, 3: 1},
+                          ({"duplicate": 3, "original": 2},), CNSStop.DONE),
+                         self.assert_ons({0: [1, 2], 1: [2], 2: [1]}))
+        # otherwise the heavier one
+        res, weights, split, _ = self.assert_ons({0: [1, 2], 1: [2], 2: [1]}, {0: 1, 1: 1, 2: 5})
+        self.assertEqual({0: [1, 2], 1: [2], 2: [3], 3: [2]}, res)
+        self.assertEqual(({"duplicate": 3, "original": 1},), split)
+
+    def test_regions(self):
+        # 1 -> 2 and 3 -> 4 are regions of the SCC, the first one heavier
+        g = {0: [1, 3], 1: [2], 2: [3], 3: [4], 4: [1, 5], 5: []}
+        res, weights, split, _ = self.assert_ons(g, {0: 1, 1: 2, 2: 2, 3: 1, 4: 1, 5: 1})
+        self.assertEqual(2, len(split))
+        self.assertEqual([3, 4], sorted(d["original"] for d in split))
+
+    def test_less_growth(self):
+        growth = [0, 0]
+        for seed in range(5):
+            g = structured_cfg(300, goto_prob=0.05, seed=seed)
+            data = get_reduced_graph(g)
+            _, weights, _, _ = ons_reduce(data["graph"], data["weights"])
+            growth[0] += sum(weights.values()) - len(g)
+            growth[1] += cns_reduce(g).growth
+        self.assertLess(growth[0], growth[1])
+
+        # dense random CFGs copy much more either way
+        growth = [0, 0]
+        for seed in range(40):
+            g = random_cfg(5 + seed % 25, extra_edges=1 + seed % 3, back_edge_prob=0.3, seed=seed)
+            data = get_reduced_graph(g)
+            _, weights, _, _ = self.assert_ons(data["graph"], data["weights"])
+            growth[0] += sum(weights.values()) - len(g)
+            growth[1] += cns_reduce(g).growth
+        self.assertLess(growth[0], growth[1])
+
+    def test_budget(self):
+        # reducible only with tens of thousands of copies; each cap is
+        # reached but not passed
+        g = random_cfg(46, extra_edges=3, back_edge_prob=0.45, seed=168)
+        for max_growth in (0, 1000):
+            self.assertEqual(CNSStop.GROWTH, self.assert_ons(g, max_growth=max_growth)[3])
+        _, _, split, stop = ons_reduce(g, time_limit=0)
+        self.assertEqual((CNSStop.TIME, ()), (stop, split))
+        self.assertEqual(CNSStop.SPLITS, ons_reduce(g, max_splits=3)[3])
+
+    def test_restrict_to(self):
+        ons_g, start = init_ons({0: [1, 2], 1: [2], 2: [1]})
+        self.assertFalse(split_loops(start, ons_g, {ons_g[0], ons_g[1]}))
+        self.assertEqual(3, len(ons_g))
+        restrict_to = set(ons_g.values())
+        self.assertTrue(split_loops(start, ons_g, restrict_to))
+        self.assertEqual(4, len(ons_g))
+        self.assertIn(ons_g[3], restrict_to)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,10 @@
 import unittest
 import networkx as nx
 from tests.helper import g_to_nx
-from src.lib.tarjan_scc import get_tarjan_scc
+from src.lib.crawler_type import CSRGraph
+from benchmarks.graph_gen import random_cfg
+from src.lib.graph_utils import get_preds
+from src.lib.tarjan_scc import get_tarjan_scc, get_condensation, get_pearce_scc, scc_of, sccs_of
 from tests.base_test import BaseCase
 
 class MyTestCase(BaseCase):
@@ -12,6 +15,64 @@ class MyTestCase(BaseCase):
             scc_nx = list(sorted(list(x)) for x in nx.strongly_connected_components(g_to_nx(g)))
             self.assertEqual(scc_nx, scc_ours)
 
+    def test_tarjan_scc_csr(self):
+        for g in self.graphs:
+            self.assertEqual(get_tarjan_scc(g), get_tarjan_scc(CSRGraph.from_graph(g)))
+
+    def test_pearce_scc(self):
+        for g in self.graphs + [random_cfg(40, seed=seed) for seed in range(20)] + [{0: [1], 1: [0, 2]}]:
+            tarjan = get_tarjan_scc(g)
+            pearce = get_tarjan_scc(g, "pearce")
+            self.assertEqual([sorted(x) for x in tarjan], [sorted(x) for x in pearce])
+            # the root of each component comes last, as in get_tarjan_scc
+            self.assertEqual([x[-1] for x in tarjan], [x[-1] for x in pearce])
+            self.assertEqual(pearce, get_pearce_scc(CSRGraph.from_graph(g)))
+        with self.assertRaises(ValueError):
+            get_tarjan_scc({0: []}, "kosaraju")
+
+    def test_condensation(self):
+        for g in self.graphs + [{0: [1, 2], 1: [0, 3], 2: [3, 4], 3: [2]}]:
+            cond = get_condensation(g)
+            self.assertEqual(get_tarjan_scc(g), cond.sccs())
+            nx_g = g_to_nx(g)
+            for x in nx_g:
+                self.assertIn(x, cond.component(cond.component_of(x)))
+
+            # the DAG is nx's condensation, and numbered in reverse topological order
+            nx_cond = nx.condensation(nx_g)
+            to_ours = {c: cond.component_of(next(iter(d["members"]))) for c, d in nx_cond.nodes(data=True)}
+            self.assertEqual(sorted((to_ours[a], to_ours[b]) for a, b in nx_cond.edges),
+                             sorted((c, d) for c, succs in cond.dag.to_graph().items() for d in succs))
+            for c in cond.topological_order():
+                self.assertTrue(all(d < c for d in cond.dag.succs(c)))
+
+            csr_cond = get_condensation(CSRGraph.from_graph(g))
+            self.assertEqual((cond.comp, cond.offsets, cond.nodes, cond.dag.targets),
+                             (csr_cond.comp, csr_cond.offsets, csr_cond.nodes, csr_cond.dag.targets))
+
+    def test_scc_of(self):
+        for g in self.graphs + [random_cfg(40, seed=seed) for seed in range(10)] + [{0: [1], 1: [0, 2]}]:
+            preds = get_preds(g)
+            expected = {x: sorted(scc) for scc in get_tarjan_scc(g) for x in scc}
+            for x in expected:
+                scc = scc_of(g, x, preds)
+                self.assertEqual(x, scc[0])
+                self.assertEqual(expected[x], sorted(scc))
+
+            found = sccs_of(g, reversed(list(expected)), preds)
+            self.assertEqual(expected, {x: sorted(scc) for x, scc in found.items()})
+            for x, scc in found.items():
+                self.assertIs(found[scc[0]], scc)
+            csr = CSRGraph.from_graph(g)
+            self.assertEqual(expected, {x: sorted(scc) for x, scc in sccs_of(csr, expected).items()})
+            start = next(iter(g))
+            self.assertEqual(sorted(scc_of(g, start)), sorted(scc_of(csr, start)))
+
+        with self.assertRaises(ValueError):
+            scc_of({0: [1]}, 2)
+        with self.assertRaises(ValueError):
+            scc_of(CSRGraph.from_graph({0: [1]}), 2)
+
 
 if __name__ == '__main__':
     unittest.main()